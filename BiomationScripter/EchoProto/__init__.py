@@ -388,11 +388,8 @@ class Protocol:
         Source_Plates = self.get_source_plates()
         Locations = []
         for plate in Source_Plates:
-            occupied_wells = plate.get_occupied_wells()
-            for well in occupied_wells:
-                for reagent in plate.get_content()[well]:
-                    if reagent.name == Reagent_Name:
-                        Locations.append([plate, well])
+            for well in plate.get_wells_containing_liquid(Reagent_Name):
+                Locations.append([plate, well])
 
         if len(Locations) > 0:
             return(Locations)
@@ -403,11 +400,8 @@ class Protocol:
         Destination_Plates = self.get_destination_plates()
         Locations = []
         for plate in Destination_Plates:
-            occupied_wells = plate.get_occupied_wells()
-            for well in occupied_wells:
-                for reagent in plate.get_content()[well]:
-                    if reagent.name == Reagent_Name:
-                        Locations.append([plate, well])
+            for well in plate.get_wells_containing_liquid(Reagent_Name):
+                Locations.append([plate, well])
 
         if len(Locations) > 0:
             return(Locations)
@@ -452,6 +446,9 @@ class TransferList:
 
 class Action:
     ## Class for storing information about a liquid transfer action
+    ## Slots keep each action small, as protocols can contain a very large number of them
+    __slots__ = ("__uid", "reagent", "source_plate", "calibration", "source_well", "destination_plate_name", "destination_plate_type", "destination_well", "_volume")
+
     def __init__(self, UID, Reagent, Source_Plate, Calibration, Source_Well, Destination_Plate_Name, Destination_Plate_Type, Destination_Well):
         self.__uid = UID
         self.reagent = Reagent
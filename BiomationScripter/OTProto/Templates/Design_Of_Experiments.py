@@ -4,7 +4,7 @@ from opentrons import simulate as OT2
 import math
 import warnings
 from typing import List, NewType, Tuple, Union
-from collections import namedtuple
+from collections import namedtuple, Counter
 
 
 class Template(_OTProto.OTProto_Template):
@@ -38,6 +38,12 @@ class Template(_OTProto.OTProto_Template):
         ###########################
         self.destination_content = Destination_Content
         self.destination_layout = None
+        self.destination_layouts = []
+        # Run ID -> [(destination labware name, well), ...]
+        self.run_locations = {}
+        # Liquid -> total volume across the destination labware, and Liquid -> {liquid volume / final well volume, ...}
+        self.destination_liquid_volumes = {}
+        self.destination_liquid_dilutions = {}
 
         ###########
         # Labware #
@@ -69,11 +75,10 @@ class Template(_OTProto.OTProto_Template):
             if type(self.source_materials[source_material][0]) is list:
                 factor_components = self.source_materials[source_material][0]
                 materials_in_run_order = _BMS.DoE_Create_Source_Material(DoE, source_material, factor_components)
-                unique_materials = set(materials_in_run_order)
 
                 print("\nThe following combinations of {} are required:".format(source_material))
-                for material in unique_materials:
-                    print("{} * {}".format(material, materials_in_run_order.count(material)))
+                for material, count in Counter(materials_in_run_order).items():
+                    print("{} * {}".format(material, count))
 
 
 
@@ -100,49 +105,80 @@ class Template(_OTProto.OTProto_Template):
 
 
             intermediates_in_run_order = _BMS.DoE_Create_Intermediate(DoE, intermediate, source_components, source_components_amount_types, source_components_amount_values)
-            unique_intermediates = set(intermediates_in_run_order)
 
             print("\nThe following combinations of {} are required:".format(intermediate))
-            for unique_intermediate in unique_intermediates:
-                print("{} * {}".format(unique_intermediate, intermediates_in_run_order.count(unique_intermediate)))
+            for unique_intermediate, count in Counter(intermediates_in_run_order).items():
+                print("{} * {}".format(unique_intermediate, count))
 
-        #############################
-        # Set up destination layout #
-        #############################
+        ##############################
+        # Set up destination layouts #
+        ##############################
 
-        # Create destination labware layout and add content
+        # Create destination labware layout(s) and add content
         ## Content should be mastermix type and volume, and cell type and volume
-        self.labware_layouts["Destination"] = _BMS.Labware_Layout("Destination Labware", self.labware_apis["Destination"])
-
-        Destination_Layout = self.labware_layouts["Destination"]
-        Destination_Labware_Format = _BMS.OTProto.get_labware_format(Destination_Layout.type, self.custom_labware_dir)
-        Destination_Layout.define_format(Destination_Labware_Format[0], Destination_Labware_Format[1])
-        Destination_Well_Range = Destination_Layout.get_well_range(Use_Outer_Wells=False)
-
-        # Determine how many destination wells are required
-        ## Calculation uses the number of runs, the number of controls per run, and the number of replicates required
-        number_of_runs = len(DoE.runs)
-        # len(Destination_Content.keys()) ensures that slots for controls are accounted for, as well as just the samples
-        Destination_Slots_Required = (number_of_runs * len(self.destination_content.keys())) * self.run_replicates
-
-        if not Destination_Slots_Required <= len(Destination_Well_Range):
-            raise _BMS.LabwareError("Not enough wells in destination plate to set up this experiment ({} needed, {} available)".format(len(DoE.runs) * 6, len(Destination_Well_Range)))
-
-        well_index = 0
-        for run in DoE.runs:
-            for sample_type in self.destination_content:
-                for replicate in range(0, self.run_replicates):
-                    content_to_add = []
-                    destination_well = Destination_Well_Range[well_index]
-                    for content_info in self.destination_content[sample_type]:
-                        content = run.get_value_by_name(content_info[0])
-                        content_volume = content_info[1]
-                        Destination_Layout.add_content(destination_well, content, content_volume)
-                    well_index += 1
+        Destination_Format_Layout = _BMS.Labware_Layout("Destination Labware", self.labware_apis["Destination"])
+        Destination_Labware_Format = _BMS.OTProto.get_labware_format(Destination_Format_Layout.type, self.custom_labware_dir)
+        Destination_Format_Layout.define_format(Destination_Labware_Format[0], Destination_Labware_Format[1])
+        Destination_Well_Range = Destination_Format_Layout.get_well_range(Use_Outer_Wells=False)
+
+        # Determine how many destination wells are required for each run
+        ## len(Destination_Content.keys()) ensures that slots for controls are accounted for, as well as just the samples
+        Destination_Slots_Per_Run = len(self.destination_content.keys()) * self.run_replicates
+        Runs_Per_Destination = len(Destination_Well_Range) // Destination_Slots_Per_Run
+
+        if Runs_Per_Destination == 0:
+            raise _BMS.LabwareError("Not enough wells in destination plate to set up a run of this experiment ({} needed, {} available)".format(Destination_Slots_Per_Run, len(Destination_Well_Range)))
+
+        # Runs are split, in order, across as many destination labware as needed, with all wells for a run in the same labware
+        Destination_Batches = DoE.split_into_batches(Runs_Per_Destination)
+        self.destination_layouts = []
+        self.run_locations = {}
+
+        for destination_number, destination_batch in enumerate(Destination_Batches, start = 1):
+            if len(Destination_Batches) == 1:
+                Destination_Layout = Destination_Format_Layout
+                self.labware_layouts["Destination"] = Destination_Layout
+            else:
+                Destination_Layout = Destination_Format_Layout.clone_format("Destination Labware {}".format(destination_number))
+                self.labware_layouts["Destination {}".format(destination_number)] = Destination_Layout
+            self.destination_layouts.append(Destination_Layout)
 
-        print("\n")
-        Destination_Layout.print()
-        self.destination_layout = Destination_Layout
+            well_index = 0
+            for run in destination_batch.runs:
+                self.run_locations[run.id] = []
+                for sample_type in self.destination_content:
+                    for replicate in range(0, self.run_replicates):
+                        destination_well = Destination_Well_Range[well_index]
+                        for content_info in self.destination_content[sample_type]:
+                            content = run.get_value_by_name(content_info[0])
+                            content_volume = content_info[1]
+                            Destination_Layout.add_content(destination_well, content, content_volume)
+                        self.run_locations[run.id].append((Destination_Layout.name, destination_well))
+                        well_index += 1
+
+            print("\n")
+            Destination_Layout.print()
+
+        self.destination_layout = self.destination_layouts[0]
+
+        # Total volume of each liquid required across all of the destination labware, and the set of...
+        # ... dilutions (liquid volume / final well volume) of each liquid across the destination wells
+        Destination_Liquid_Volumes = {}
+        Destination_Liquid_Dilutions = {}
+        for Destination_Layout in self.destination_layouts:
+            for well_content in Destination_Layout.get_content().values():
+                # The volume of a liquid in a well is the volume of its first entry, as with `get_volume_of_liquid_in_well`...
+                # ... but a liquid with more than one entry in a well is counted once per entry, as with `get_wells_containing_liquid`
+                liquid_volumes_in_well = {}
+                for content in well_content:
+                    liquid_volumes_in_well.setdefault(content.name, content.volume)
+                final_well_volume = sum(liquid_volumes_in_well[content.name] for content in well_content)
+                for content in well_content:
+                    liquid_volume = liquid_volumes_in_well[content.name]
+                    Destination_Liquid_Volumes[content.name] = Destination_Liquid_Volumes.get(content.name, 0) + liquid_volume
+                    Destination_Liquid_Dilutions.setdefault(content.name, set()).add(liquid_volume/final_well_volume)
+        self.destination_liquid_volumes = Destination_Liquid_Volumes
+        self.destination_liquid_dilutions = Destination_Liquid_Dilutions
 
         #################################
         # Set up intermediate layout(s) #
@@ -186,107 +222,88 @@ class Template(_OTProto.OTProto_Template):
 
             for unique_intermediate in unique_intermediates:
                 # Get volume of intermediate required to fill the destination labware
-                volume_required = 0
+                volume_required = Destination_Liquid_Volumes.get(unique_intermediate, 0)
 
                 intermediate_object = DoE.get_intermediate(unique_intermediate)
 
-                for well in self.labware_layouts["Destination"].get_wells_containing_liquid(unique_intermediate):
-                    volume_required += self.labware_layouts["Destination"].get_volume_of_liquid_in_well(unique_intermediate, well)
-
                 # Add an additional 10% to account for pipetting errors, dead volume, etc.
                 volume_required += volume_required*0.1
 
                 slots_required = math.ceil(volume_required/intermediate_well_capacity)
                 volume_per_slot = volume_required/slots_required
 
-                for slot in range(0, slots_required):
-                    intermediate_as_source_layout.add_content(intermediate_well_range[well_index], unique_intermediate, volume_per_slot)
+                # Calculate how much of each source material is required for this intermediate type
+                ## Every slot holds the same volume, so the component volumes are calculated once and reused for each slot
+                ## Create a variable to store the component which makes up the intermediate...
+                ## ... to a final volume, if applicable
+                make_up_to_final_volume = None
+                component_volumes = []
+
+                for component_info in source_components_info:
+                    # Convert each of the source component infos to a volume (in uL)
+                    component_name, value_type, value_or_ref = component_info
+                    component_volume = None
+
+                    if value_type == "volume":
+                        # Check if the value_or_ref is an int/float which specifies a constant volume
+                        if type(value_or_ref) is int or type(value_or_ref) is float:
+                            component_volume = value_or_ref
+                        # Check if the value_or_ref specifies that this component should be used to...
+                        # ... make up the intermediate to a final volume
+                        elif value_or_ref == "make up to final volume":
+                            make_up_to_final_volume = component_name
+                            continue
+                        # If neither of the above cases are true, assume that value_or_ref is a reference...
+                        # ... to a DoE factor, whose value for this intermediate is stored as the component amount
+                        else:
+                            component_volume = float(intermediate_object.components[component_name][2])
+
+                    # Check if "concentration" is in value_type rather than is value_type == "concentration"...
+                    # ... as concentration should be supplied "concentration-{}".format(stock concentration)
+                    elif "concentration" in value_type:
+                        # Get the stock concentration of the component
+                        stock_concentration = float(value_type.split("-")[1])
+
+                        # Check if the value_or_ref is an int/float which specifies a constant concentration
+                        if type(value_or_ref) is int or type(value_or_ref) is float:
+                            final_concentration = value_or_ref
+                        # If not, assume that value_or_ref is a reference to a DoE factor, which should be...
+                        # ... present in the intermediate name
+                        else:
+                            final_concentration = float(intermediate_object.components[component_name][2])
 
+                        # Calculate what the concentration in the intermediate should be (as this will be diluted in the destination)
+                        intermediate_dilution_in_destination = Destination_Liquid_Dilutions.get(unique_intermediate, set())
 
-                    # Calculate how much of each source material is required for this intermediate type
-                    ## Create a variable to store the component which makes up the intermediate...
-                    ## ... to a final volume, if applicable
-                    make_up_to_final_volume = None
+                        # Check that the dilution factor is the same across all wells for this unique intermediate
+                        ## Raise an error if not because that would be difficult to handle
+                        if not len(intermediate_dilution_in_destination) == 1:
+                            raise _BMS.DoEError("Same amount of intermediate {} must be added to all destination wells as this is difficult to deal with at the moment.".format(unique_intermediate))
 
-                    volume_in_slot = 0
+                        intermediate_dilution_in_destination = next(iter(intermediate_dilution_in_destination))
+                        concentration_in_intermediate = final_concentration/intermediate_dilution_in_destination
 
-                    for component_info in source_components_info:
-                        # Convert each of the source component infos to a volume (in uL)
-                        component_name, value_type, value_or_ref = component_info
-                        component_volume = None
-
-                        if value_type == "volume":
-                            # Check if the value_or_ref is an int/float which specifies a constant volume
-                            if type(value_or_ref) is int or type(value_or_ref) is float:
-                                component_volume = value_or_ref
-                            # Check if the value_or_ref specifies that this component should be used to...
-                            # ... make up the intermediate to a final volume
-                            elif value_or_ref == "make up to final volume":
-                                component_volume = value_or_ref
-                                make_up_to_final_volume = component_name
-                                continue
-                            # If neither of the above cases are true, assume that value_or_ref is a reference...
-                            # ... to a DoE factor, which should be present in the intermediate name
-                            else:
-                                component_volume = float(unique_intermediate.split(value_or_ref)[1].split("(")[1].split(")")[0])
-
-                        # Check if "concentration" is in value_type rather than is value_type == "concentration"...
-                        # ... as concentration should be supplied "concentration-{}".format(stock concentration)
-                        elif "concentration" in value_type:
-                            # Get the stock concentration of the component
-                            stock_concentration = float(value_type.split("-")[1])
-
-                            # Check if the value_or_ref is an int/float which specifies a constant concentration
-                            if type(value_or_ref) is int or type(value_or_ref) is float:
-                                final_concentration = value_or_ref
-                            # If not, assume that value_or_ref is a reference to a DoE factor, which should be...
-                            # ... present in the intermediate name
-                            else:
-
-                                final_concentration = float(intermediate_object.components[component_name][2])
-
-
-                            # Calculate what the concentration in the intermediate should be (as this will be diluted in the destination)
-                            intermediate_dilution_in_destination = set()
-
-                            # For each well in the destination which contains this intermediate
-                            for well in self.labware_layouts["Destination"].get_wells_containing_liquid(unique_intermediate):
-                                # Get the volume of the intermediate in the well
-                                intermediate_volume_in_destination = self.labware_layouts["Destination"].get_volume_of_liquid_in_well(unique_intermediate, well)
-                                # And the final volume of the destination well
-                                final_destination_volume = 0
-                                for component in self.labware_layouts["Destination"].get_liquids_in_well(well):
-                                    final_destination_volume += self.labware_layouts["Destination"].get_volume_of_liquid_in_well(component, well)
-
-                                # Calculate how much the intermediate is diluted in the destination well and add to the pre-prepared set
-                                intermediate_dilution_in_destination.add(intermediate_volume_in_destination/final_destination_volume)
-
-                            # Check that the dilution factor is the same across all wells for this unique intermediate
-                            ## Raise an error if not because that would be difficult to handle
-                            if not len(intermediate_dilution_in_destination) == 1:
-                                raise _BMS.DoEError("Same amount of intermediate {} must be added to all destination wells as this is difficult to deal with at the moment.".format(unique_intermediate))
-
-                            intermediate_dilution_in_destination = intermediate_dilution_in_destination.pop()
-                            concentration_in_intermediate = final_concentration/intermediate_dilution_in_destination
-
-                            # Calculate the volume which needs to be added to the intermediate from the stock solution
-                            component_volume = round((concentration_in_intermediate*volume_per_slot)/stock_concentration, 1)
-
-                            # Sanity check the volume being added
-                            if component_volume <= 0:
-                                raise _BMS.NegativeVolumeError("Volume of {} to be added to {} is too small".format(component_name, unique_intermediate))
+                        # Calculate the volume which needs to be added to the intermediate from the stock solution
+                        component_volume = round((concentration_in_intermediate*volume_per_slot)/stock_concentration, 1)
 
-                        else:
-                            raise _BMS.DoEError("Value type for {} in {} must be either 'volume' or 'concentration-{stock_concentration}'".format(component_name, intermediate))
+                        # Sanity check the volume being added
+                        if component_volume <= 0:
+                            raise _BMS.NegativeVolumeError("Volume of {} to be added to {} is too small".format(component_name, unique_intermediate))
 
-                        # Add the component and volume to the intermediate_as_destination layout
+                    else:
+                        raise _BMS.DoEError("Value type for {} in {} must be either 'volume' or 'concentration-{stock_concentration}'".format(component_name, intermediate))
 
+                    component_volumes.append((intermediate_object.components[component_name][0], component_volume))
 
+                for slot in range(0, slots_required):
+                    intermediate_as_source_layout.add_content(intermediate_well_range[well_index], unique_intermediate, volume_per_slot)
 
-                        intermediate_as_destination_layout.add_content(intermediate_well_range[well_index], intermediate_object.components[component_name][0], component_volume)
+                    # Add the components and volumes to the intermediate_as_destination layout
+                    volume_in_slot = 0
+                    for component, component_volume in component_volumes:
+                        intermediate_as_destination_layout.add_content(intermediate_well_range[well_index], component, component_volume)
                         volume_in_slot += component_volume
 
-
                     # If one of the components specified that it should be used to make up any remaining volume, deal with it now
                     if make_up_to_final_volume:
                         intermediate_as_destination_layout.add_content(intermediate_well_range[well_index], intermediate_object.components[make_up_to_final_volume][0], volume_per_slot - volume_in_slot)
@@ -333,10 +350,8 @@ class Template(_OTProto.OTProto_Template):
                     for well in intermediate_layout.get_wells_containing_liquid(source_id):
                         source_id_volume_required += intermediate_layout.get_volume_of_liquid_in_well(source_id, well)
 
-                # Do the above with the destination layout
-                destination_layout = self.labware_layouts["Destination"]
-                for well in destination_layout.get_wells_containing_liquid(source_id):
-                    source_id_volume_required += destination_layout.get_volume_of_liquid_in_well(source_id, well)
+                # Do the above with the destination layouts
+                source_id_volume_required += Destination_Liquid_Volumes.get(source_id, 0)
 
                 source_id_volume_required += source_id_volume_required * 0.1 # Add 10% more required volume for pipetting accuracy
 
@@ -280,7 +280,7 @@ class Template(_OTProto.OTProto_Template):
 
             # Try to find a source layout with empty wells which matches the labware type of the current source material
             ## Uses the first labware with any empty wells
-            source_layouts = [layout for layout in self.source_layouts if layout.type == labware_type and not len(layout.empty_wells) == 0]
+            source_layouts = [layout for layout in self.source_layouts if layout.type == labware_type and layout.get_next_empty_well() is not None]
             # Check if a source layout was found
             if source_layouts == []:
                 # If there were none, then create the layout
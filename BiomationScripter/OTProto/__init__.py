@@ -185,7 +185,7 @@ def get_locations(Labware, Wells, Direction = "Horizontal", Box = False):
     # Argument Direction is ignored is Wells is a list of wells
     ## It is only used if Wells is a well range (e.g. A1:H4)
     if not type(Wells) == list:
-        if not ":" in Wells:
+        if not _BMS._is_well_expression(Wells):
             Wells = [Wells]
         else:
             Wells = _BMS.well_range(
@@ -196,8 +196,9 @@ def get_locations(Labware, Wells, Direction = "Horizontal", Box = False):
             )
 
     Locations = []
+    wells_by_name = Labware.wells_by_name()
     for well in Wells:
-        Locations.append(Labware.wells_by_name()[well])
+        Locations.append(wells_by_name[well])
 
     return(Locations)
 
@@ -834,7 +835,8 @@ def calculate_tips_needed(protocol, transfers, template = None, new_tip = True):
 def tip_racks_needed(tips_needed, starting_tip_position = "A1"):
     if tips_needed == 0:
         return(0)
-    tips_in_first_rack = len(_BMS.well_range("{}:H12".format(starting_tip_position), [8,12], "Vertical"))
+    # Tips are used column by column, so count the tips from the starting position to the end of the rack
+    tips_in_first_rack = 96 - _BMS._get_well_table(8, 12).vertical_indices[starting_tip_position]
     if tips_needed > tips_in_first_rack:
         extra_racks_required = math.ceil((tips_needed - tips_in_first_rack)/96)
     else:
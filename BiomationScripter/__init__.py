@@ -1,7 +1,15 @@
 import os
+import json
+import hashlib
 import math as _math
+import functools
 import random
 import warnings
+import csv
+import collections.abc
+import concurrent.futures
+import itertools
+import time
 from typing import Dict, List, Union, Tuple
 from decimal import Decimal
 
@@ -10,6 +18,21 @@ try:
 except ImportError:
     warnings.warn("No pandas, continue at your own zoological peril 🐼")
 
+try:
+    import numpy as _np
+except ImportError:
+    _np = None
+
+try:
+    import openpyxl as _openpyxl
+except ImportError:
+    _openpyxl = None
+
+try:
+    import pulp as _pulp
+except ImportError:
+    _pulp = None
+
 # Exception classes #
 class BiomationError(Exception):
     """A general exception for BiomationScripter"""
@@ -115,36 +138,13 @@ class DoE_Experiment:
         self.materials = {}
         self.intermediates = {}
 
-        # Open the CSV file containing the DoE run data
-        file = open(DoE_File, "r")
-        # Store the DoE data from the file as a list
-        data = []
-        for row in file:
-            data.append(row)
-
-        # Close the file
-        file.close()
-
-        # Remove any empty lines imported
-        if "" in data:
-            data.remove("")
-
-        # Get the factor names
-        self.factors = data[0].replace("\n", "").split(",")
-
-        # store run data using the DoE_Run_Data class
-        self.runs = []
-        ID = 0
-        for run in data[1:]:
-            # remove new line symbols if present, and convert string to a list
-            run = run.replace("\n", "").split(",")
-            if "" in run:
-                raise ValueError(
-                    f"Missing value found in run {ID} for factor {self.factors[run.index('')]}; "
-                    "check that all values are present and objectives are not present in the file."
-                )
-            self.runs.append(DoE_Run_Data(ID, self.factors, run))
-            ID += 1
+        # Read the DoE run data into columns; DoE_File can be a CSV file path, a CSV text buffer, or a pandas DataFrame
+        self.factors, self._columns = _load_doe_columns(DoE_File)
+
+        # store run data using DoE_Run_Data views of the columns
+        self.runs = [DoE_Run_Data._view(ID, self._columns, ID) for ID in range(self._columns.n_runs)]
+        self._runs_by_id = {run.id: run for run in self.runs}
+        self._runs_by_row = self.runs.copy()
 
     def add_material(self, Material):
         self.materials[Material.id] = Material
@@ -159,85 +159,186 @@ class DoE_Experiment:
         return self.intermediates[Intermediate_Name]
 
     def get_run(self, ID):
-        for run in self.runs:
-            if run.id == ID:
-                return run
+        return self._runs_by_id.get(ID)
 
     def batch_by_factor_value(self, Factor, Value):
-        batched_experiment = DoE_Experiment(
-            "{}-Batched-{}-{}".format(self.name, Factor, Value), self.doe_file
+        return self.batch_by_factor_values(
+            {Factor: Value}, Name="{}-Batched-{}-{}".format(self.name, Factor, Value)
         )
-        runs = batched_experiment.runs.copy()
-        for run in runs:
-            if not run.get_factor_value(Factor) == Value:
-                batched_experiment.runs.remove(run)
-        return batched_experiment
-
-    def get_all_values(self, Name):
-        Values = []
-        for run in self.runs:
-            Values.append(run.get_value_by_name(Name))
 
-        return Values
+    def batch_by_factor_values(self, Factor_Values, Name=None):
+        """Returns a batch of the runs where every factor in Factor_Values ({Factor: Value}) has the specified value.
+
+        A list of values can be given for a factor to match any of them. Values which aren't strings are compared with the typed factor values.
+        """
+        rows = [run._row for run in self.runs]
+        for factor, values in Factor_Values.items():
+            if not type(values) in (list, tuple, set, frozenset):
+                values = [values]
+            values = set(values)
+            column = self._columns.factors.get(factor)
+            if column is None:
+                raise DoEError("{} is not a factor in {}.".format(factor, self.name))
+            typed_column = self._columns.get_typed_factor(factor)
+            rows = [row for row in rows if column[row] in values or typed_column[row] in values]
+
+        if Name is None:
+            Name = "{}-Batched-{}".format(
+                self.name, "-".join("{}-{}".format(factor, value) for factor, value in Factor_Values.items())
+            )
+        return self._batch(Name, rows)
+
+    def filter_runs(self, Predicate, Name=None):
+        """Returns a batch of the runs for which Predicate(run) is True."""
+        if Name is None:
+            Name = "{}-Filtered".format(self.name)
+        return self._batch(Name, [run._row for run in self.runs if Predicate(run)])
+
+    def split_into_batches(self, Max_Runs_Per_Batch):
+        """Splits the runs, in order, into batches of at most Max_Runs_Per_Batch runs (e.g. the number of runs which fit in one plate)."""
+        if Max_Runs_Per_Batch < 1:
+            raise ValueError("`Max_Runs_Per_Batch` must be at least 1")
+        rows = [run._row for run in self.runs]
+        return [
+            self._batch("{}-Batch-{}".format(self.name, batch_number + 1), rows[start : start + Max_Runs_Per_Batch])
+            for batch_number, start in enumerate(range(0, len(rows), Max_Runs_Per_Batch))
+        ]
+
+    def _batch(self, Name, Rows):
+        # Batches are views of this experiment's run data; they start with copies of its materials and intermediates,
+        # so those added to one batch aren't added to the parent or to other batches
+        batch = DoE_Experiment.__new__(DoE_Experiment)
+        batch.name = Name
+        batch.doe_file = self.doe_file
+        batch.materials = self.materials.copy()
+        batch.intermediates = self.intermediates.copy()
+        batch.factors = self.factors
+        batch._columns = self._columns
+        batch.runs = [self._runs_by_row[row] for row in Rows]
+        batch._runs_by_id = {run.id: run for run in batch.runs}
+        batch._runs_by_row = self._runs_by_row
+        return batch
+
+    def group_by(self, Names, Typed=False):
+        """Groups the runs by the values of one or more factors, source materials, or intermediates.
+
+        Returns a list of the unique combinations of values, as tuples in the order they first appear, and a list of
+        the index of each run's combination in that list.
+        """
+        return _group_rows([self.get_all_values(name, Typed) for name in Names])
+
+    def _get_column_values(self, Values, Name):
+        # Values of one column (e.g. self._columns.factors[Name]) for each run of this experiment
+        column = Values.get(Name)
+        if column is None:
+            raise KeyError(Name)
+        run_values = [column[run._row] for run in self.runs]
+        if None in run_values:
+            raise KeyError(Name)
+        return run_values
+
+    def _set_column_values(self, Values, Name, Run_Values):
+        self._columns.set_values(Values, Name, [run._row for run in self.runs], Run_Values)
+
+    def _set_column_keys(self, Values, Name, Run_Keys):
+        self._columns.set_keys(Values, Name, [run._row for run in self.runs], Run_Keys)
+
+    def get_factor_type(self, Factor):
+        """Returns "numeric" if every value of the factor is a number, otherwise "categorical"."""
+        return self._columns.factor_types[Factor]
+
+    def get_all_values(self, Name, Typed=False):
+        """Returns the value of a factor, source material, or intermediate for every run.
+
+        If Typed is True, values of numeric factors are returned as int or float rather than str.
+        """
+        sources = self._columns.resolve(Name)
+        if len(sources) == 1:
+            kind, column = sources[0]
+            if Typed and kind == "factor":
+                column = self._columns.get_typed_factor(Name)
+            Values = [column[run._row] for run in self.runs]
+            if None not in Values:
+                return Values
+
+        # Some runs are missing values, or the name is used more than once, so each run is checked in turn
+        return [run.get_value_by_name(Name, Typed) for run in self.runs]
+
+    def get_ambiguous_names(self):
+        """Returns a dictionary of names used by more than one of the factors, source materials, and intermediates, and what they are used by."""
+        return self._columns.get_ambiguous_names()
 
 
 class DoE_Run_Data:
+    """The data for a single run of a `DoE_Experiment`.
+
+    Runs of an experiment are views of one row of the experiment's column store, so changes made through a run are
+    seen by the experiment. Runs created directly keep their own values in a `_DoE_Row`.
+    """
+
+    __slots__ = ("id", "_columns", "_row")
+
     def __init__(self, ID, Factors, Values):
         self.id = ID
-        self.source_materials = {}
-        self.intermediates = {}
-        self.run_data = {}
-        for factor, value in zip(Factors, Values):
-            self.run_data[factor] = value
-
-    def get_factor_value(self, Factor):
-        return self.run_data[Factor]
+        self._columns = _DoE_Row(Factors, Values)
+        self._row = 0
+
+    @classmethod
+    def _view(cls, ID, Columns, Row):
+        run = cls.__new__(cls)
+        run.id = ID
+        run._columns = Columns
+        run._row = Row
+        return run
+
+    # Changes made through run_data, source_materials, and intermediates are written to the run
+    @property
+    def run_data(self):
+        return self._columns.get_row(self._columns.factors, self._row)
+
+    @property
+    def source_materials(self):
+        return self._columns.get_row(self._columns.source_materials, self._row)
+
+    @property
+    def intermediates(self):
+        return self._columns.get_row(self._columns.intermediates, self._row)
+
+    def get_factor_value(self, Factor, Typed=False):
+        value = self._columns.get_value(self._columns.factors, Factor, self._row)
+        if Typed:
+            return self._columns.get_typed_value(Factor, self._row)
+        return value
 
     def add_factor(self, Factor, Value):
-        self.run_data[Factor] = Value
+        self._columns.set_value(self._columns.factors, Factor, self._row, Value)
 
     def specify_source_material(self, Material, Value):
-        self.source_materials[Material] = Value
+        self._columns.set_value(self._columns.source_materials, Material, self._row, Value)
 
     def get_source_material_value(self, Source_Material):
-        return self.source_materials[Source_Material]
+        return self._columns.get_value(self._columns.source_materials, Source_Material, self._row)
 
     def specify_intermediate(self, Intermediate, Value):
-        self.intermediates[Intermediate] = Value
+        self._columns.set_value(self._columns.intermediates, Intermediate, self._row, Value)
 
     def get_intermediate_value(self, Intermediate):
-        return self.intermediates[Intermediate]
+        return self._columns.get_value(self._columns.intermediates, Intermediate, self._row)
 
-    def get_value_by_name(self, Name):
-        found = False
-        Value = None
-        if not found:
-            try:
-                Value = self.get_factor_value(Name)
-                found = True
-            except KeyError:
-                pass
-        if not found:
-            try:
-                Value = self.get_source_material_value(Name)
-                found = True
-            except KeyError:
-                pass
-        if not found:
-            try:
-                Value = self.get_intermediate_value(Name)
-                found = True
-            except KeyError:
-                pass
-        if not found:
+    def get_value_by_name(self, Name, Typed=False):
+        # Factors are checked first, then source materials, then intermediates
+        value = self._columns.get_value_by_name(Name, self._row, Typed)
+        if value is None:
             raise DoEError("Cannot find {}.".format(Name))
-        else:
-            return Value
+        return value
 
 
 class Labware_Content:
     """This class is used by `Labware_Layout` to store content information."""
 
+    # Slots keep each content record small, as there is one per liquid per well
+    __slots__ = ("name", "volume", "liquid_class")
+
     def __init__(self, Name: str, Volume: Union[float, int], Liquid_Class: Union[str, None] = None):
         self.name = Name
         self.volume = Volume
@@ -247,6 +348,55 @@ class Labware_Content:
         return [self.name, self.volume, self.liquid_class]
 
 
+class Volume_Matrix:
+    """This class is used by `Labware_Layout` to store the volume of each liquid in each well as a dense array.
+
+    Volumes are stored with the shape (rows, columns, liquids), where the index of each liquid is given by the `liquids` vocabulary.
+    Requires numpy.
+    """
+
+    def __init__(self, Rows: int, Columns: int):
+        if _np is None:
+            raise ImportError("numpy is required to use a Volume_Matrix")
+        self.rows = Rows
+        self.columns = Columns
+        self.liquids: List[str] = []
+        self.liquid_indices: Dict[str, int] = {}
+        # The liquid axis is over-allocated and grown by doubling, so adding liquids is amortised O(1)
+        self._volumes = _np.zeros((Rows, Columns, 8), dtype=float)
+        # Tracks which wells contain a liquid, as a liquid may be present at 0 uL
+        self._present = _np.zeros((Rows, Columns, 8), dtype=bool)
+
+    @property
+    def volumes(self):
+        return self._volumes[:, :, : len(self.liquids)]
+
+    def get_liquid_index(self, Liquid: str):
+        if Liquid not in self.liquid_indices:
+            if len(self.liquids) == self._volumes.shape[2]:
+                self._volumes = _np.concatenate((self._volumes, _np.zeros_like(self._volumes)), axis=2)
+                self._present = _np.concatenate((self._present, _np.zeros_like(self._present)), axis=2)
+            self.liquid_indices[Liquid] = len(self.liquids)
+            self.liquids.append(Liquid)
+        return self.liquid_indices[Liquid]
+
+    def set_volume(self, Row: int, Column: int, Liquid: str, Volume: float, Present: bool = True):
+        index = self.get_liquid_index(Liquid)
+        self._volumes[Row, Column, index] = Volume
+        self._present[Row, Column, index] = Present
+
+    def get_well_totals(self):
+        return self.volumes.sum(axis=2)
+
+    def get_liquid_totals(self):
+        return dict(zip(self.liquids, self.volumes.sum(axis=(0, 1)).tolist()))
+
+    def get_liquid_mask(self, Liquid: str):
+        if Liquid not in self.liquid_indices:
+            return _np.zeros((self.rows, self.columns), dtype=bool)
+        return self._present[:, :, self.liquid_indices[Liquid]].copy()
+
+
 class Assembly:
     """This class is used to store basic information about a DNA assembly."""
 
@@ -270,9 +420,24 @@ class Labware_Layout:
         self.columns: int = None
         self.content: Dict[str, List[Labware_Content]] = {}
         self.available_wells: List[str] = None
-        self.empty_wells: List[str] = None
+        # Tracks which of the available wells are still empty, in available well order
+        self._free_wells: _Well_Allocator = None
         self.well_labels: Dict[str, str] = {}
-
+        # Label -> well, kept in sync with self.well_labels
+        self._wells_by_label: Dict[str, str] = {}
+        # Reagent name -> {well: number of entries}, used to find wells containing a liquid
+        self._wells_by_liquid: Dict[str, Dict[str, int]] = {}
+        # Well -> position in which the well was added to self.content
+        self._well_order: Dict[str, int] = {}
+        self._well_counter: int = 0
+        # Optional dense copy of the content, created by `use_volume_matrix`
+        self.volume_matrix: Volume_Matrix = None
+
+    @property
+    def empty_wells(self) -> List[str]:
+        if self._free_wells is None:
+            return None
+        return self._free_wells.get_free_wells()
 
     def get_total_volume_of_liquid(self, Liquid):
         wells = self.get_wells_containing_liquid(Liquid)
@@ -283,8 +448,43 @@ class Labware_Layout:
         return float(total_volume)
 
     def define_format(self, Rows: int, Columns: int):
+        if Rows < 1 or Columns < 1:
+            raise LabwareError(f"{self.name} must have at least one row and one column, not {Rows} rows and {Columns} columns.")
         self.rows = Rows
         self.columns = Columns
+        if self.volume_matrix is not None:
+            self.use_volume_matrix()
+
+    def use_volume_matrix(self):
+        """Keeps a dense `Volume_Matrix` of the layout's content, used for whole-plate volume calculations.
+
+        The matrix is kept up to date by the methods which change content; `get_content` is unchanged.
+        """
+        if self.rows is None or self.columns is None:
+            raise LabwareError(f"The format of {self.name} must be defined before a volume matrix can be used.")
+        self.volume_matrix = Volume_Matrix(self.rows, self.columns)
+        for well in self.content:
+            for liquid in set(content.name for content in self.content[well]):
+                self._sync_volume_matrix(well, liquid)
+        return self.volume_matrix
+
+    def get_well_volume_totals(self):
+        """Returns an array of the total volume in each well, with the shape (rows, columns)."""
+        if self.volume_matrix is None:
+            self.use_volume_matrix()
+        return self.volume_matrix.get_well_totals()
+
+    def get_liquid_volume_totals(self):
+        """Returns a dictionary of the total volume of each liquid in the layout."""
+        if self.volume_matrix is None:
+            self.use_volume_matrix()
+        return self.volume_matrix.get_liquid_totals()
+
+    def get_liquid_mask(self, Liquid):
+        """Returns a boolean array, with the shape (rows, columns), of the wells which contain a liquid."""
+        if self.volume_matrix is None:
+            self.use_volume_matrix()
+        return self.volume_matrix.get_liquid_mask(Liquid)
 
     def get_format(self):
         return (self.rows, self.columns)
@@ -293,7 +493,7 @@ class Labware_Layout:
         self, Well_Range=None, Use_Outer_Wells=True, Direction="Horizontal", Box=False
     ):
         self.available_wells = self.get_well_range(Well_Range, Use_Outer_Wells, Direction, Box)
-        self.empty_wells = self.available_wells.copy()
+        self._free_wells = _Well_Allocator(self.available_wells)
 
     def get_available_wells(self):
         return self.available_wells
@@ -304,45 +504,27 @@ class Labware_Layout:
         if not Direction == "Horizontal" and not Direction == "Vertical":
             raise ValueError("`Direction` must be either 'Horizontal' or 'Vertical'")
 
-        n_rows = self.rows
-        n_cols = self.columns
+        well_table = _get_well_table(self.rows, self.columns)
         if Well_Range is None:
-            Well_Range = "A1:{}{}".format(chr(64 + n_rows), n_cols)
-
-        wells = well_range(Well_Range, Labware_Format=self, Direction=Direction, Box=Box)
+            if Direction == "Horizontal":
+                wells = list(well_table.horizontal)
+            else:
+                wells = list(well_table.vertical)
+            if not Use_Outer_Wells:
+                outer_mask = well_table.outer_mask
+                horizontal_indices = well_table.horizontal_indices
+                wells = [w for w in wells if not outer_mask[horizontal_indices[w]]]
+            return wells
 
+        indices = _compile_well_expression(Well_Range, self.rows, self.columns, Direction, Box)
         if not Use_Outer_Wells:
-            plate_first_row = "A"
-            plate_last_row = chr(64 + n_rows)
-            plate_first_col = 1
-            plate_last_col = n_cols
-
-            temp_wells = []
-            for w in wells:
-                if (
-                    (plate_first_row in w)
-                    or (plate_last_row in w)
-                    or (str(plate_first_col) == w[1:])
-                    or (str(plate_last_col) == w[1:])
-                ):
-                    continue
-                else:
-                    temp_wells.append(w)
-            wells = temp_wells
-
-        return wells
+            outer_mask = well_table.outer_mask
+            indices = [index for index in indices if not outer_mask[index]]
+        return [well_table.horizontal[index] for index in indices]
 
     def check_well(self, Well):
-        Row = Well[0]
-        Column = int(Well[1:])
-        InRange = None
-        if Row > chr(64 + self.rows):
-            InRange = False
-        elif Column > self.columns:
-            InRange = False
-        else:
-            InRange = True
-        return InRange
+        Row, Column = _parse_well(Well)
+        return Row < self.rows and 0 <= Column < self.columns
 
     def clone_format(self, New_Name):
         # Does not copy content
@@ -355,65 +537,108 @@ class Labware_Layout:
         return plate_copy
 
     def bulk_add_content(self, Wells, Reagents, Volumes, Liquid_Classes = None):
-        if type(Volumes) is int or type(Volumes) is float:
-            Volumes = [Volumes] * len(Wells)
-        if Liquid_Classes is None:
-            for well, reagent, volume in zip(Wells, Reagents, Volumes):
-                self.add_content(well, reagent, volume)
+        """Adds content to many wells in one pass.
+
+        `Wells` can be a list of wells or a well range expression, and items of a list can also be well range expressions.
+        `Reagents`, `Volumes` and `Liquid_Classes` can each be a sequence with one entry per item of `Wells`, or a single
+        value which is used for every well.
+        All wells and volumes are checked before any content is added.
+        """
+        if type(Wells) is str:
+            Wells = well_range(Wells, Labware_Format=self)
         else:
+            Wells = list(Wells)
+        n_wells = len(Wells)
+
+        if Liquid_Classes is None:
+            Liquid_Classes = "Unknown"
+        Reagents = _broadcast_to_wells(Reagents, n_wells, "Reagents")
+        Volumes = _broadcast_to_wells(Volumes, n_wells, "Volumes")
+        Liquid_Classes = ["Unknown" if liquid_class is None else liquid_class
+            for liquid_class in _broadcast_to_wells(Liquid_Classes, n_wells, "Liquid_Classes")]
+
+        # Items which are well range expressions are expanded, and their values repeated for each well in the range
+        if any(_is_well_expression(well) for well in Wells):
+            expanded = ([], [], [], [])
             for well, reagent, volume, liquid_class in zip(Wells, Reagents, Volumes, Liquid_Classes):
-                self.add_content(well, reagent, volume, liquid_class)
+                wells = well_range(well, Labware_Format=self) if _is_well_expression(well) else [well]
+                expanded[0].extend(wells)
+                expanded[1].extend([reagent] * len(wells))
+                expanded[2].extend([volume] * len(wells))
+                expanded[3].extend([liquid_class] * len(wells))
+            Wells, Reagents, Volumes, Liquid_Classes = expanded
 
-    def add_content(self, Well, Reagent, Volume, Liquid_Class=None):
-        Volume = Volume
-        if Volume < 0:
+        # Volume should always be uL
+        Volumes = [float(volume) for volume in Volumes]
+        if Volumes and min(Volumes) < 0:
             raise NegativeVolumeError
 
-        if self.available_wells and ":" not in Well and not type(Well) == list:
-            if Well not in self.available_wells:
+        if self.available_wells:
+            available_wells = set(self.available_wells)
+            unavailable_wells = [well for well in dict.fromkeys(Wells) if well not in available_wells]
+            if unavailable_wells:
                 raise LabwareError(
-                    f"Available wells are specified, but well {Well} is not defined as available. "
+                    f"Available wells are specified, but well(s) {', '.join(unavailable_wells)} are not defined as available. "
                     "Check that the correct well has been specified. "
                     f"Available wells are: {self.available_wells}\n"
                 )
 
-        # Volume should always be uL
-        if Liquid_Class is None:
-            Liquid_Class = "Unknown"
-        if ":" in Well:
-            for w in well_range(Well, Labware_Format=self):
-                self.add_content(w, Reagent, Volume, Liquid_Class)
-        elif type(Well) == list:
-            for well in Well:
-                self.add_content(well, Reagent, Volume, Liquid_Class)
-        elif Well in self.content:
-            self.content[Well].append(Labware_Content(Reagent, float(Volume), Liquid_Class))
-        else:
-            self.content[Well] = [Labware_Content(Reagent, float(Volume), Liquid_Class)]
+        if self.volume_matrix is not None:
+            outside_wells = [well for well in dict.fromkeys(Wells) if not self.check_well(well)]
+            if outside_wells:
+                raise LabwareError(f"Well(s) {', '.join(outside_wells)} are outside the format of {self.name}.")
+
+        self._insert_content(Wells, Reagents, Volumes, Liquid_Classes)
+
+    def add_content(self, Well, Reagent, Volume, Liquid_Class=None):
+        if Volume < 0:
+            raise NegativeVolumeError
 
-        if self.empty_wells and Well in self.empty_wells:
-            self.empty_wells.remove(Well)
+        if type(Well) == list:
+            wells = Well
+        elif _is_well_expression(Well):
+            wells = well_range(Well, Labware_Format=self)
+        else:
+            wells = [Well]
+
+        self.bulk_add_content(wells, Reagent, Volume, Liquid_Class)
+
+    def _insert_content(self, Wells, Reagents, Volumes, Liquid_Classes):
+        # Adds already validated content, keeping the liquid index, volume matrix and free wells up to date
+        content = self.content
+        well_order = self._well_order
+        free_wells = self._free_wells
+        for well, reagent, volume, liquid_class in zip(Wells, Reagents, Volumes, Liquid_Classes):
+            if well in content:
+                content[well].append(Labware_Content(reagent, volume, liquid_class))
+            else:
+                content[well] = [Labware_Content(reagent, volume, liquid_class)]
+                well_order[well] = self._well_counter
+                self._well_counter += 1
+            self._index_liquid(well, reagent)
+            self._sync_volume_matrix(well, reagent)
+            if free_wells is not None:
+                free_wells.allocate(well)
 
     def add_well_label(self, Well: str, Label: str):
-        for well in self.well_labels:
-            if self.well_labels[well] == Label:
-                raise LabwareError(
-                    'Label "{}" is already used as a label in {}'.format(Label, well)
-                )
+        if Label in self._wells_by_label:
+            raise LabwareError(
+                'Label "{}" is already used as a label in {}'.format(Label, self._wells_by_label[Label])
+            )
+        # Re-labelling a well replaces its previous label
+        if Well in self.well_labels:
+            del self._wells_by_label[self.well_labels[Well]]
         self.well_labels[Well] = Label
+        self._wells_by_label[Label] = Well
 
     def get_well_content_by_label(self, Label: str):
-        for well in self.well_labels:
-            if self.well_labels[well] == Label:
-                return self.content[well]
-        return None
+        well = self._wells_by_label.get(Label)
+        if well is None:
+            return None
+        return self.content[well]
 
     def get_well_location_by_label(self, Label: str):
-        for well in self.well_labels:
-            if self.well_labels[well] == Label:
-                return well
-
-        return None
+        return self._wells_by_label.get(Label)
 
     def get_content(self):
         return self.content
@@ -433,31 +658,43 @@ class Labware_Layout:
         return liquids_in_well
 
     def get_wells_containing_liquid(self, Liquid_Name):
+        wells_with_liquid = self._wells_by_liquid.get(Liquid_Name)
+        if not wells_with_liquid:
+            return []
+        # Return wells in the order they appear in self.content; a well is listed once per matching entry
         wells_to_return = []
-        content = self.get_content()
-        wells = self.get_occupied_wells()
-        for well in wells:
-            for liquid in content[well]:
-                if liquid.name == Liquid_Name:
-                    wells_to_return.append(well)
+        for well in sorted(wells_with_liquid, key=self._well_order.__getitem__):
+            wells_to_return += [well] * wells_with_liquid[well]
         return wells_to_return
 
     def clear_content(self):
         self.content = {}
+        self._wells_by_liquid = {}
+        self._well_order = {}
+        if self.volume_matrix is not None:
+            self.use_volume_matrix()
         if self.available_wells:
-            self.empty_wells = self.available_wells.copy()
+            self._free_wells = _Well_Allocator(self.available_wells)
 
     def clear_content_from_well(self, Well):
+        for content in self.content[Well]:
+            self._unindex_liquid(Well, content.name)
+        liquids = set(content.name for content in self.content[Well])
         del self.content[Well]
+        del self._well_order[Well]
+        for liquid in liquids:
+            self._sync_volume_matrix(Well, liquid)
 
-        if self.empty_wells:
-            self.empty_wells.append(Well)
+        if self._free_wells is not None:
+            self._free_wells.release(Well)
 
     def clear_liquid_in_well(self, Well, Liquid):
         well_contents = self.content[Well].copy()
         for content in well_contents:
             if Liquid == content.name:
                 self.content[Well].remove(content)
+                self._unindex_liquid(Well, Liquid)
+        self._sync_volume_matrix(Well, Liquid)
 
         # Check if the well is now empty
         if len(self.content[Well]) == 0:
@@ -470,12 +707,8 @@ class Labware_Layout:
                 "Available wells must be specified to get the next empty well. "
                 f"Specify the avilable wells for {self.name} using `.set_available_wells`."
             )
-        if len(self.empty_wells) == 0:
-            return None
-        # Iterate through all available wells, and return the first one which also exists in the empty wells attribute
-        for well in self.available_wells:
-            if well in self.empty_wells:
-                return well
+        # Returns None if there are no empty wells left
+        return self._free_wells.next_free()
 
     def get_volume_of_liquid_in_well(self, Liquid, Well):
         # if not Well in self.get_occupied_wells():
@@ -494,10 +727,34 @@ class Labware_Layout:
                     Well
                 )
             )
+        # Only volumes change here, so the liquid index does not need updating
         well_content = self.get_content()[Well]
         for content in well_content:
             if content.name == Reagent:
                 content.volume = float(Volume)
+        self._sync_volume_matrix(Well, Reagent)
+
+    def _index_liquid(self, Well, Liquid):
+        wells_with_liquid = self._wells_by_liquid.setdefault(Liquid, {})
+        wells_with_liquid[Well] = wells_with_liquid.get(Well, 0) + 1
+
+    def _sync_volume_matrix(self, Well, Liquid):
+        if self.volume_matrix is None:
+            return
+        row, column = _parse_well(Well)
+        if not (row < self.rows and 0 <= column < self.columns):
+            raise LabwareError(f"Well {Well} is outside the format of {self.name}.")
+        entries = [content.volume for content in self.content.get(Well, []) if content.name == Liquid]
+        self.volume_matrix.set_volume(row, column, Liquid, sum(entries), Present=len(entries) > 0)
+
+    def _unindex_liquid(self, Well, Liquid):
+        wells_with_liquid = self._wells_by_liquid[Liquid]
+        if wells_with_liquid[Well] == 1:
+            del wells_with_liquid[Well]
+            if not wells_with_liquid:
+                del self._wells_by_liquid[Liquid]
+        else:
+            wells_with_liquid[Well] -= 1
 
     def print(self):
         print("\033[1mInformation for " + self.name + "\033[0m")
@@ -513,45 +770,29 @@ class Labware_Layout:
                 print(well + "\t" + str(c.volume) + "\t\t" + c.liquid_class + "\t\t" + c.name)
         return content_return
 
-    def import_labware(self, filename, path="~", ext=".xlsx"):
-        return self.import_plate(filename, path, ext)
+    def import_labware(self, filename, path="~", ext=".xlsx", use_cache=False):
+        return self.import_plate(filename, path, ext, use_cache)
 
     # create a dummy PlateLayout object before running this method
-    def import_plate(self, filename, path="~", ext=".xlsx"):
+    def import_plate(self, filename, path="~", ext=".xlsx", use_cache=False):
         # check if filename contains the extension
         # NOTE: this only checks for a "." so could easily throw errors if given atypical input
         if "." in filename:
-            # look at Sheet1 (the Plate Metadata)
-            sheet1 = pd.read_excel(path + filename, sheet_name=0, header=None, engine="openpyxl")
-            # look at Sheet2 (the Well lookup)
-            sheet2 = pd.read_excel(path + filename, sheet_name=1, engine="openpyxl")
+            file_path = path + filename
         else:
             # add extension (default = ".xlsx") to arg1
-            sheet1 = pd.read_excel(
-                path + filename + ext, sheet_name=0, header=None, engine="openpyxl"
-            )
-            sheet2 = pd.read_excel(path + filename + ext, sheet_name=1, engine="openpyxl")
+            file_path = path + filename + ext
+
+        if use_cache:
+            name, type, wells, reagents, volumes, liquid_classes = _read_layout_workbook_cached(file_path)
+        else:
+            name, type, wells, reagents, volumes, liquid_classes = _read_layout_workbook(file_path)
 
         # get plate name and plate type from Sheet 1
         # TODO: throw an error message if the name and/or type are blank
-        self.name = sheet1[1].iloc[0]  # column 2, row 1
-        self.type = sheet1[1].iloc[1]  # column 2, row 2
-
-        # if Current Volume column is empty (NaN), replace with Initial Volume
-        sheet2["Volume (uL) - Current"].fillna(sheet2["Volume (uL) - Initial"], inplace=True)
-        # if both Volume columns are empty, replace with zeroes
-        # TODO: add a warning to the user to say they are empty
-        sheet2["Volume (uL) - Current"].fillna(0, inplace=True)
-        # TODO: add a warning that liquid class has been set to a default value
-        sheet2["Calibration Type"].fillna("AQ_BP", inplace=True)
-        # select subset of columns as "content"
-        content = sheet2[["Well", "Name", "Volume (uL) - Current", "Calibration Type"]]
-        # delete rows where the Name is blank
-        content = content.dropna(subset=["Name"])
-        # iterate over rows
-        for row in content.itertuples(index=False):
-            # add contents to PlateLayout object
-            self.add_content(row[0], row[1], row[2], row[3])
+        self.name = name
+        self.type = type
+        self.bulk_add_content(wells, reagents, volumes, liquid_classes)
         return self
 
 
@@ -662,45 +903,45 @@ def DoE_Get_Value_From_Combined_Factor(Factor_Name, Combined_Factor):
 def DoE_Create_Source_Material(
     DoE_Experiment, Source_Material_Name, Factor_Names, Add_To_Runs=True
 ):
-    # Create an empty list to store each of source material types
     # Each source material type is formed from combinations of the same factors...
     # ... with different values as specified by the DoE
-    Source_Material_Types = []
-
-    Source_Material_Component_Info = {}  # ID: list(Factor Values)
+    # Returns the source material type of each run, as a list
 
     if Factor_Names:
-        # For each run in the DoE
-        for run in DoE_Experiment.runs:
-            # Get the values of all the specified factors
-            source_material_type = []
-            component_factor_values = []
-            for component_factor in Factor_Names:
-                component_factor_value = run.get_factor_value(component_factor)
-                component_factor_values.append(component_factor_value)
-                # Store the factor name-value combination as a string in a list
-                source_material_type.append(
-                    "{}({})".format(component_factor, component_factor_value)
-                )
-            # Convert the list of factor name-value combinations to a string and add to the previously created list
-            Source_Material_Types.append("-".join(source_material_type))
-            Source_Material_Component_Info["-".join(source_material_type)] = component_factor_values
-            if Add_To_Runs:
-                run.specify_source_material(Source_Material_Name, "-".join(source_material_type))
-        for material_id in set(Source_Material_Types):
+        # Group the runs by the unique combinations of the factor values
+        factor_values = [
+            DoE_Experiment._get_column_values(DoE_Experiment._columns.factors, factor) for factor in Factor_Names
+        ]
+        combinations, codes = _group_rows(factor_values)
+
+        # Runs store the key of their combination; source material IDs (e.g. "Factor1(Value)-Factor2(Value)") are
+        # only rendered once per combination
+        material_keys = [_DoE_Key(zip(Factor_Names, combination)) for combination in combinations]
+        material_ids = [_render_doe_id(key) for key in material_keys]
+        Source_Material_Types = [material_ids[code] for code in codes]
+        if Add_To_Runs:
+            DoE_Experiment._set_column_keys(
+                DoE_Experiment._columns.source_materials,
+                Source_Material_Name,
+                [material_keys[code] for code in codes],
+            )
+
+        for material_id, combination in zip(material_ids, combinations):
             Material_Object = DoE_Material(
                 material_id,
                 Source_Material_Name,
                 Factor_Names,
-                Source_Material_Component_Info[material_id],
+                list(combination),
             )
             DoE_Experiment.add_material(Material_Object)
     else:
         Source_Material_Types = [Source_Material_Name]
-        Source_Material_Component_Info = {Source_Material_Name: None}
         if Add_To_Runs:
-            for run in DoE_Experiment.runs:
-                run.specify_source_material(Source_Material_Name, Source_Material_Name)
+            DoE_Experiment._set_column_values(
+                DoE_Experiment._columns.source_materials,
+                Source_Material_Name,
+                [Source_Material_Name] * len(DoE_Experiment.runs),
+            )
 
         Material_Object = DoE_Material(Source_Material_Name, Source_Material_Name)
         DoE_Experiment.add_material(Material_Object)
@@ -716,51 +957,64 @@ def DoE_Create_Intermediate(
     Source_Materials_Amount_Values,
     Add_To_Runs=True,
 ):
-    # Create an empty list to store each of intermediate types
     # Each intermediate type is formed from combinations of the same source materials...
     # ... with different values as specified by the DoE
-    Intermediate_Types = []
+    # Returns the intermediate type of each run, as a list
+
+    # Check to see if any factors are specified as references for amounts of components to be added
+    # Different amounts of a source material being added results in extra combinations
+    # e.g. an intermediate type might be composed of a buffer and a chemical
+    # But the amount of chemical is determined by Factor-1, which has two values in the DoE
+    # Therefore, there will need to be two unique versions of the intermediate type to account for
+    # these differences
+    amount_references = [
+        amount_value in DoE_Experiment.factors for amount_value in Source_Materials_Amount_Values
+    ]
+
+    # Group the runs by the source materials used, and the values of any factors referenced as amounts
+    columns = []
+    for component_source_material, amount_value, is_reference in zip(
+        Source_Material_Names, Source_Materials_Amount_Values, amount_references
+    ):
+        columns.append(
+            DoE_Experiment._get_column_values(DoE_Experiment._columns.source_materials, component_source_material)
+        )
+        if is_reference:
+            columns.append(DoE_Experiment._get_column_values(DoE_Experiment._columns.factors, amount_value))
+    combinations, codes = _group_rows(columns)
 
+    # Runs store the key of their combination; intermediate IDs are only rendered once per combination
+    intermediate_keys = []
+    intermediate_ids = []
     Intermediate_Component_Info = {}
-
-    # For each run in the DoE
-    for run in DoE_Experiment.runs:
-        # Get the values of all the specified source_materials
-        intermediate_type = []
+    for combination in combinations:
+        values = iter(combination)
+        intermediate_key = []
         component_source_material_values = []
-        for component_source_material, amount_type, amount_value in zip(
-            Source_Material_Names, Source_Materials_Amount_Types, Source_Materials_Amount_Values
+        for component_source_material, amount_value, is_reference in zip(
+            Source_Material_Names, Source_Materials_Amount_Values, amount_references
         ):
-            component_source_material_value = run.get_source_material_value(
-                component_source_material
-            )
-
-            # Check to see if any factors are specified as references for amounts of components to be added
-            # Different amounts of a source material being added results in extra combinations
-            # e.g. an intermediate type might be composed of a buffer and a chemical
-            # But the amount of chemical is determined by Factor-1, which has two values in the DoE
-            # Therefore, there will need to be two unique versions of the intermediate type to account for
-            # these differences
-
-            if amount_value in DoE_Experiment.factors:
-                amount_value = run.get_factor_value(amount_value)
+            component_source_material_value = next(values)
+            if is_reference:
+                amount_value = next(values)
                 component_source_material = "{}[{}]".format(component_source_material, amount_value)
-
             component_source_material_values.append([component_source_material_value, amount_value])
-            # Store the source_material name-value combination as a string in a list
-            intermediate_type.append(
-                "{}({})".format(component_source_material, component_source_material_value)
-            )
-
-        # Convert the list of source_material name-value combinations to a string and add to the previously created list
-        Intermediate_Types.append("-".join(intermediate_type))
-        Intermediate_Component_Info["-".join(intermediate_type)] = component_source_material_values
-        if Add_To_Runs:
-            run.specify_intermediate(Intermediate_Name, "-".join(intermediate_type))
+            intermediate_key.append((component_source_material, component_source_material_value))
+        intermediate_key = _DoE_Key(intermediate_key)
+        intermediate_id = _render_doe_id(intermediate_key)
+        intermediate_keys.append(intermediate_key)
+        intermediate_ids.append(intermediate_id)
+        Intermediate_Component_Info[intermediate_id] = component_source_material_values
+
+    Intermediate_Types = [intermediate_ids[code] for code in codes]
+    if Add_To_Runs:
+        DoE_Experiment._set_column_keys(
+            DoE_Experiment._columns.intermediates, Intermediate_Name, [intermediate_keys[code] for code in codes]
+        )
 
-    for intermediate_id in set(Intermediate_Types):
-        component_ids = [id[0] for id in Intermediate_Component_Info[intermediate_id]]
-        component_amount_values = [id[1] for id in Intermediate_Component_Info[intermediate_id]]
+    for intermediate_id, component_info in Intermediate_Component_Info.items():
+        component_ids = [id[0] for id in component_info]
+        component_amount_values = [id[1] for id in component_info]
         Intermediate_Object = DoE_Intermediate(
             intermediate_id,
             Intermediate_Name,
@@ -774,50 +1028,236 @@ def DoE_Create_Intermediate(
     return Intermediate_Types
 
 
-def Reagent_Finder(Reagents: List[str], Directories: List[str]):
+class Reagent_Index:
+    """An index of which labware layout files, and which wells in them, contain each reagent.
+
+    The index is built by reading every layout file in a set of directories, and can be saved to disk so that only
+    files which have changed need to be read again when it is refreshed.
+    """
+
+    def __init__(self):
+        # File path -> {"mtime_ns", "size", "name", "reagents": {reagent: [wells]}}; name is None for files which aren't layouts
+        self.files: Dict[str, dict] = {}
+        self._locations: Dict[str, List[Tuple[str, List[str]]]] = None
+
+    def refresh(self, Directories: List[str], Processes: Union[int, None] = 1):
+        """Updates the index so that it matches the layout files currently in `Directories`.
+
+        New and changed files are read in this process, or in a pool of `Processes` processes if more than one is given
+        (`None` uses one per CPU). Files which aren't labware layouts are skipped, with a warning listing those read in
+        this refresh; any other error reading a file (e.g. a corrupt layout) is raised.
+        """
+        paths = []
+        for directory in Directories:
+            for file in os.listdir(directory + "/"):
+                path = os.path.join(directory + "/", file)
+                if os.path.isfile(path) and "~$" not in file:
+                    paths.append(path)
+
+        files = {}
+        paths_to_read = []
+        for path in paths:
+            stat = os.stat(path)
+            entry = self.files.get(path)
+            if entry is not None and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                files[path] = entry
+            else:
+                files[path] = None
+                paths_to_read.append(path)
+
+        if Processes == 1 or len(paths_to_read) < 2:
+            entries = map(_index_layout_file, paths_to_read)
+            for path, entry in zip(paths_to_read, entries):
+                files[path] = entry
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=Processes) as executor:
+                for path, entry in zip(paths_to_read, executor.map(_index_layout_file, paths_to_read)):
+                    files[path] = entry
+
+        skipped_paths = [path for path in paths_to_read if files[path] is not None and files[path]["name"] is None]
+        if skipped_paths:
+            warnings.warn(
+                "The following files are not labware layout files, and were skipped: {}".format(", ".join(skipped_paths))
+            )
+
+        self.files = {path: entry for path, entry in files.items() if entry is not None}
+        self._locations = None
+        return self
+
+    def find(self, Reagents: List[str]) -> Dict[str, List[Tuple[str, List[str]]]]:
+        """Returns a dictionary of each reagent to a list of (layout name, wells) for every layout it appears in."""
+        if self._locations is None:
+            self._locations = {}
+            for entry in self.files.values():
+                for reagent, wells in entry["reagents"].items():
+                    self._locations.setdefault(reagent, []).append((entry["name"], wells))
+        return {reagent: self._locations.get(reagent, []) for reagent in Reagents}
+
+    def save(self, Filename: str):
+        with open(Filename, "w") as file:
+            json.dump({"version": _REAGENT_INDEX_VERSION, "files": self.files}, file)
+
+    @classmethod
+    def load(cls, Filename: str):
+        """Loads a saved index, or returns an empty index if the file doesn't exist or can't be read."""
+        index = cls()
+        try:
+            with open(Filename) as file:
+                saved = json.load(file)
+        except (OSError, ValueError):
+            return index
+        if isinstance(saved, dict) and saved.get("version") == _REAGENT_INDEX_VERSION:
+            index.files = saved["files"]
+        return index
+
+
+def Find_Reagents(
+    Reagents: List[str], Directories: List[str], Index_File: str = None, Processes: Union[int, None] = 1
+) -> Dict[str, List[Tuple[str, List[str]]]]:
+    """Searches a list of directories containing labware layout files for a list of reagents.
+
+    Returns a dictionary of each reagent to a list of (layout name, wells) for every layout it appears in.
+    If `Index_File` is given, the index of the directories is loaded from and saved to it, so only changed files are read.
+    """
+    if Index_File is None:
+        index = Reagent_Index()
+    else:
+        index = Reagent_Index.load(Index_File)
+    index.refresh(Directories, Processes)
+    if Index_File is not None:
+        index.save(Index_File)
+    return index.find(Reagents)
+
+
+def Reagent_Finder(
+    Reagents: List[str], Directories: List[str], Index_File: str = None, Processes: Union[int, None] = 1
+):
     """Searches a list of directories containing labware layout files for a specified reagent.
 
     This function will search in the directories listed for files which appear to be BMS labware layout files.
     Any labware layout files found will then be searched for the specified reagents.
     The name of all reagents are then printed to OUT, along with the name of the labware layout they appear in and the well(s) they occupy.
+    The results are also returned, as by `Find_Reagents`.
     """
 
-    # Get all labware layouts in the specified directories
-    Files = []
-    for directory in Directories:
-        Files.append(
-            [
-                file
-                for file in os.listdir(directory + "/")
-                if os.path.isfile(os.path.join(directory + "/", file)) and "~$" not in file
-            ]
-        )
-
-    Layouts = []
-    for files, directory in zip(Files, Directories):
-        for file in files:
-            try:
-                Layouts.append(Import_Labware_Layout(Filename=file, path=directory + "/"))
-            except:
-                continue
+    results = Find_Reagents(Reagents, Directories, Index_File=Index_File, Processes=Processes)
 
     # Check if each reagent is in a labware file
     for reagent in Reagents:
         print("\n{}:".format(reagent))
-        for layout in Layouts:
-            if len(layout.get_wells_containing_liquid(reagent)) > 0:
-                print("> {}: {}".format(layout.name, layout.get_wells_containing_liquid(reagent)))
+        for layout_name, wells in results[reagent]:
+            print("> {}: {}".format(layout_name, wells))
+
+    return results
 
 
-def Import_Labware_Layout(Filename: str, path: str = "~", ext: str = ".xlsx"):
-    """Imports an Excel file with a standard layout and converts it to a BiomationScripter.Labware_Layout object."""
+def Import_Labware_Layout(Filename: str, path: str = "~", ext: str = ".xlsx", Use_Cache: bool = False):
+    """Imports an Excel file with a standard layout and converts it to a BiomationScripter.Labware_Layout object.
+
+    If Use_Cache is True, parsed layout files are cached on disk (see `set_layout_cache_directory`) and only re-read
+    when the file changes.
+    """
 
 
     labware_layout = Labware_Layout("name", "type")
-    labware_layout.import_labware(Filename, path=path, ext=ext)
+    labware_layout.import_labware(Filename, path=path, ext=ext, use_cache=Use_Cache)
     return labware_layout
 
 
+def set_layout_cache_directory(Directory: str):
+    """Sets the directory used to cache parsed labware layout files.
+
+    By default, the directory is taken from the BMS_LAYOUT_CACHE_DIR environment variable, or is ~/.cache/BiomationScripter/layouts.
+    """
+    global _layout_cache_directory
+    _layout_cache_directory = Directory
+
+
+def get_layout_cache_directory() -> str:
+    if _layout_cache_directory is not None:
+        return _layout_cache_directory
+    return os.environ.get(
+        "BMS_LAYOUT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "BiomationScripter", "layouts")
+    )
+
+
+def get_layout_cache_info() -> List[dict]:
+    """Returns information about each cached labware layout file, such as its path, modification time, size, hash, and number of wells."""
+    directory = get_layout_cache_directory()
+    if not os.path.isdir(directory):
+        return []
+
+    info = []
+    for file in sorted(os.listdir(directory)):
+        if not file.endswith(".json"):
+            continue
+        entry = _load_layout_cache_entry(os.path.join(directory, file))
+        if entry is None:
+            continue
+        info.append(
+            {
+                "path": entry["path"],
+                "mtime_ns": entry["mtime_ns"],
+                "size": entry["size"],
+                "sha256": entry["sha256"],
+                "n_wells": len(entry["layout"]["wells"]),
+                "cache_file": os.path.join(directory, file),
+            }
+        )
+    return info
+
+
+def prune_layout_cache(Max_Entries: int = None) -> int:
+    """Deletes cached labware layout files whose layout file no longer exists, then the least recently used cached
+    files until at most Max_Entries (by default, 256) are left. Returns the number deleted.
+    """
+    if Max_Entries is None:
+        Max_Entries = _MAX_LAYOUT_CACHE_ENTRIES
+    directory = get_layout_cache_directory()
+    if not os.path.isdir(directory):
+        return 0
+
+    n_deleted = 0
+    kept = []
+    for file in os.listdir(directory):
+        if not file.endswith(".json"):
+            continue
+        cache_file = os.path.join(directory, file)
+        entry = _load_layout_cache_entry(cache_file)
+        try:
+            if entry is None or not os.path.exists(entry["path"]):
+                os.remove(cache_file)
+                n_deleted += 1
+            else:
+                kept.append((os.stat(cache_file).st_mtime_ns, cache_file))
+        except OSError:
+            pass
+
+    # Cache files are rewritten when used, so the oldest were used least recently
+    kept.sort()
+    for mtime, cache_file in kept[: max(0, len(kept) - Max_Entries)]:
+        try:
+            os.remove(cache_file)
+            n_deleted += 1
+        except OSError:
+            pass
+    return n_deleted
+
+
+def clear_layout_cache() -> int:
+    """Deletes all cached labware layout files, and returns the number deleted."""
+    directory = get_layout_cache_directory()
+    if not os.path.isdir(directory):
+        return 0
+
+    n_deleted = 0
+    for file in os.listdir(directory):
+        if file.endswith(".json"):
+            os.remove(os.path.join(directory, file))
+            n_deleted += 1
+    return n_deleted
+
+
 def Create_Labware_Needed(
     Labware_Format: Labware_Layout, N_Wells_Needed: int, N_Wells_Available = "All", Return_Original_Layout: bool = True
 ):
@@ -860,28 +1300,28 @@ def well_range(Wells: str, Labware_Format: Union[Labware_Layout, Tuple[int, int]
     if not Labware_Format and not Box:
         raise LabwareError("`Box` can only be `False` when `Labware_Format` is specified")
 
-    if not Labware_Format or Box:
-        Well = Wells
-        first, last = Well.split(":")
-        firstL = first[0]
-        lastL = last[0]
-        firstN = int(first[1 : len(first)])
-        lastN = int(last[1 : len(last)])
-        wells = []
+    if not Labware_Format:
+        if _is_compound_well_expression(Wells):
+            raise LabwareError("`Labware_Format` must be specified to use a compound well range expression")
+        first, last = Wells.split(":")
+        first_row, first_col = _parse_well(first)
+        last_row, last_col = _parse_well(last)
         if Direction == "Horizontal":
-            for L in _Lrange(firstL, lastL):
-                for N in range(firstN, lastN + 1):
-                    wells.append(L + str(N))
-            return wells
+            return [
+                _well_name(row, col)
+                for row in range(first_row, last_row + 1)
+                for col in range(first_col, last_col + 1)
+            ]
         elif Direction == "Vertical":
-            for N in range(firstN, lastN + 1):
-                for L in _Lrange(firstL, lastL):
-                    wells.append(L + str(N))
-            return wells
+            return [
+                _well_name(row, col)
+                for col in range(first_col, last_col + 1)
+                for row in range(first_row, last_row + 1)
+            ]
 
     else:
         # Get the end row and end column number for the labware being used
-        if type(Labware_Format) is list:
+        if type(Labware_Format) is list or type(Labware_Format) is tuple:
             if not len(Labware_Format) == 2:
                 raise ValueError(
                     "Labware_Format argument MUST either be a BiomationScripter.Labware_Layout "
@@ -890,60 +1330,14 @@ def well_range(Wells: str, Labware_Format: Union[Labware_Layout, Tuple[int, int]
                 )
             end_row, end_col = Labware_Format
         else:
-            Labware_Format = [Labware_Format.rows, Labware_Format.columns]
-
-        end_row, end_col = Labware_Format
-        # Get the first and last wells in the specified well range
-        first_well, last_well = Wells.split(":")
-
-        # Split the first and last wells up into rows and columns
-        first_row = first_well[0]
-        last_row = last_well[0]
-        first_col = int(first_well[1:])
-        last_col = int(last_well[1:])
-
-        # Check if first and last wells are in range
-        if (
-            (_Labware_Row_To_Index(first_row) > end_row - 1)
-            or (_Labware_Row_To_Index(last_row) > end_row - 1)
-            or (first_col > end_col)
-            or (last_col > end_col)
-        ):
-            raise ValueError("Wells are not in range of specified format")
-
-        wells = []
-
-        if Direction == "Horizontal":
-            rows = []
-            for r in _Lrange(first_row, last_row):
-                rows.append(r)
-
-            first_col_of_row = first_col
-
-            for row in rows:
-                for col in range(first_col_of_row, end_col + 1):
-                    well = "{}{}".format(row, col)
-                    wells.append(well)
-                    if col == end_col:
-                        first_col_of_row = 1
-                    if well == last_well:
-                        return wells
-
-        elif Direction == "Vertical":
-            rows = []
-            for r in _Lrange("A", chr(64 + end_row)):
-                rows.append(r)
-
-            first_row_of_col_index = _Labware_Row_To_Index(first_row)
+            end_row, end_col = Labware_Format.rows, Labware_Format.columns
 
-            for col in range(first_col, last_col + 1):
-                for row in rows[first_row_of_col_index:]:
-                    well = "{}{}".format(row, col)
-                    wells.append(well)
-                    if row == rows[-1]:
-                        first_row_of_col_index = 0
-                    if well == last_well:
-                        return wells
+        # Well ranges are compiled to indices in the precomputed well table
+        well_names = _get_well_table(end_row, end_col).horizontal
+        return [
+            well_names[index]
+            for index in _compile_well_expression(Wells, end_row, end_col, Direction, Box)
+        ]
 
 
 def Group_Locations(Locations, Group_Populations):
@@ -1016,7 +1410,7 @@ def mastermixes_by_replicates(
 
 
         for mm in range(0, mm_aliquots):
-            if Mastermix_Layouts[-1].empty_wells == []:
+            if Mastermix_Layouts[-1].get_next_empty_well() is None:
                 new_mm_layout = Mastermix_Layouts[-1].clone_format(f"{Mastermix_Layouts[-1].name}_{len(Mastermix_Layouts)}")
                 new_mm_layout.set_available_wells()
                 Mastermix_Layouts.append(new_mm_layout)
@@ -1055,6 +1449,10 @@ def mastermixes_by_min_volume(
     Excluded_Combinations: List[List[str]] = [],
     Preferential_Reagents: List[str] = [],
     Seed: Union[int, None] = None,
+    Processes: Union[int, None] = 1,
+    Method: str = "heuristic",
+    Time_Budget: Union[float, None] = None,
+    Progress_Callback = None,
 ):
 
     """Generates mastermixes based on source materials in a list of destination Labware_Layout objects, and other user-defined parameters.
@@ -1063,600 +1461,1702 @@ def mastermixes_by_min_volume(
     Parameters supplied as arguments can be used to influence compositions of the mastermixes.
     To help ensure many combinations are attempted, there is some randomness within the function.
     This randomness can be removed by supplying a specific seed, which ensures that the same mastermixes are generated each time.
+    If no seed is supplied and the first attempt fails, other seeds are tried in a pool of `Processes` processes (`None` uses one per CPU).
+    The lowest working seed is always returned, whatever the number of processes.
+    Alternatively, `Method="exact"` uses an integer program (requires PuLP) to find the fewest mastermixes, and then the
+    fewest transfers, possible under the same constraints - no randomness is involved, so `Seed` is returned unchanged.
+    `Time_Budget` (in seconds) limits how long is spent looking for mastermixes. The heuristic keeps trying seeds until the
+    budget runs out and uses the solution with the fewest mastermixes; the exact method uses the best solution found in time,
+    or (with a warning) the solution of one heuristic attempt made before it started.
+    The budget includes setting up the problem, but the first heuristic attempt is always completed, so a very small
+    budget can be exceeded by the time that attempt takes.
+    A MastermixError is only raised if no solution at all was found within the budget.
+    `Progress_Callback` is called after each attempt with the keyword arguments `Attempts`, `Best_Seed`,
+    `Best_Mastermix_Count` (None until a solution is found) and `Elapsed_Time` (in seconds).
     """
 
-    Solved = False  # Check whether a solution has been found
+    if Method not in ["heuristic", "exact"]:
+        raise ValueError("Method must be either 'heuristic' or 'exact', not '{}'".format(Method))
 
-    First_Attempt = True  # Determine whether this is the first attempt to find a solution
+    Start_Time = time.monotonic()
+    Deadline = None if Time_Budget is None else Start_Time + Time_Budget
+
+    def report_progress(Attempts, Best_Seed, Best_Mastermix_Count):
+        if Progress_Callback:
+            Progress_Callback(
+                Attempts=Attempts,
+                Best_Seed=Best_Seed,
+                Best_Mastermix_Count=Best_Mastermix_Count,
+                Elapsed_Time=time.monotonic() - Start_Time,
+            )
 
-    # Whilst there is no solution
-    print("\nDetermining mastermixes, this may take a while...\n")
-    while not Solved:
+    # The reagent IDs, their well sets and any linked reagents don't depend on the seed, so are only found once
+    Problem = _Mastermix_Problem(
+        Destination_Layouts,
+        Maximum_Mastermix_Volume,
+        Min_Transfer_Volume,
+        Extra_Reactions,
+        Excluded_Reagents,
+        Excluded_Combinations,
+        Preferential_Reagents,
+    )
+    Well_Locations = Problem.well_locations
+
+    if Method == "exact":
+        # With a time budget, one heuristic attempt is made first, so that there is a solution to fall back on if the
+        ## exact method runs out of time
+        Fallback_Mastermixes = None
+        if Deadline is not None:
+            try:
+                Fallback_Mastermixes = Problem.attempt(Seed)
+            except MastermixError:
+                pass
+        Mastermixes = Problem.solve_exact(
+            Deadline,
+            lambda attempts, best_mastermix_count: report_progress(attempts, Seed, best_mastermix_count)
+        )
+        if Mastermixes is None:
+            if Fallback_Mastermixes is None:
+                raise MastermixError(
+                    "No solution could be found within the time budget of {} seconds.".format(Time_Budget)
+                )
+            warnings.warn(
+                "No exact solution was found within the time budget of {} seconds, so the heuristic method's solution is used instead".format(
+                    Time_Budget
+                )
+            )
+            Mastermixes = Fallback_Mastermixes
 
+    else:
+        Attempts = 1
         try:
+            Mastermixes = Problem.attempt(Seed)
+            report_progress(Attempts, Seed, _count_mastermixes(Mastermixes))
+
+        # If a solution is not possible
+        except MastermixError:
+            # Check if a seed was given
+            if Seed:
+                raise MastermixError(
+                    "No solution could be found with these constraints and a seed of {}".format(
+                        Seed
+                    )
+                )
+            Mastermixes = None
+            report_progress(Attempts, None, None)
+
+        # If a seed wasn't given, then try shuffling the order of the reagents with different seeds
+        ## Without a time budget, the first solution found is used
+        ## With a time budget, seeds are tried until the budget runs out, and the solution with the fewest mastermixes is used
+        ## A seed of 0 leaves the order unshuffled, which is the attempt that has just been made, so the search starts from 1
+        if not Seed and (Mastermixes is None or Deadline is not None):
+            for seed, seed_mastermixes in _iterate_mastermix_seeds(Problem, range(1, 1001), Processes, Deadline):
+                Attempts += 1
+                if seed_mastermixes is not None and (
+                    Mastermixes is None or _count_mastermixes(seed_mastermixes) < _count_mastermixes(Mastermixes)
+                ):
+                    Seed, Mastermixes = seed, seed_mastermixes
+                report_progress(Attempts, Seed, None if Mastermixes is None else _count_mastermixes(Mastermixes))
+                if Mastermixes is not None and Deadline is None:
+                    break
+
+        if Mastermixes is None:
+            if Deadline is not None and time.monotonic() >= Deadline:
+                raise MastermixError(
+                    "No solution could be found within the time budget of {} seconds ({} seeds tried).".format(
+                        Time_Budget, Attempts
+                    )
+                )
+            # To stop infinte loops, no more than 1000 seeds are tried
+            raise MastermixError(
+                """
+No solution could be found with these constraints. Try one of the following options:
+> Decrease the minimum transfer volume (if specified)
+> Decrease the stock concentration of highly concentrated source material
+> Use a mastermix labware with a higher well capacity (especially when there are a lot of samples)
+"""
+            )
 
-            # Get all unique reagents in the destination layout
-            All_Reagents = set()
+    Mastermixes, Mastermix_Layouts = _apply_mastermixes(
+        Mastermixes,
+        Well_Locations,
+        Destination_Layouts,
+        Mastermix_Layout,
+        Min_Transfer_Volume,
+        Extra_Reactions,
+    )
 
-            for Destination_Layout in Destination_Layouts:
-                for well in Destination_Layout.get_content():
-                    for reagent in Destination_Layout.get_liquids_in_well(well):
-                        All_Reagents.add(reagent)
+    return (Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts)
 
-            # For each reagent at each volume/well, get the wells it appears in
-            # e.g., 20 uL water might be in wells A1, A2, A3 and 30 uL water might be in wells A4, A5, A6
 
-            Wells_By_Reagent_ID = {}
+def fmol_calculator(mass_ng, length_bp):
+    return ((mass_ng * 1e-9) / ((length_bp * 617.96) + 36.04)) * 1e15
 
-            for reagent in All_Reagents:
-                # get wells containing the current reagent (grouped by destination layout)
-                wells_with_reagent_by_destination = [
-                    Destination_Layout.get_wells_containing_liquid(reagent)
-                    for Destination_Layout in Destination_Layouts
-                ]
+def serial_dilution_volumes(dilution_factors, total_volume):
+    # Note that total volume is the amount the dilution will be made up to
+    ## The total volume of all dilutions other than the final will be lower than this
+    sample_volumes = []
+    solution_volumes = []
 
-                # combine grouped wells into one list, and add the destination layout index to the
-                # well designation (INDEX_WELL)
-                wells_with_reagent = []
-                for wells, dest_index in zip(
-                    wells_with_reagent_by_destination,
-                    range(0, len(wells_with_reagent_by_destination)),
-                ):
-                    wells_with_reagent += ["{}_{}".format(dest_index, well) for well in wells]
-
-                # Group the identified wells based on the reagent's volume/well
-                for well in wells_with_reagent:
-                    # Get the volume in the well
-                    well_volume = Destination_Layouts[
-                        _get_well_layout_index(well)
-                    ].get_volume_of_liquid_in_well(reagent, well.split("_")[1])
-                    # Create a new reagent ID which includes the volume/well
-                    reagent_id = "{}_vol_{}".format(reagent, well_volume)
-                    # Add the well to the relevant reagent id (create the entry if needed)
-                    if reagent_id in Wells_By_Reagent_ID.keys():
-                        Wells_By_Reagent_ID[reagent_id].add(well)
-                    else:
-                        Wells_By_Reagent_ID[reagent_id] = set([well])
+    # This the the dilution factor of the source material for the first serial dilution
+    ## This is always 1, as the initial sample is assumed to be undiluted
+    source_dilution_factor = 1
+
+    for df in dilution_factors:
+        # Get the dilution factor of the current serial dilution being performed
+        destination_dilution_factor = df
+
+        # Calculate the volume, in uL, of sample and solution required for each dilution factor
+        sample_volume = total_volume * (source_dilution_factor/destination_dilution_factor)
+        solution_volume = total_volume - sample_volume
 
-            # a set of all volume/well values
-            vols_per_well = set()
-            # Get the reagent id keys in alphabetical order - needed to ensure consistency when doing random shuffles
-            reagent_id_keys = list(Wells_By_Reagent_ID.keys())
-            reagent_id_keys.sort()
+        # Store the volumes required for later use
+        sample_volumes.append(sample_volume)
+        solution_volumes.append(solution_volume)
 
-            for reagent_id in reagent_id_keys:
-                vols_per_well.add(_get_vol_per_well(reagent_id))
+        # Set the current dilution as the source for the next serial dilution
+        source_dilution_factor = df
 
-            vols_per_well = list(vols_per_well)
-            vols_per_well.sort()
+    return(sample_volumes, solution_volumes)
 
-            # Get a list of reagent IDs ordered by volume/well (ascending)
-            Ordered_Reagent_IDs = []
-            for volume in vols_per_well:
-                for reagent_id in reagent_id_keys:
-                    if _get_vol_per_well(reagent_id) == volume:
-                        Ordered_Reagent_IDs.append(reagent_id)
 
-            # Removed excluded reagents (i.e. those not to be used in mastermixes)
+def group_locations_by_content(Layouts):
+    locations = {} # ((Reagent, vol), ): [(layout, well)]
 
-            for (
-                reagent
-            ) in Ordered_Reagent_IDs.copy():  # copy to make sure the iterating works as expected
-                for excluded_reagent in Excluded_Reagents:
-                    if excluded_reagent in reagent:
-                        Ordered_Reagent_IDs.remove(reagent)
+    for layout in Layouts:
+        layout_content = layout.get_content()
+        for well in layout_content:
+            # Where a liquid appears more than once in a well, the first volume is used
+            content = {}
+            for c in layout_content[well]:
+                if c.name not in content:
+                    content[c.name] = c.volume
+            content = tuple(content.items())
 
-            #####################################
+            if content in locations:
+                locations[content].append((layout, well))
+            else:
+                locations[content] = [(layout, well)]
 
-            # Check for linked reagents (where reagent ids share the same well set)
+    # Groups are keyed by the string form of {Reagent: vol, }
+    return({str(dict(content)): grouped for content, grouped in locations.items()})
 
-            reagents_checked = []  # Used to ensure combinations, NOT permutations
-            Linked_Reagents = []
+## Private ##
+class _DoE_Columns:
+    """Column store for DoE run data, with one list per factor, source material, and intermediate.
 
-            for reagent_id in Ordered_Reagent_IDs:
-                linked_reagents = [reagent_id]  # temp list for inside loop
-                reagent_well_set = Wells_By_Reagent_ID[
-                    reagent_id
-                ]  # well set for the current reagent
-                for candidate_reagent in Ordered_Reagent_IDs:
-                    if candidate_reagent == reagent_id:
-                        # Don't link a reagent with itself
-                        continue
-                    elif candidate_reagent in reagents_checked:
-                        # Ignore already checked reagents - avoids permutations
-                        continue
-                    elif reagent_well_set == Wells_By_Reagent_ID[candidate_reagent]:
-                        # If the reagent well sets are identical, then link the reagents
-                        linked_reagents.append(candidate_reagent)
-                        # Make sure that the linked reagents aren't excluded combinations
-                        for excluded_combo in Excluded_Combinations:
-                            if (
-                                candidate_reagent.split("_vol_")[0] in excluded_combo
-                                and reagent_id.split("_vol_")[0] in excluded_combo
-                            ):
-                                linked_reagents.remove(
-                                    candidate_reagent
-                                )  # remove it if it is an excluded combo
-
-                # Reagent volumes will be scaled up to ensure that the mastermix can service the correct number of wells,
-                ## and to also ensure that the lowest volume reagent can be added with a transfer volume above the min transfer vol
-                # Check that this scale up will not put the total mastermix volume above the total well capacity if these linked reagents were used
-                lowest_vol_reag = [
-                    reag
-                    for reag in linked_reagents
-                    if _get_vol_per_well(reag)
-                    == min([_get_vol_per_well(reag) for reag in linked_reagents])
-                ][0]
-                if (
-                    _get_vol_per_well(lowest_vol_reag)
-                    * (len(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions)
-                    >= Min_Transfer_Volume
-                ):
-                    potential_mm_reaction_num = (
-                        len(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions
-                    )
-                else:
-                    potential_mm_reaction_num = Min_Transfer_Volume / _get_vol_per_well(
-                        lowest_vol_reag
+    Each `DoE_Run_Data` is a view of one row. Values which haven't been specified for a run are None.
+    """
+
+    def __init__(self, Factors, Rows):
+        self.n_runs = len(Rows)
+        self.factors = {factor: [row[index] for row in Rows] for index, factor in enumerate(Factors)}
+        self.source_materials = {}
+        self.intermediates = {}
+        # Factor -> "numeric" or "categorical"
+        self.factor_types = {
+            factor: "numeric" if all(_is_doe_number(value) for value in column) else "categorical"
+            for factor, column in self.factors.items()
+        }
+        # Factor -> values of numeric factors parsed as int or float, built when first needed
+        self._typed_factors = {}
+        # Name -> ((kind, column), ...) in the order names are looked up; rebuilt when a column is added
+        self._resolver = None
+        self._reported_ambiguous_names = set()
+
+    def get_value(self, Values, Name, Row):
+        column = Values.get(Name)
+        if column is None or column[Row] is None:
+            raise KeyError(Name)
+        return column[Row]
+
+    def set_value(self, Values, Name, Row, Value):
+        self.set_values(Values, Name, [Row], [Value])
+
+    def set_values(self, Values, Name, Rows, New_Values):
+        if Name not in Values:
+            Values[Name] = [None] * self.n_runs
+            self._resolver = None
+        column = Values[Name]
+        for row, value in zip(Rows, New_Values):
+            column[row] = value
+        if Values is self.factors:
+            self._typed_factors.pop(Name, None)
+            self.factor_types[Name] = (
+                "numeric" if all(value is None or _is_doe_number(value) for value in Values[Name]) else "categorical"
+            )
+
+    def set_keys(self, Values, Name, Rows, Keys):
+        # Stores `_DoE_Key`s in place of ID strings
+        if not type(Values.get(Name)) is _DoE_ID_Column:
+            Values[Name] = _DoE_ID_Column(Values[Name] if Name in Values else [None] * self.n_runs)
+            self._resolver = None
+        self.set_values(Values, Name, Rows, Keys)
+
+    def get_row(self, Values, Row):
+        return _DoE_Row_Values(self, Values, Row)
+
+    def get_names(self, Values, Row):
+        return [name for name, column in Values.items() if column[Row] is not None]
+
+    def get_value_by_name(self, Name, Row, Typed=False):
+        for kind, column in self.resolve(Name):
+            if column[Row] is not None:
+                if Typed and kind == "factor":
+                    return self.get_typed_factor(Name)[Row]
+                return column[Row]
+        return None
+
+    def resolve(self, Name):
+        if self._resolver is None:
+            self._build_resolver()
+        return self._resolver.get(Name, ())
+
+    def _build_resolver(self):
+        resolver = {}
+        for kind, values in (
+            ("factor", self.factors),
+            ("source material", self.source_materials),
+            ("intermediate", self.intermediates),
+        ):
+            for name, column in values.items():
+                resolver[name] = resolver.get(name, ()) + ((kind, column),)
+        self._resolver = resolver
+
+        for name, kinds in self.get_ambiguous_names().items():
+            if name not in self._reported_ambiguous_names:
+                self._reported_ambiguous_names.add(name)
+                warnings.warn(
+                    "'{}' is the name of more than one of: {}. Values are looked up in that order.".format(
+                        name, ", ".join(kinds)
                     )
-                # If the sum of all mm reagents multiplied by the number of required reagents would be more than the max mastermix vol allowed
-                ## then remove the highest vol reagent until the vol is below the max volume allowed
-                total_potential_mastermix_volume = sum(
-                    [
-                        _get_vol_per_well(reag) * potential_mm_reaction_num
-                        for reag in linked_reagents
-                    ]
                 )
-                while total_potential_mastermix_volume > Maximum_Mastermix_Volume:
-                    linked_reagents.remove(
-                        [
-                            reag
-                            for reag in linked_reagents
-                            if _get_vol_per_well(reag)
-                            == max([_get_vol_per_well(reag) for reag in linked_reagents])
-                        ][0]
-                    )
-                    total_potential_mastermix_volume = sum(
-                        [
-                            _get_vol_per_well(reag) * potential_mm_reaction_num
-                            for reag in linked_reagents
-                        ]
-                    )
 
-                # Check if the current reagent was linked with any other reagent(s)
-                if len(linked_reagents) == 1:
-                    pass
-                else:
-                    Linked_Reagents.append(linked_reagents)
+    def get_ambiguous_names(self):
+        if self._resolver is None:
+            self._build_resolver()
+        return {
+            name: [kind for kind, column in sources]
+            for name, sources in self._resolver.items()
+            if len(sources) > 1
+        }
+
+    def get_typed_factor(self, Factor):
+        if Factor not in self.factors:
+            return None
+        if not self.factor_types[Factor] == "numeric":
+            return self.factors[Factor]
+        if Factor not in self._typed_factors:
+            self._typed_factors[Factor] = [_parse_doe_value(value) for value in self.factors[Factor]]
+        return self._typed_factors[Factor]
 
-                # Mark that the reagent has been checked
-                reagents_checked.append(reagent_id)
+    def get_typed_value(self, Factor, Row):
+        return self.get_typed_factor(Factor)[Row]
 
-            # print(Linked_Reagents)
 
-            ######################################
+class _DoE_Row(dict):
+    """Store for the values of a single `DoE_Run_Data` which isn't part of an experiment.
 
-            # Create the mastermixes
+    Has the same methods as `_DoE_Columns`, but holds one value per name, keyed by (kind, name), rather than columns.
+    """
 
-            No_Solution = False
+    __slots__ = ()
 
-            if Seed:
-                random.seed(Seed)
-                random.shuffle(Ordered_Reagent_IDs)
-
-            Mastermixes = []
-            for reagent_id in Ordered_Reagent_IDs:
-
-                # Check if the reagent's volume/well is below the trasfer threshold
-                if _get_vol_per_well(reagent_id) < Min_Transfer_Volume or reagent_id.split("_vol_")[0] in Preferential_Reagents:
-                    # print("\n")
-                    mastermix_reagents = [reagent_id]  # list to hold the mastermix components
-                    mastermix_per_well = _get_vol_per_well(
-                        reagent_id
-                    )  # to track the volume of MM to add per well
-                    current_reagent_well_set = Wells_By_Reagent_ID[
-                        reagent_id
-                    ].copy()  # set of wells which need to be statisifed by the MMs
-
-                    # Check if the reagent's well set is empty
-                    ## This can occur if the reagent has been satisified by other mastermixes
-                    if len(current_reagent_well_set) == 0:
-                        continue
+    factors = "factor"
+    source_materials = "source material"
+    intermediates = "intermediate"
 
-                    # print("start", mastermix_reagents)
-
-                    ##########################################
-                    # Check if there are any linked reagents #
-                    ##########################################
-                    for linked_reagents in Linked_Reagents:
-                        if reagent_id in linked_reagents:
-                            # For any linked reagents found...
-                            for linked_reagent in linked_reagents:
-                                # Skip the current reagent in the list so it isn't added to itself
-                                if linked_reagent == reagent_id:
-                                    continue
-                                # Check that the linked reagent hasn't already been used up in other mastermixes
-                                elif len(Wells_By_Reagent_ID[linked_reagent]) == 0:
-                                    continue
-                                else:
-                                    mastermix_reagents.append(linked_reagent)
-                                    mastermix_per_well += _get_vol_per_well(linked_reagent)
-                    # Check if the MM per well is above the threshold
-                    if mastermix_per_well >= Min_Transfer_Volume:
-                        # print("Reagent:", reagent_id)
-                        # print("linked mm reag", mastermix_reagents)
-                        # If it is, then create the mastermix
-                        mastermix_name = ":".join(mastermix_reagents)
-                        # Check if any linked reagents have already been used
-                        if False in [
-                            current_reagent_well_set == Wells_By_Reagent_ID[mm_reag]
-                            for mm_reag in mastermix_reagents
-                        ]:
-                            # If the well sets are not equal, then just skip to the next code block (essentially means that the simple solution failed...)
-                            # Reset the variables first...
-                            mastermix_reagents = [
-                                reagent_id
-                            ]  # list to hold the mastermix components
-                            mastermix_per_well = _get_vol_per_well(
-                                reagent_id
-                            )  # to track the volume of MM to add per well
-                            current_reagent_well_set = Wells_By_Reagent_ID[
-                                reagent_id
-                            ].copy()  # set of wells which need to be statisifed by the MMs
-                            pass
-                        else:
-                            mastermix_well_set = current_reagent_well_set.copy()
-                            Mastermixes.append(
-                                Mastermix(
-                                    mastermix_name,
-                                    mastermix_reagents.copy(),
-                                    mastermix_well_set.copy(),
-                                )
-                            )
-                            # Remove the used wells from the reagent IDs
-                            for used_reagent in mastermix_reagents:
-                                # print("Current {} well set: {}".format(used_reagent, Wells_By_Reagent_ID[used_reagent]))
-                                Wells_By_Reagent_ID[used_reagent] -= mastermix_well_set
-                                # print("Updated {} well set: {}".format(used_reagent, Wells_By_Reagent_ID[used_reagent]))
-                            # print("---")
-
-                            # Then continue to the next reagent in need of a mastermix
-                            continue
-                    else:
-                        # If not, pass to the next code block to add some more components
-                        pass
+    def __init__(self, Factors, Values):
+        super().__init__(((self.factors, factor), value) for factor, value in zip(Factors, Values))
 
-                    ###############################################################
-                    # Add components until the MM per well is above the threshold #
-                    ###############################################################
-                    split = (
-                        []
-                    )  # This is used to keep track of things if multiple MMs are needed for a reagent
-                    ## split is a list of sets: split = [ [wells: set, mm_reagents: set] ]
-                    split_active = (
-                        False  # True when there are still wells that need to be dealt with
-                    )
-                    ## split variables hold wells that are not currently active
-                    ## mastermix_ variables hold currently active wells (actively trying to satisify)
-
-                    # Keep looping until the MM per well is above the threshold and all wells have been satisified
-                    while (
-                        mastermix_per_well < Min_Transfer_Volume
-                        or len(current_reagent_well_set) > 0
-                        or split_active
-                    ):
-                        # Start by identifying the reagent with the most wells in common
-                        ## (if there is a tie, the reagent with lowest vol/well is selected)
-                        common_wells = set()
-                        chosen_component = ""
-                        chosen_components = []
-                        preferential_selected = False
-                        for candidate_reagent in Ordered_Reagent_IDs:
-                            # Make sure that the linked reagents aren't excluded combinations
-                            exclude = False
-                            for excluded_combo in Excluded_Combinations:
-                                if (
-                                    candidate_reagent.split("_vol_")[0] in excluded_combo
-                                    and reagent_id.split("_vol_")[0] in excluded_combo
-                                ):
-                                    exclude = True
-                                    break
-                            if exclude:
+    def get_value(self, Values, Name, Row):
+        value = self.get((Values, Name))
+        if value is None:
+            raise KeyError(Name)
+        return value
+
+    def set_value(self, Values, Name, Row, Value):
+        if Value is None:
+            self.pop((Values, Name), None)
+        else:
+            self[(Values, Name)] = Value
+
+    def get_row(self, Values, Row):
+        return _DoE_Row_Values(self, Values, Row)
+
+    def get_names(self, Values, Row):
+        return [name for kind, name in self if kind == Values]
+
+    def get_value_by_name(self, Name, Row, Typed=False):
+        for kind in (self.factors, self.source_materials, self.intermediates):
+            value = self.get((kind, Name))
+            if value is not None:
+                if Typed and kind == self.factors:
+                    return _parse_doe_value(value)
+                return value
+        return None
+
+    def get_typed_value(self, Factor, Row):
+        return _parse_doe_value(self.get_value(self.factors, Factor, Row))
+
+
+class _DoE_Row_Values(collections.abc.MutableMapping):
+    """The values of one kind (e.g. the factors) for one run, as a dictionary which writes to the run's store."""
+
+    __slots__ = ("_columns", "_values", "_row")
+
+    def __init__(self, Columns, Values, Row):
+        self._columns = Columns
+        self._values = Values
+        self._row = Row
+
+    def __getitem__(self, Name):
+        return self._columns.get_value(self._values, Name, self._row)
+
+    def __setitem__(self, Name, Value):
+        self._columns.set_value(self._values, Name, self._row, Value)
+
+    def __delitem__(self, Name):
+        # Values which haven't been specified for a run are None
+        self._columns.get_value(self._values, Name, self._row)
+        self._columns.set_value(self._values, Name, self._row, None)
+
+    def __iter__(self):
+        return iter(self._columns.get_names(self._values, self._row))
+
+    def __len__(self):
+        return len(self._columns.get_names(self._values, self._row))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def _group_rows(Columns):
+    # Returns the unique combinations of values across the columns, and the index of each row's combination
+    combination_codes = {}
+    codes = []
+    for combination in zip(*Columns):
+        code = combination_codes.get(combination)
+        if code is None:
+            code = combination_codes[combination] = len(combination_codes)
+        codes.append(code)
+    return list(combination_codes), codes
+
+
+class _DoE_Key(tuple):
+    """A combination of (name, value) pairs which identifies a source material or intermediate.
+
+    Keys are stored in the columns in place of their ID strings, which are only rendered when read.
+    """
+
+    __slots__ = ()
+
+
+def _render_doe_id(Key):
+    # The ID used for a combination of values, e.g. "Factor1(Value)-Factor2(Value)"
+    return "-".join("{}({})".format(name, value) for name, value in Key)
+
+
+class _DoE_ID_Column(list):
+    """A column of a `_DoE_Columns` which holds `_DoE_Key`s, and returns their ID strings when read.
+
+    Each key is rendered once, the first time it is read. Other values are returned as they are.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, Values):
+        super().__init__(Values)
+        self._ids = {}
+
+    def __getitem__(self, Row):
+        if type(Row) is slice:
+            return [self[row] for row in range(*Row.indices(len(self)))]
+        value = list.__getitem__(self, Row)
+        if type(value) is _DoE_Key:
+            id = self._ids.get(value)
+            if id is None:
+                id = self._ids[value] = _render_doe_id(value)
+            return id
+        return value
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    def get_key(self, Row):
+        return list.__getitem__(self, Row)
+
+
+def _load_doe_columns(DoE_File):
+    # Builds the columns of a DoE from a CSV file path, a CSV text buffer, or a pandas DataFrame, one row at a time
+    # Every row is checked, and all errors found are raised together
+    if hasattr(DoE_File, "itertuples") and hasattr(DoE_File, "columns"):
+        factors = [str(factor) for factor in DoE_File.columns]
+        rows = (
+            ["" if _is_blank_cell(value) else str(value) for value in row]
+            for row in DoE_File.itertuples(index=False, name=None)
+        )
+        return factors, _build_doe_columns(factors, rows)
+
+    if hasattr(DoE_File, "read"):
+        return _read_doe_csv(DoE_File)
+
+    with open(DoE_File, "r", newline="") as file:
+        return _read_doe_csv(file)
+
+
+def _read_doe_csv(File):
+    reader = csv.reader(File)
+    factors = next(reader, None)
+    if not factors:
+        raise ValueError("The DoE file is empty; the first row must contain the factor names.")
+    # Blank lines are skipped
+    return factors, _build_doe_columns(factors, (row for row in reader if row))
+
+
+_MAX_DOE_ERRORS_SHOWN = 100
+
+
+def _build_doe_columns(Factors, Rows):
+    columns = _DoE_Columns(Factors, [])
+    factor_columns = list(columns.factors.values())
+    if not len(factor_columns) == len(Factors):
+        raise ValueError("Factor names in the DoE file must be unique.")
+    numeric = [True] * len(Factors)
+
+    errors = []
+    n_runs = 0
+    for ID, run in enumerate(Rows):
+        n_runs += 1
+        if not len(run) == len(Factors):
+            errors.append(f"Run {ID} has {len(run)} values, but there are {len(Factors)} factors.")
+            continue
+        for index, value in enumerate(run):
+            if value == "":
+                errors.append(
+                    f"Missing value found in run {ID} for factor {Factors[index]}; "
+                    "check that all values are present and objectives are not present in the file."
+                )
+            if errors:
+                continue
+            factor_columns[index].append(value)
+            if numeric[index] and not _is_doe_number(value):
+                numeric[index] = False
+
+    if errors:
+        message = "\n".join(errors[:_MAX_DOE_ERRORS_SHOWN])
+        if len(errors) > _MAX_DOE_ERRORS_SHOWN:
+            message += f"\n... and {len(errors) - _MAX_DOE_ERRORS_SHOWN} more errors"
+        raise ValueError(f"{len(errors)} error(s) found in the DoE data:\n{message}")
+
+    columns.n_runs = n_runs
+    columns.factor_types = {
+        factor: "numeric" if is_numeric else "categorical" for factor, is_numeric in zip(Factors, numeric)
+    }
+    return columns
+
+
+def _is_doe_number(Value):
+    return not type(_parse_doe_value(Value)) is str
+
+
+def _parse_doe_value(Value):
+    if not type(Value) is str:
+        return Value
+    try:
+        return int(Value)
+    except ValueError:
+        pass
+    try:
+        number = float(Value)
+    except ValueError:
+        return Value
+    # Values such as "nan" and "inf" are treated as categories rather than numbers
+    return number if _math.isfinite(number) else Value
+
+
+class _Well_Table:
+    """Precomputed well names for a labware format (rows, columns).
+
+    Tables are built once per format by `_get_well_table` and shared, so well ranges can be sliced rather than regenerated.
+    """
+
+    def __init__(self, Rows: int, Columns: int):
+        self.rows = Rows
+        self.columns = Columns
+        row_names = [_row_name(row) for row in range(Rows)]
+        # Index -> well name, in Horizontal (row by row) and Vertical (column by column) order
+        self.horizontal = tuple(
+            "{}{}".format(row, column) for row in row_names for column in range(1, Columns + 1)
+        )
+        self.vertical = tuple(
+            "{}{}".format(row, column) for column in range(1, Columns + 1) for row in row_names
+        )
+        # Well name -> index
+        self.horizontal_indices = {well: index for index, well in enumerate(self.horizontal)}
+        self.vertical_indices = {well: index for index, well in enumerate(self.vertical)}
+        # True for wells in the first or last row or column, in Horizontal order
+        self.outer_mask = tuple(
+            row in (0, Rows - 1) or column in (1, Columns)
+            for row in range(Rows)
+            for column in range(1, Columns + 1)
+        )
+
+
+@functools.lru_cache(maxsize=64)
+def _get_well_table(Rows: int, Columns: int):
+    return _Well_Table(Rows, Columns)
+
+
+# Characters which mark a string as a well range expression rather than a single well
+_WELL_EXPRESSION_CHARACTERS = frozenset(":,![@")
+_COMPOUND_WELL_EXPRESSION_CHARACTERS = frozenset(",![@")
+_WELL_EXPRESSION_DIRECTIONS = {"H": "Horizontal", "V": "Vertical"}
+
+
+def _is_well_expression(Wells: str) -> bool:
+    return not _WELL_EXPRESSION_CHARACTERS.isdisjoint(Wells)
+
+
+def _is_compound_well_expression(Wells: str) -> bool:
+    return not _COMPOUND_WELL_EXPRESSION_CHARACTERS.isdisjoint(Wells)
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_well_expression(Expression: str, Rows: int, Columns: int, Direction: str, Box: bool) -> Tuple[int, ...]:
+    """Compiles a well range expression to a tuple of indices in the Horizontal order of `_get_well_table(Rows, Columns)`.
+
+    Expressions are comma separated terms, each of which is a single well ("E5"), a range ("A1:B4"), or a box range ("[A1:B4]").
+    A term may end with "@H" or "@V" to set its direction, and terms starting with "!" are excluded from the result.
+    Wells are returned in the order they are first included; an expression with only exclusions starts from the whole labware.
+    """
+    included = []
+    excluded = set()
+    for term in Expression.split(","):
+        term = term.strip()
+        exclude = term.startswith("!")
+        if exclude:
+            term = term[1:].strip()
+
+        direction = Direction
+        if "@" in term:
+            term, suffix = term.split("@", 1)
+            direction = _WELL_EXPRESSION_DIRECTIONS.get(suffix.strip().upper())
+            if direction is None:
+                raise ValueError("{} is not a valid direction in the well range {}".format(suffix, Expression))
+            term = term.strip()
+
+        box = Box
+        if term.startswith("[") and term.endswith("]"):
+            box = True
+            term = term[1:-1].strip()
+
+        indices = _well_term_indices(term, Rows, Columns, direction, box)
+        if exclude:
+            excluded.update(indices)
+        else:
+            included.extend(indices)
+
+    if not included and excluded:
+        included = _well_term_indices(
+            "{}:{}".format(_well_name(0, 0), _well_name(Rows - 1, Columns - 1)), Rows, Columns, Direction, False
+        )
+
+    indices = []
+    for index in included:
+        if index not in excluded:
+            excluded.add(index)
+            indices.append(index)
+    return tuple(indices)
+
+
+def _well_term_indices(Term: str, Rows: int, Columns: int, Direction: str, Box: bool) -> List[int]:
+    # Returns the Horizontal well table indices for a single well or well range
+    if ":" in Term:
+        first_well, last_well = Term.split(":")
+    else:
+        first_well = last_well = Term
+    first_row, first_col = _parse_well(first_well.strip())
+    last_row, last_col = _parse_well(last_well.strip())
+
+    if (
+        (first_row > Rows - 1)
+        or (last_row > Rows - 1)
+        or not (0 <= first_col < Columns)
+        or not (0 <= last_col < Columns)
+    ):
+        raise ValueError("Wells are not in range of specified format")
+
+    if Box:
+        if Direction == "Horizontal":
+            return [
+                row * Columns + col
+                for row in range(first_row, last_row + 1)
+                for col in range(first_col, last_col + 1)
+            ]
+        return [
+            row * Columns + col
+            for col in range(first_col, last_col + 1)
+            for row in range(first_row, last_row + 1)
+        ]
+
+    if Direction == "Horizontal":
+        return list(range(first_row * Columns + first_col, last_row * Columns + last_col + 1))
+    # Vertical positions are converted to Horizontal indices
+    return [
+        (position % Rows) * Columns + position // Rows
+        for position in range(first_col * Rows + first_row, last_col * Rows + last_row + 1)
+    ]
+
+
+class _Well_Allocator:
+    """Used by `Labware_Layout` to track which available wells are empty.
+
+    Wells are kept in available well order, so the next free well is always the first empty well in that order.
+    """
+
+    def __init__(self, Wells: List[str]):
+        self.wells = list(Wells)
+        self._indices = {well: index for index, well in enumerate(self.wells)}
+        # 1 if the well at that index is free, 0 if it has been allocated
+        self._free = bytearray([1]) * len(self.wells)
+        self._n_free = len(self.wells)
+        # Every well before the cursor is known to be allocated
+        self._cursor = 0
+
+    def __len__(self):
+        return self._n_free
+
+    def __contains__(self, Well):
+        index = self._indices.get(Well)
+        return index is not None and self._free[index] == 1
+
+    def next_free(self):
+        if self._n_free == 0:
+            return None
+        self._cursor = self._free.find(1, self._cursor)
+        return self.wells[self._cursor]
+
+    def allocate(self, Well):
+        index = self._indices.get(Well)
+        if index is None or not self._free[index]:
+            return
+        self._free[index] = 0
+        self._n_free -= 1
+
+    def release(self, Well):
+        index = self._indices.get(Well)
+        if index is None or self._free[index]:
+            return
+        self._free[index] = 1
+        self._n_free += 1
+        if index < self._cursor:
+            self._cursor = index
+
+    def get_free_wells(self):
+        return [well for well, free in zip(self.wells, self._free) if free]
+
+_layout_cache_directory = None
+_LAYOUT_CACHE_VERSION = 1
+_MAX_LAYOUT_CACHE_ENTRIES = 256
+_LAYOUT_CACHE_FIELDS = ("name", "type", "wells", "reagents", "volumes", "liquid_classes")
+
+
+def _file_sha256(File_Path):
+    file_hash = hashlib.sha256()
+    with open(File_Path, "rb") as file:
+        for block in iter(functools.partial(file.read, 1 << 20), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def _load_layout_cache_entry(Cache_File):
+    try:
+        with open(Cache_File) as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or not entry.get("version") == _LAYOUT_CACHE_VERSION:
+        return None
+    return entry
+
+
+def _read_layout_workbook_cached(File_Path):
+    # Cache files are named by the hash of the absolute path, and are valid while the file's mtime and size, or its content hash, match
+    File_Path = os.path.abspath(File_Path)
+    stat = os.stat(File_Path)
+    cache_file = os.path.join(
+        get_layout_cache_directory(), hashlib.sha256(File_Path.encode("utf-8")).hexdigest() + ".json"
+    )
+
+    entry = _load_layout_cache_entry(cache_file)
+    file_hash = None
+    if entry is not None and entry["path"] == File_Path:
+        if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            _touch_layout_cache_entry(cache_file)
+            return tuple(entry["layout"][field] for field in _LAYOUT_CACHE_FIELDS)
+        file_hash = _file_sha256(File_Path)
+        if entry["sha256"] == file_hash:
+            layout = tuple(entry["layout"][field] for field in _LAYOUT_CACHE_FIELDS)
+            _write_layout_cache_entry(cache_file, File_Path, stat, file_hash, layout)
+            return layout
+
+    layout = _read_layout_workbook(File_Path)
+    if file_hash is None:
+        file_hash = _file_sha256(File_Path)
+    _write_layout_cache_entry(cache_file, File_Path, stat, file_hash, layout)
+    # Entries are only added here, so this is where the cache is kept to its maximum size
+    if entry is None:
+        try:
+            n_entries = sum(1 for file in os.listdir(os.path.dirname(cache_file)) if file.endswith(".json"))
+        except OSError:
+            n_entries = 0
+        # Pruning below the maximum means the whole cache isn't read again for every new entry
+        if n_entries > _MAX_LAYOUT_CACHE_ENTRIES:
+            prune_layout_cache(_MAX_LAYOUT_CACHE_ENTRIES * 3 // 4)
+    return layout
+
+
+def _touch_layout_cache_entry(Cache_File):
+    # Marks a cache file as recently used
+    try:
+        os.utime(Cache_File)
+    except OSError:
+        pass
+
+
+def _write_layout_cache_entry(Cache_File, File_Path, Stat, File_Hash, Layout):
+    entry = {
+        "version": _LAYOUT_CACHE_VERSION,
+        "path": File_Path,
+        "mtime_ns": Stat.st_mtime_ns,
+        "size": Stat.st_size,
+        "sha256": File_Hash,
+        "layout": dict(zip(_LAYOUT_CACHE_FIELDS, Layout)),
+    }
+    # The cache is only an optimisation, so layouts which can't be stored (e.g. a read-only file system) are not cached
+    temp_file = "{}.{}.tmp".format(Cache_File, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(Cache_File), exist_ok=True)
+        with open(temp_file, "w") as file:
+            json.dump(entry, file)
+        os.replace(temp_file, Cache_File)
+    except (OSError, TypeError, ValueError):
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+
+
+_REAGENT_INDEX_VERSION = 1
+
+# The errors raised when a file which isn't a labware layout file is imported as one
+_NOT_A_LAYOUT_ERRORS = (KeyError, ValueError, IndexError)
+if _openpyxl is not None:
+    _NOT_A_LAYOUT_ERRORS += (_openpyxl.utils.exceptions.InvalidFileException,)
+
+
+def _index_layout_file(File_Path):
+    # Used by Reagent_Index to read one layout file, possibly in another process
+    # Files which aren't layout files are recorded with no name, so they aren't read again until they change
+    try:
+        stat = os.stat(File_Path)
+    except OSError:
+        return None
+    try:
+        layout = Import_Labware_Layout(File_Path, path="")
+    except _NOT_A_LAYOUT_ERRORS:
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "name": None, "reagents": {}}
+
+    reagents = {}
+    for reagent in layout._wells_by_liquid:
+        reagents[reagent] = layout.get_wells_containing_liquid(reagent)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "name": layout.name, "reagents": reagents}
+
+
+def _is_blank_cell(Value):
+    return Value is None or (type(Value) is float and _math.isnan(Value))
+
+
+def _read_layout_workbook(File_Path):
+    """Reads a labware layout workbook in a single read-only pass.
+
+    Returns the plate name and type from the first sheet, and lists of wells, names, current volumes and calibration
+    types from the second sheet, with the same defaults as the layout file format.
+    """
+    if _openpyxl is None:
+        raise ImportError("openpyxl is required to import labware layout files")
+
+    workbook = _openpyxl.load_workbook(File_Path, read_only=True, data_only=True)
+    try:
+        metadata_sheet, well_sheet = workbook.worksheets[0], workbook.worksheets[1]
+
+        # Plate name and type are in column 2, rows 1 and 2 of the Plate Metadata sheet
+        metadata = [row for row in metadata_sheet.iter_rows(min_row=1, max_row=2, min_col=2, max_col=2, values_only=True)]
+        name, type = metadata[0][0], metadata[1][0]
+
+        rows = well_sheet.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        well_column = header.index("Well")
+        name_column = header.index("Name")
+        current_volume_column = header.index("Volume (uL) - Current")
+        initial_volume_column = header.index("Volume (uL) - Initial")
+        calibration_column = header.index("Calibration Type")
+
+        wells, reagents, volumes, liquid_classes = [], [], [], []
+        for row in rows:
+            # delete rows where the Name is blank
+            if len(row) <= name_column or _is_blank_cell(row[name_column]):
+                continue
+            # if Current Volume column is empty, replace with Initial Volume, and then with zero
+            # TODO: add a warning to the user to say they are empty
+            volume = row[current_volume_column] if len(row) > current_volume_column else None
+            if _is_blank_cell(volume):
+                volume = row[initial_volume_column] if len(row) > initial_volume_column else None
+            if _is_blank_cell(volume):
+                volume = 0
+            # TODO: add a warning that liquid class has been set to a default value
+            liquid_class = row[calibration_column] if len(row) > calibration_column else None
+            if _is_blank_cell(liquid_class):
+                liquid_class = "AQ_BP"
+
+            wells.append(row[well_column])
+            reagents.append(row[name_column])
+            volumes.append(volume)
+            liquid_classes.append(liquid_class)
+    finally:
+        workbook.close()
+
+    return name, type, wells, reagents, volumes, liquid_classes
+
+
+def _broadcast_to_wells(Values, N_Wells, Name):
+    # Single values (including strings) are repeated for every well
+    if isinstance(Values, str) or not hasattr(Values, "__iter__"):
+        return [Values] * N_Wells
+    Values = list(Values)
+    if not len(Values) == N_Wells:
+        raise ValueError("`{}` has {} values, but {} wells were specified".format(Name, len(Values), N_Wells))
+    return Values
+
+
+def _get_well_layout_index(well):
+    return int(well.split("_")[0])
+
+
+def _Lrange(L1, L2):  # Between L1 and L2 INCLUSIVE of L1 and L2
+    for L in range(_Labware_Row_To_Index(L1), _Labware_Row_To_Index(L2) + 1):
+        yield (_row_name(L))
+
+
+def _Labware_Row_To_Index(row):
+    # Rows are named A-Z, then AA, AB... (as on 1536 well plates)
+    index = 0
+    for letter in row.upper():
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index - 1
+
+
+@functools.lru_cache(maxsize=1024)
+def _row_name(Row_Index):
+    name = ""
+    Row_Index += 1
+    while Row_Index > 0:
+        Row_Index, remainder = divmod(Row_Index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_well(Well: str) -> Tuple[int, int]:
+    # Converts a well name (e.g. "B3") to zero-based (row, column) coordinates
+    n_letters = 0
+    while n_letters < len(Well) and Well[n_letters].isalpha():
+        n_letters += 1
+    if n_letters == 0 or not Well[n_letters:].isdigit():
+        raise ValueError("{} is not a valid well".format(Well))
+    return (_Labware_Row_To_Index(Well[:n_letters]), int(Well[n_letters:]) - 1)
+
+
+@functools.lru_cache(maxsize=4096)
+def _well_name(Row: int, Column: int) -> str:
+    # Converts zero-based (row, column) coordinates to a well name (e.g. "B3")
+    return "{}{}".format(_row_name(Row), Column + 1)
+
+
+class _Mastermix_Reagent:
+    # A reagent at a specific volume/well, as used by mastermixes_by_min_volume
+    # `id` is the "{name}_vol_{volume}" label used in mastermix names
+    __slots__ = ("name", "volume", "id")
+
+    def __init__(self, Name, Volume):
+        self.name = Name
+        self.volume = float(Volume)
+        self.id = "{}_vol_{}".format(Name, Volume)
+
+
+# Limits on the size of the exact mastermix optimizer's integer program
+## Classes of wells with more reagents than this don't consider every subset of their reagents as a mastermix
+_MAX_EXACT_MASTERMIX_CLASS_REAGENTS = 10
+## The maximum number of patterns (sets of mastermixes) considered for each class of wells
+_MAX_EXACT_MASTERMIX_PATTERNS = 1000
+
+
+def _get_mastermix_solver(**Options):
+    # Returns the PuLP solver used by the exact mastermix optimizer
+    ## CBC installed alongside PuLP (pip install pulp[cbc]) is used if possible, otherwise the copy of CBC bundled with
+    ## older versions of PuLP is used - PuLP warns that this is deprecated each time it is created, so this is silenced
+    solver = _pulp.COIN_CMD(**Options)
+    if solver.available():
+        return solver
+    if hasattr(_pulp, "PULP_CBC_CMD"):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            solver = _pulp.PULP_CBC_CMD(**Options)
+            if solver.available():
+                return solver
+    raise ImportError("CBC is required for the exact mastermix optimizer (pip install BiomationScripter[exact])")
+
+
+class _Mastermix_Problem:
+    # The seed-independent part of mastermixes_by_min_volume: the reagent IDs, their well sets and linked reagents
+    # Each call to `attempt` looks for mastermixes using one seed, and leaves the problem unchanged so that it can be
+    # re-used for other seeds (including in other processes)
+
+    def __init__(
+        self,
+        Destination_Layouts,
+        Maximum_Mastermix_Volume,
+        Min_Transfer_Volume,
+        Extra_Reactions,
+        Excluded_Reagents,
+        Excluded_Combinations,
+        Preferential_Reagents,
+    ):
+        self.maximum_mastermix_volume = Maximum_Mastermix_Volume
+        self.min_transfer_volume = Min_Transfer_Volume
+        self.extra_reactions = Extra_Reactions
+        self.preferential_reagents = Preferential_Reagents
+
+        # For each reagent at each volume/well, get the wells it appears in
+        # e.g., 20 uL water might be in wells A1, A2, A3 and 30 uL water might be in wells A4, A5, A6
+
+        # Every destination well (INDEX_WELL) is given a bit, so that well sets can be stored as int bitmasks
+        ## Intersections, differences and comparisons of well sets are then single integer operations
+        Well_Locations = []
+        Wells_By_Reagent_ID = {}
+        # Reagent IDs are interned, so each (reagent, volume/well) pair is represented by a single object
+        Reagent_IDs = {}
+
+        for dest_index, Destination_Layout in enumerate(Destination_Layouts):
+            for well, well_content in Destination_Layout.get_content().items():
+                if not well_content:
+                    continue
+                well_bit = 1 << len(Well_Locations)
+                Well_Locations.append("{}_{}".format(dest_index, well))
+
+                # Only the first entry of a reagent in a well is used, as with `get_volume_of_liquid_in_well`
+                reagent_volumes = {}
+                for content in well_content:
+                    reagent_volumes.setdefault(content.name, content.volume)
+
+                for reagent, well_volume in reagent_volumes.items():
+                    # Get the reagent ID which includes the volume/well (create it if needed)
+                    reagent_id = Reagent_IDs.get((reagent, well_volume))
+                    if reagent_id is None:
+                        reagent_id = Reagent_IDs[(reagent, well_volume)] = _Mastermix_Reagent(reagent, well_volume)
+                    # Add the well to the relevant reagent id (create the entry if needed)
+                    Wells_By_Reagent_ID[reagent_id] = Wells_By_Reagent_ID.get(reagent_id, 0) | well_bit
+
+        # Get a list of reagent IDs ordered by volume/well (ascending)
+        ## Reagent IDs with the same volume/well are in alphabetical order of their labels - needed to ensure consistency when doing random shuffles
+        Ordered_Reagent_IDs = sorted(Wells_By_Reagent_ID, key=lambda reagent_id: (reagent_id.volume, reagent_id.id))
+
+        # Removed excluded reagents (i.e. those not to be used in mastermixes)
+        Ordered_Reagent_IDs = [
+            reagent_id
+            for reagent_id in Ordered_Reagent_IDs
+            if not any(excluded_reagent in reagent_id.id for excluded_reagent in Excluded_Reagents)
+        ]
+
+        # Pairs of reagent names which must not be combined in a mastermix
+        Excluded_Pairs = set(
+            frozenset((reagent_1, reagent_2))
+            for excluded_combo in Excluded_Combinations
+            for reagent_1 in excluded_combo
+            for reagent_2 in excluded_combo
+        )
+
+        #####################################
+
+        # Check for linked reagents (where reagent ids share the same well set)
+
+        reagents_checked = set()  # Used to ensure combinations, NOT permutations
+        Linked_Reagents = []
+
+        for reagent_id in Ordered_Reagent_IDs:
+            linked_reagents = [reagent_id]  # temp list for inside loop
+            reagent_well_set = Wells_By_Reagent_ID[
+                reagent_id
+            ]  # well set for the current reagent
+            for candidate_reagent in Ordered_Reagent_IDs:
+                if candidate_reagent == reagent_id:
+                    # Don't link a reagent with itself
+                    continue
+                elif candidate_reagent in reagents_checked:
+                    # Ignore already checked reagents - avoids permutations
+                    continue
+                elif reagent_well_set == Wells_By_Reagent_ID[candidate_reagent]:
+                    # If the reagent well sets are identical, then link the reagents
+                    linked_reagents.append(candidate_reagent)
+                    # Make sure that the linked reagents aren't excluded combinations
+                    if frozenset((candidate_reagent.name, reagent_id.name)) in Excluded_Pairs:
+                        linked_reagents.remove(
+                            candidate_reagent
+                        )  # remove it if it is an excluded combo
+
+            # Reagent volumes will be scaled up to ensure that the mastermix can service the correct number of wells,
+            ## and to also ensure that the lowest volume reagent can be added with a transfer volume above the min transfer vol
+            # Check that this scale up will not put the total mastermix volume above the total well capacity if these linked reagents were used
+            lowest_vol_reag = [
+                reag
+                for reag in linked_reagents
+                if reag.volume
+                == min([reag.volume for reag in linked_reagents])
+            ][0]
+            if (
+                lowest_vol_reag.volume
+                * (_count_wells(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions)
+                >= Min_Transfer_Volume
+            ):
+                potential_mm_reaction_num = (
+                    _count_wells(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions
+                )
+            else:
+                potential_mm_reaction_num = Min_Transfer_Volume / lowest_vol_reag.volume
+            # If the sum of all mm reagents multiplied by the number of required reagents would be more than the max mastermix vol allowed
+            ## then remove the highest vol reagent until the vol is below the max volume allowed
+            total_potential_mastermix_volume = sum(
+                [
+                    reag.volume * potential_mm_reaction_num
+                    for reag in linked_reagents
+                ]
+            )
+            while total_potential_mastermix_volume > Maximum_Mastermix_Volume:
+                linked_reagents.remove(
+                    [
+                        reag
+                        for reag in linked_reagents
+                        if reag.volume
+                        == max([reag.volume for reag in linked_reagents])
+                    ][0]
+                )
+                total_potential_mastermix_volume = sum(
+                    [
+                        reag.volume * potential_mm_reaction_num
+                        for reag in linked_reagents
+                    ]
+                )
+
+            # Check if the current reagent was linked with any other reagent(s)
+            if len(linked_reagents) == 1:
+                pass
+            else:
+                Linked_Reagents.append(linked_reagents)
+
+            # Mark that the reagent has been checked
+            reagents_checked.add(reagent_id)
+
+        self.well_locations = Well_Locations
+        self.wells_by_reagent_id = Wells_By_Reagent_ID
+        self.ordered_reagent_ids = Ordered_Reagent_IDs
+        self.excluded_pairs = Excluded_Pairs
+        self.linked_reagents = Linked_Reagents
+
+    def attempt(self, Seed=None):
+        # Returns a list of Mastermix objects (whose wells are bitmasks), or raises MastermixError if there is no solution
+        Maximum_Mastermix_Volume = self.maximum_mastermix_volume
+        Min_Transfer_Volume = self.min_transfer_volume
+        Extra_Reactions = self.extra_reactions
+        Preferential_Reagents = self.preferential_reagents
+        Excluded_Pairs = self.excluded_pairs
+        Linked_Reagents = self.linked_reagents
+        # Well sets are used up as mastermixes are created, so each attempt works on its own copy
+        Wells_By_Reagent_ID = dict(self.wells_by_reagent_id)
+        Ordered_Reagent_IDs = list(self.ordered_reagent_ids)
+
+        # Create the mastermixes
+
+        No_Solution = False
+
+        if Seed:
+            random.Random(Seed).shuffle(Ordered_Reagent_IDs)
+
+        Mastermixes = []
+        for reagent_id in Ordered_Reagent_IDs:
+
+            # Check if the reagent's volume/well is below the trasfer threshold
+            if reagent_id.volume < Min_Transfer_Volume or reagent_id.name in Preferential_Reagents:
+                mastermix_reagents = [reagent_id]  # list to hold the mastermix components
+                mastermix_per_well = reagent_id.volume  # to track the volume of MM to add per well
+                current_reagent_well_set = Wells_By_Reagent_ID[
+                    reagent_id
+                ]  # set of wells which need to be statisifed by the MMs
+
+                # Check if the reagent's well set is empty
+                ## This can occur if the reagent has been satisified by other mastermixes
+                if current_reagent_well_set == 0:
+                    continue
+
+
+                ##########################################
+                # Check if there are any linked reagents #
+                ##########################################
+                for linked_reagents in Linked_Reagents:
+                    if reagent_id in linked_reagents:
+                        # For any linked reagents found...
+                        for linked_reagent in linked_reagents:
+                            # Skip the current reagent in the list so it isn't added to itself
+                            if linked_reagent == reagent_id:
                                 continue
+                            # Check that the linked reagent hasn't already been used up in other mastermixes
+                            elif Wells_By_Reagent_ID[linked_reagent] == 0:
+                                continue
+                            else:
+                                mastermix_reagents.append(linked_reagent)
+                                mastermix_per_well += linked_reagent.volume
+                # Check if the MM per well is above the threshold
+                if mastermix_per_well >= Min_Transfer_Volume:
+                    # If it is, then create the mastermix
+                    mastermix_name = ":".join([reagent.id for reagent in mastermix_reagents])
+                    # Check if any linked reagents have already been used
+                    if False in [
+                        current_reagent_well_set == Wells_By_Reagent_ID[mm_reag]
+                        for mm_reag in mastermix_reagents
+                    ]:
+                        # If the well sets are not equal, then just skip to the next code block (essentially means that the simple solution failed...)
+                        # Reset the variables first...
+                        mastermix_reagents = [
+                            reagent_id
+                        ]  # list to hold the mastermix components
+                        mastermix_per_well = reagent_id.volume  # to track the volume of MM to add per well
+                        current_reagent_well_set = Wells_By_Reagent_ID[
+                            reagent_id
+                        ]  # set of wells which need to be statisifed by the MMs
+                        pass
+                    else:
+                        mastermix_well_set = current_reagent_well_set
+                        Mastermixes.append(
+                            Mastermix(
+                                mastermix_name,
+                                mastermix_reagents.copy(),
+                                mastermix_well_set,
+                            )
+                        )
+                        # Remove the used wells from the reagent IDs
+                        for used_reagent in mastermix_reagents:
+                            Wells_By_Reagent_ID[used_reagent] &= ~mastermix_well_set
 
-                            # Make sure that adding the reagent wouldn't put the mastermix volume over the max allowed
-                            # Reagent volumes will be scaled up to ensure that the mastermix can service the correct number of wells,
-                            ## and to also ensure that the lowest volume reagent can be added with a transfer volume above the min transfer vol
-                            # Check that this scale up will not put the total mastermix volume above the total well capacity if these linked reagents were used
-                            # Only bother checking if the candidate reagent shares wells with the current reagent
-                            if (
-                                len(
-                                    current_reagent_well_set.intersection(
-                                        Wells_By_Reagent_ID[candidate_reagent]
-                                    )
+                        # Then continue to the next reagent in need of a mastermix
+                        continue
+                else:
+                    # If not, pass to the next code block to add some more components
+                    pass
+
+                ###############################################################
+                # Add components until the MM per well is above the threshold #
+                ###############################################################
+                split = (
+                    []
+                )  # This is used to keep track of things if multiple MMs are needed for a reagent
+                ## split is a list of sets: split = [ [wells: set, mm_reagents: set] ]
+                split_active = (
+                    False  # True when there are still wells that need to be dealt with
+                )
+                ## split variables hold wells that are not currently active
+                ## mastermix_ variables hold currently active wells (actively trying to satisify)
+
+                # Keep looping until the MM per well is above the threshold and all wells have been satisified
+                while (
+                    mastermix_per_well < Min_Transfer_Volume
+                    or current_reagent_well_set != 0
+                    or split_active
+                ):
+                    # Start by identifying the reagent with the most wells in common
+                    ## (if there is a tie, the reagent with lowest vol/well is selected)
+                    common_wells = 0
+                    chosen_component = ""
+                    chosen_components = []
+                    preferential_selected = False
+                    for candidate_reagent in Ordered_Reagent_IDs:
+                        # Make sure that the linked reagents aren't excluded combinations
+                        if frozenset((candidate_reagent.name, reagent_id.name)) in Excluded_Pairs:
+                            continue
+
+                        # Make sure that adding the reagent wouldn't put the mastermix volume over the max allowed
+                        # Reagent volumes will be scaled up to ensure that the mastermix can service the correct number of wells,
+                        ## and to also ensure that the lowest volume reagent can be added with a transfer volume above the min transfer vol
+                        # Check that this scale up will not put the total mastermix volume above the total well capacity if these linked reagents were used
+                        # Only bother checking if the candidate reagent shares wells with the current reagent
+                        if current_reagent_well_set & Wells_By_Reagent_ID[candidate_reagent]:
+                            lowest_vol_reag = [
+                                reag
+                                for reag in mastermix_reagents + [candidate_reagent]
+                                if reag.volume
+                                == min(
+                                    [
+                                        reag.volume
+                                        for reag in mastermix_reagents + [candidate_reagent]
+                                    ]
                                 )
-                                > 0
+                            ][0]
+                            if (
+                                lowest_vol_reag.volume
+                                * (_count_wells(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions)
+                                >= Min_Transfer_Volume
                             ):
-                                lowest_vol_reag = [
-                                    reag
-                                    for reag in mastermix_reagents + [candidate_reagent]
-                                    if _get_vol_per_well(reag)
-                                    == min(
-                                        [
-                                            _get_vol_per_well(reag)
-                                            for reag in mastermix_reagents + [candidate_reagent]
-                                        ]
-                                    )
-                                ][0]
+                                potential_mm_reaction_num = (
+                                    _count_wells(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions
+                                )
+                                # If the sum of all mm reagents multiplied by the number of required reagents would be more than the max mastermix vol allowed, then continue
+                                total_potential_mastermix_volume = sum(
+                                    [
+                                        reag.volume * potential_mm_reaction_num
+                                        for reag in mastermix_reagents + [candidate_reagent]
+                                    ]
+                                )
+                                if total_potential_mastermix_volume > Maximum_Mastermix_Volume:
+                                    continue
+                            else:
+                                potential_mm_reaction_num = (
+                                    Min_Transfer_Volume / lowest_vol_reag.volume
+                                )
+                                # before continuing, check if the number of reactions required by the lowest vol reagent will always make the candidate reagent above the max
+                                ## vol allowed
                                 if (
-                                    _get_vol_per_well(lowest_vol_reag)
-                                    * (len(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions)
-                                    >= Min_Transfer_Volume
+                                    candidate_reagent.volume
+                                    * potential_mm_reaction_num
+                                    > Maximum_Mastermix_Volume
                                 ):
-                                    potential_mm_reaction_num = (
-                                        len(Wells_By_Reagent_ID[lowest_vol_reag]) + Extra_Reactions
-                                    )
-                                    # If the sum of all mm reagents multiplied by the number of required reagents would be more than the max mastermix vol allowed, then continue
-                                    total_potential_mastermix_volume = sum(
-                                        [
-                                            _get_vol_per_well(reag) * potential_mm_reaction_num
-                                            for reag in mastermix_reagents + [candidate_reagent]
-                                        ]
-                                    )
-                                    if total_potential_mastermix_volume > Maximum_Mastermix_Volume:
-                                        # print(total_potential_mastermix_volume, Maximum_Mastermix_Volume, reagent_id, candidate_reagent)
-                                        continue
-                                else:
-                                    potential_mm_reaction_num = (
-                                        Min_Transfer_Volume / _get_vol_per_well(lowest_vol_reag)
-                                    )
-                                    # before continuing, if the number of reactions required by the lowest vol reagent will always make the candidate reagent above the max
-                                    ## vol allowed, then mark the reagents as excluded combos to ensure that they don't keep getting checked
-                                    if (
-                                        _get_vol_per_well(candidate_reagent)
-                                        * potential_mm_reaction_num
-                                        > Maximum_Mastermix_Volume
-                                    ):
-                                        Excluded_Combinations.append(
-                                            [candidate_reagent, lowest_vol_reag]
-                                        )
-                                        continue
-                                    # If the sum of all mm reagents multiplied by the number of required reagents would be more than the max mastermix vol allowed, then continue
-                                    total_potential_mastermix_volume = sum(
-                                        [
-                                            _get_vol_per_well(reag) * potential_mm_reaction_num
-                                            for reag in mastermix_reagents + [candidate_reagent]
-                                        ]
-                                    )
-                                    if total_potential_mastermix_volume > Maximum_Mastermix_Volume:
-                                        continue
-
-                            if candidate_reagent == reagent_id:
-                                # don't check reagents with theirselves
-                                continue
-                            elif candidate_reagent in mastermix_reagents:
-                                # Don't add duplicate reagents
-                                continue
-
-                            elif candidate_reagent.split("_vol_")[0] in Preferential_Reagents:
-                                preferential_selected = True
-                                # If the candidate is a preferential reagent, choose it over non-preferential reagents
-                                if len(
-                                    current_reagent_well_set.intersection(
-                                        Wells_By_Reagent_ID[candidate_reagent]
-                                    )
-                                ) > len(common_wells):
-                                    # If so, store this as the current best option (may get overwritten later)
-                                    common_wells = current_reagent_well_set.intersection(
-                                        Wells_By_Reagent_ID[candidate_reagent]
-                                    )
-                                    chosen_component = candidate_reagent
-                            # Check if the number of wells in common is higher than the currently recorded number
-                            elif (
-                                len(
-                                    current_reagent_well_set.intersection(
-                                        Wells_By_Reagent_ID[candidate_reagent]
-                                    )
+                                    continue
+                                # If the sum of all mm reagents multiplied by the number of required reagents would be more than the max mastermix vol allowed, then continue
+                                total_potential_mastermix_volume = sum(
+                                    [
+                                        reag.volume * potential_mm_reaction_num
+                                        for reag in mastermix_reagents + [candidate_reagent]
+                                    ]
                                 )
-                                > len(common_wells)
-                                and not preferential_selected
-                            ):
+                                if total_potential_mastermix_volume > Maximum_Mastermix_Volume:
+                                    continue
+
+                        if candidate_reagent == reagent_id:
+                            # don't check reagents with theirselves
+                            continue
+                        elif candidate_reagent in mastermix_reagents:
+                            # Don't add duplicate reagents
+                            continue
+
+                        elif candidate_reagent.name in Preferential_Reagents:
+                            preferential_selected = True
+                            # If the candidate is a preferential reagent, choose it over non-preferential reagents
+                            if _count_wells(
+                                current_reagent_well_set & Wells_By_Reagent_ID[candidate_reagent]
+                            ) > _count_wells(common_wells):
                                 # If so, store this as the current best option (may get overwritten later)
-                                common_wells = current_reagent_well_set.intersection(
-                                    Wells_By_Reagent_ID[candidate_reagent]
-                                )
+                                common_wells = current_reagent_well_set & Wells_By_Reagent_ID[candidate_reagent]
                                 chosen_component = candidate_reagent
-                        chosen_components = [
-                            chosen_component
-                        ]  # make a list to make downstreaming processing easier
+                        # Check if the number of wells in common is higher than the currently recorded number
+                        elif (
+                            _count_wells(
+                                current_reagent_well_set & Wells_By_Reagent_ID[candidate_reagent]
+                            )
+                            > _count_wells(common_wells)
+                            and not preferential_selected
+                        ):
+                            # If so, store this as the current best option (may get overwritten later)
+                            common_wells = current_reagent_well_set & Wells_By_Reagent_ID[candidate_reagent]
+                            chosen_component = candidate_reagent
+                    chosen_components = [
+                        chosen_component
+                    ]  # make a list to make downstreaming processing easier
+
+                    # Check if there were any identified reagents
+                    if not chosen_components == [""]:
+                        # If there were, then check if it satisifies all wells or not
+                        # (the common wells are always a subset of the current well set)
+                        if not current_reagent_well_set == common_wells:
+                            ## If the chosen component only applies to a subset of wells, activate the split
+                            split_active = True
+                            # Store the non-common wells in the split, along with the current reagents
+                            split_tracker_wells = current_reagent_well_set ^ common_wells
+                            split_tracker_reagents = mastermix_reagents.copy()
+                            split.append(
+                                [split_tracker_wells, split_tracker_reagents.copy()]
+                            )
+                            # Remove split wells from the active mastermix_wells
+                            current_reagent_well_set &= ~split_tracker_wells
+                        else:
+                            # If applies to all wells, then just pass
+                            pass
 
-                        # Check if there were any identified reagents
-                        if not chosen_components == [""]:
-                            # print("chosen comps", chosen_components)
+                    else:
+                        # if no remaining reagent has any common wells, then start looking at breaking apart current MMs
+                        common_wells = 0
+                        chosen_mastermix = None
+                        for mastermix in Mastermixes:
+                            if _count_wells(
+                                current_reagent_well_set & mastermix.wells
+                            ) > _count_wells(common_wells):
+                                # Make sure that the linked reagents aren't excluded combinations
+                                if any(
+                                    frozenset((reagent_in_candidate_mm.name, reagent_id.name)) in Excluded_Pairs
+                                    for reagent_in_candidate_mm in mastermix.reagents
+                                ):
+                                    continue
+                                common_wells = current_reagent_well_set & mastermix.wells
+                                chosen_mastermix = mastermix
+                        # Check if a mastermix was found
+                        if chosen_mastermix:
+                            # Remove the common wells from the chosen mastermix as they will be re-assigned to the new mastermix
+                            chosen_mastermix.wells &= ~common_wells
+                            # If the mastermix is now not servicing any wells, delete it
+                            if chosen_mastermix.wells == 0:
+                                Mastermixes.remove(chosen_mastermix)
+                            # Store the components from the chosen mastermix
+                            chosen_components = chosen_mastermix.reagents.copy()
                             # If there were, then check if it satisifies all wells or not
-                            if not len(current_reagent_well_set) == len(common_wells):
-                                ## If the chosen component only applies to a subset of wells, activate the split
+                            if not current_reagent_well_set == common_wells:
+                                # If the chosen component only applies to a subset of wells, activate the split
                                 split_active = True
                                 # Store the non-common wells in the split, along with the current reagents
-                                split_tracker_wells = current_reagent_well_set.symmetric_difference(
-                                    common_wells
-                                )
+                                split_tracker_wells = current_reagent_well_set ^ common_wells
                                 split_tracker_reagents = mastermix_reagents.copy()
                                 split.append(
-                                    [split_tracker_wells.copy(), split_tracker_reagents.copy()]
+                                    [split_tracker_wells, split_tracker_reagents.copy()]
                                 )
                                 # Remove split wells from the active mastermix_wells
-                                current_reagent_well_set -= split_tracker_wells
+                                current_reagent_well_set = common_wells
                             else:
                                 # If applies to all wells, then just pass
                                 pass
 
                         else:
-                            # print("chosen comps", chosen_components)
-                            # if no remaining reagent has any common wells, then start looking at breaking apart current MMs
-                            common_wells = set()
-                            chosen_mastermix = None
-                            for mastermix in Mastermixes:
-                                # print(current_reagent_well_set, mastermix.wells)
-                                if len(
-                                    current_reagent_well_set.intersection(mastermix.wells)
-                                ) > len(common_wells):
-                                    # check that none of the current reagents are in the identified mastermix
-                                    if (
-                                        len(
-                                            current_reagent_well_set.intersection(
-                                                mastermix.reagents
-                                            )
-                                        )
-                                        > 0
-                                    ):
-                                        continue
-                                    # Make sure that the linked reagents aren't excluded combinations
-                                    exclude = False
-                                    for excluded_combo in Excluded_Combinations:
-                                        for reagent_in_candidate_mm in mastermix.reagents:
-                                            if (
-                                                reagent_in_candidate_mm.split("_vol_")[0]
-                                                in excluded_combo
-                                                and reagent_id.split("_vol_")[0] in excluded_combo
-                                            ):
-                                                exclude = True
-                                                break
-                                    if exclude:
-                                        continue
-                                    common_wells = current_reagent_well_set.intersection(
-                                        mastermix.wells
-                                    )
-                                    chosen_mastermix = mastermix
-                            # Check if a mastermix was found
-                            if chosen_mastermix:
-                                # print("chosen mm", chosen_mastermix.name)
-                                # Remove the common wells from the chosen mastermix as they will be re-assigned to the new mastermix
-                                chosen_mastermix.wells -= common_wells
-                                # If the mastermix is now not servicing any wells, delete it
-                                if len(chosen_mastermix.wells) == 0:
-                                    Mastermixes.remove(chosen_mastermix)
-                                # Store the components from the chosen mastermix
-                                chosen_components = chosen_mastermix.reagents.copy()
-                                # If there were, then check if it satisifies all wells or not
-                                if not len(current_reagent_well_set) == len(common_wells):
-                                    # If the chosen component only applies to a subset of wells, activate the split
-                                    split_active = True
-                                    # Store the non-common wells in the split, along with the current reagents
-                                    split_tracker_wells = (
-                                        current_reagent_well_set.symmetric_difference(common_wells)
-                                    )
-                                    split_tracker_reagents = mastermix_reagents.copy()
-                                    split.append(
-                                        [split_tracker_wells.copy(), split_tracker_reagents.copy()]
-                                    )
-                                    # Remove split wells from the active mastermix_wells
-                                    current_reagent_well_set = common_wells.copy()
-                                else:
-                                    # If applies to all wells, then just pass
-                                    pass
-
-                            else:
-                                # If no mastermixes could be found to split, then raise an error
-                                No_Solution = True
-                                break
-
-                        # update mastermix components
-                        for chosen_component in chosen_components:
-                            # print("Add comp", chosen_component)
-                            mastermix_reagents.append(chosen_component)
-                            mastermix_per_well += _get_vol_per_well(chosen_component)
-                        # Check if the mm per well is above the threshold
-                        if mastermix_per_well >= Min_Transfer_Volume:
-                            # print("mm_per_well_sanity_check", mastermix_per_well, Min_Transfer_Volume)
-                            # print("Reagent:", reagent_id)
-                            # print("mm reag", mastermix_reagents)
-                            # if yes, then mark the active well set as satisified and create a mastermix
-                            mastermix_name = ":".join(mastermix_reagents)
-                            mastermix_well_set = current_reagent_well_set.copy()  # active well set
-                            Mastermixes.append(
-                                Mastermix(
-                                    mastermix_name, mastermix_reagents.copy(), mastermix_well_set
-                                )
+                            # If no mastermixes could be found to split, then raise an error
+                            No_Solution = True
+                            break
+
+                    # update mastermix components
+                    for chosen_component in chosen_components:
+                        mastermix_reagents.append(chosen_component)
+                        mastermix_per_well += chosen_component.volume
+                    # Check if the mm per well is above the threshold
+                    if mastermix_per_well >= Min_Transfer_Volume:
+                        # if yes, then mark the active well set as satisified and create a mastermix
+                        mastermix_name = ":".join([reagent.id for reagent in mastermix_reagents])
+                        mastermix_well_set = current_reagent_well_set  # active well set
+                        Mastermixes.append(
+                            Mastermix(
+                                mastermix_name, mastermix_reagents.copy(), mastermix_well_set
                             )
-                            # Remove the used wells from the reagent IDs
-                            for used_reagent in mastermix_reagents:
-                                # print("Current {} well set: {}".format(used_reagent, Wells_By_Reagent_ID[used_reagent]))
-                                Wells_By_Reagent_ID[used_reagent] -= mastermix_well_set
-                                # print("Updated {} well set: {}".format(used_reagent, Wells_By_Reagent_ID[used_reagent]))
-                            # print("---")
-                            # Mark the current wells as satisified
-                            current_reagent_well_set.clear()
-
-                            if split_active:
-                                ## Apply the most recent split as active
-                                current_reagent_well_set = split[-1][0]
-                                mastermix_reagents = split[-1][1]
-                                mastermix_per_well = sum(
-                                    [_get_vol_per_well(r) for r in mastermix_reagents]
-                                )
-                                split.remove(split[-1])
-                                if len(split) == 0:
-                                    split_active = False
-                                else:
-                                    pass
-                        else:
-                            # if mm/well is not above the threshold, then keep looping
-                            continue
+                        )
+                        # Remove the used wells from the reagent IDs
+                        for used_reagent in mastermix_reagents:
+                            Wells_By_Reagent_ID[used_reagent] &= ~mastermix_well_set
+                        # Mark the current wells as satisified
+                        current_reagent_well_set = 0
+
+                        if split_active:
+                            ## Apply the most recent split as active
+                            current_reagent_well_set = split[-1][0]
+                            mastermix_reagents = split[-1][1]
+                            mastermix_per_well = sum(
+                                [r.volume for r in mastermix_reagents]
+                            )
+                            split.remove(split[-1])
+                            if len(split) == 0:
+                                split_active = False
+                            else:
+                                pass
+                    else:
+                        # if mm/well is not above the threshold, then keep looping
+                        continue
 
-                    if No_Solution:
-                        break
+                if No_Solution:
+                    break
 
-                else:
-                    # If the reagent vol/well is already above the threshold, then just skip
-                    continue
+            else:
+                # If the reagent vol/well is already above the threshold, then just skip
+                continue
 
-            if No_Solution:
-                raise MastermixError("No solution could be found with these constraints.")
+        if No_Solution:
+            raise MastermixError("No solution could be found with these constraints.")
+
+        return Mastermixes
+
+    def solve_exact(self, Deadline=None, Progress=None):
+        # Returns a list of Mastermix objects (whose wells are bitmasks) which uses the fewest mastermixes possible, and
+        # then the fewest transfers, or raises MastermixError if there is no solution
+        # If a deadline (from time.monotonic) is given, the best solution found by then is returned instead, or None if
+        # the deadline passes before any solution is found
+        # `Progress` is called with the number of solver runs so far and the number of mastermixes in the best solution
+        # Wells which contain the same reagent IDs are grouped into composition classes, and an integer program chooses
+        # how many wells of each class use each possible set of mastermixes (a pattern)
+        if _pulp is None:
+            raise ImportError("PuLP is required for the exact mastermix optimizer (pip install BiomationScripter[exact])")
+
+        Maximum_Mastermix_Volume = self.maximum_mastermix_volume
+        Min_Transfer_Volume = self.min_transfer_volume
+        Extra_Reactions = self.extra_reactions
+        Excluded_Pairs = self.excluded_pairs
+
+        def out_of_time():
+            return Deadline is not None and time.monotonic() >= Deadline
+
+        # Reagents which are below the minimum transfer volume must be added via a mastermix
+        Required_Reagent_IDs = set(
+            reagent_id
+            for reagent_id in self.ordered_reagent_ids
+            if reagent_id.volume < Min_Transfer_Volume
+        )
+
+        # Group the destination wells into composition classes
+        ## Reagents are always listed in the order of Ordered_Reagent_IDs, so each class (and each mastermix) has one key
+        Reagents_By_Well = {}
+        for reagent_id in self.ordered_reagent_ids:
+            well_mask = self.wells_by_reagent_id[reagent_id]
+            while well_mask:
+                well_bit = well_mask & -well_mask
+                Reagents_By_Well.setdefault(well_bit, []).append(reagent_id)
+                well_mask ^= well_bit
+
+        Wells_By_Class = {}
+        for well_bit in sorted(Reagents_By_Well):
+            Wells_By_Class.setdefault(tuple(Reagents_By_Well[well_bit]), []).append(well_bit)
+
+        # The maximum number of wells one mastermix of a given composition can service (None if it can't be used)
+        Mastermix_Capacity = {}
+
+        def get_capacity(Composition):
+            if Composition not in Mastermix_Capacity:
+                capacity = None
+                volume_per_well = sum([reagent.volume for reagent in Composition])
+                # Extra reactions are added when the mastermix is made so that every reagent is above the minimum transfer volume
+                min_reactions = Min_Transfer_Volume / min([reagent.volume for reagent in Composition])
+                excluded = any(
+                    frozenset((reagent_1.name, reagent_2.name)) in Excluded_Pairs
+                    for reagent_1, reagent_2 in itertools.combinations(Composition, 2)
+                )
+                if (
+                    not excluded
+                    and volume_per_well >= Min_Transfer_Volume
+                    and volume_per_well * min_reactions <= Maximum_Mastermix_Volume
+                ):
+                    capacity = _math.floor(Maximum_Mastermix_Volume / volume_per_well - Extra_Reactions + 1e-9)
+                    if capacity < 1:
+                        capacity = None
+                Mastermix_Capacity[Composition] = capacity
+            return Mastermix_Capacity[Composition]
+
+        Class_Reagent_Sets = [set(reagents) for reagents in Wells_By_Class]
+
+        def get_compositions(Reagents):
+            # The possible mastermixes for a class, largest first
+            ## For small classes this is every subset, but this grows exponentially with the number of reagents, so
+            ## wider classes only use sets of reagents which occur together in other classes, and pairs of reagents
+            if len(Reagents) <= _MAX_EXACT_MASTERMIX_CLASS_REAGENTS:
+                candidates = (
+                    composition
+                    for size in range(len(Reagents), 1, -1)
+                    for composition in itertools.combinations(Reagents, size)
+                )
             else:
-                Solved = True  # break out of the while loop with a solution
+                candidates = [Reagents]
+                for reagent_set in Class_Reagent_Sets:
+                    candidates.append(tuple(reagent for reagent in Reagents if reagent in reagent_set))
+                for reagent_1, reagent_2 in itertools.combinations(Reagents, 2):
+                    candidates.append((reagent_1, reagent_2))
+                # Sets which can't be used in a mastermix are reduced by removing their highest volume reagents
+                reduced_candidates = []
+                for composition in candidates:
+                    while len(composition) > 2 and not get_capacity(composition):
+                        largest = max(composition, key=lambda reagent: reagent.volume)
+                        composition = tuple(reagent for reagent in composition if reagent is not largest)
+                    reduced_candidates.append(composition)
+                candidates = sorted(set(reduced_candidates), key=lambda composition: -len(composition))
+            return [
+                composition
+                for composition in candidates
+                if len(composition) > 1
+                and not Required_Reagent_IDs.isdisjoint(composition)
+                and get_capacity(composition)
+            ]
 
-        # If a solution is not possible
-        except MastermixError:
-            # If this was the first attempt
-            if First_Attempt:
-                # Check if a seed was given
-                if Seed:
-                    raise MastermixError(
-                        "No solution could be found with these constraints and a seed of {}".format(
-                            Seed
-                        )
+        def get_patterns(Reagents):
+            # Sets of non-overlapping mastermixes which include all of the required reagents of a class
+            ## Patterns with fewer, larger, mastermixes are found first, and at most _MAX_EXACT_MASTERMIX_PATTERNS are used
+            ## The search also stops if the deadline passes
+            required_reagents = [reagent for reagent in Reagents if reagent in Required_Reagent_IDs]
+            compositions = get_compositions(Reagents)
+            patterns = []
+
+            def extend(pattern, used_reagents):
+                if len(patterns) >= _MAX_EXACT_MASTERMIX_PATTERNS or out_of_time():
+                    return
+                remaining_reagents = [reagent for reagent in required_reagents if reagent not in used_reagents]
+                if not remaining_reagents:
+                    patterns.append(tuple(pattern))
+                    return
+                # Each pattern is only found once, as the first remaining required reagent is always covered next
+                for composition in compositions:
+                    if remaining_reagents[0] in composition and used_reagents.isdisjoint(composition):
+                        extend(pattern + [composition], used_reagents.union(composition))
+
+            extend([], set())
+            return patterns
+
+        # Preferential reagents are used to break ties between solutions with the same number of transfers
+        ## Each preferential reagent added to a mastermix is worth less than one transfer over all of the wells
+        preferential_weight = 1 / (sum([len(reagents) * len(wells) for reagents, wells in Wells_By_Class.items()]) + 1)
+
+        model = _pulp.LpProblem("Mastermixes", _pulp.LpMinimize)
+
+        def add_variable(Name, **Options):
+            # Newer versions of PuLP create variables through the model, rather than on their own
+            if hasattr(model, "add_variable"):
+                return model.add_variable(Name, **Options)
+            return _pulp.LpVariable(Name, **Options)
+
+        Class_Patterns = []
+        Wells_Served = {}  # composition -> pattern variables which use the composition
+        Transfer_Costs = []
+        for class_index, (reagents, wells) in enumerate(Wells_By_Class.items()):
+            if Required_Reagent_IDs.isdisjoint(reagents):
+                continue
+            patterns = get_patterns(reagents)
+            if out_of_time():
+                return None
+            if not patterns:
+                raise MastermixError(
+                    "No solution could be found with these constraints: no mastermixes can be made for {}".format(
+                        ", ".join([reagent.id for reagent in reagents if reagent in Required_Reagent_IDs])
                     )
-                # If a seed wasn't given, then try shuffling the order of the reagents with different seeds
-                else:
-                    Seed = 0
-                    First_Attempt = False
-            else:
-                # Iterate the seed number
-                Seed += 1
-                # To stop infinte loops
-                if not First_Attempt:
-                    if Seed > 1000:
-                        raise MastermixError(
-                            """
-No solution could be found with these constraints. Try one of the following options:
-> Decrease the minimum transfer volume (if specified)
-> Decrease the stock concentration of highly concentrated source material
-> Use a mastermix labware with a higher well capacity (especially when there are a lot of samples)
-"""
-                        )
+                )
+            pattern_variables = []
+            for pattern_index, pattern in enumerate(patterns):
+                variable = add_variable(
+                    "wells_{}_{}".format(class_index, pattern_index), lowBound=0, upBound=len(wells), cat="Integer"
+                )
+                pattern_variables.append(variable)
+                for composition in pattern:
+                    Wells_Served.setdefault(composition, []).append(variable)
+                # One transfer per mastermix, plus one per reagent which is not in a mastermix
+                transfers_per_well = len(pattern) + len(reagents) - sum([len(composition) for composition in pattern])
+                preferential_per_well = len([
+                    reagent
+                    for composition in pattern
+                    for reagent in composition
+                    if reagent.name in self.preferential_reagents
+                ])
+                Transfer_Costs.append((transfers_per_well - preferential_weight * preferential_per_well) * variable)
+            model += _pulp.lpSum(pattern_variables) == len(wells)
+            Class_Patterns.append((wells, patterns, pattern_variables))
+
+        # No mastermixes are needed if no reagents are below the minimum transfer volume
+        if not Class_Patterns:
+            return []
+
+        Mastermix_Counts = {}
+        for composition_index, composition in enumerate(Wells_Served):
+            count = add_variable("mastermixes_{}".format(composition_index), lowBound=0, cat="Integer")
+            model += _pulp.lpSum(Wells_Served[composition]) <= get_capacity(composition) * count
+            Mastermix_Counts[composition] = count
+            # One transfer per reagent into each mastermix
+            Transfer_Costs.append(len(composition) * count)
+
+        def solve(Warm_Start=False):
+            # Solves the model (within the time left, if there is a deadline), and returns the value of each variable,
+            # or None if no solution was found
+            time_limit = None
+            if Deadline is not None:
+                time_limit = Deadline - time.monotonic()
+                if time_limit <= 0:
+                    return None
+            model.solve(_get_mastermix_solver(msg=False, warmStart=Warm_Start, timeLimit=time_limit))
+            # A solution found before the time limit is valid, even if it has not been shown to be optimal
+            if model.sol_status not in [_pulp.LpSolutionOptimal, _pulp.LpSolutionIntegerFeasible]:
+                return None
+            return {variable.name: int(round(variable.varValue)) for variable in model.variables()}
+
+        # The number of mastermixes is minimised first
+        Total_Mastermixes = _pulp.lpSum(list(Mastermix_Counts.values()))
+        model.setObjective(Total_Mastermixes)
+        Solution = solve()
+        if Solution is None:
+            if out_of_time():
+                return None
+            raise MastermixError("No solution could be found with these constraints.")
+        best_mastermix_count = sum([Solution[count.name] for count in Mastermix_Counts.values()])
+        if Progress:
+            Progress(1, best_mastermix_count)
+
+        # Then the number of transfers is minimised, without using any more mastermixes
+        ## The first solution is used as the starting point, and is kept if there is no time left to improve on it
+        if not out_of_time():
+            model += Total_Mastermixes <= best_mastermix_count
+            model.setObjective(_pulp.lpSum(Transfer_Costs))
+            Solution = solve(Warm_Start=True) or Solution
+            if Progress:
+                Progress(2, best_mastermix_count)
+
+        # Assign the wells of each class to mastermix compositions
+        Composition_Wells = {}
+        for wells, patterns, pattern_variables in Class_Patterns:
+            well_index = 0
+            for pattern, variable in zip(patterns, pattern_variables):
+                n_wells = Solution[variable.name]
+                for composition in pattern:
+                    Composition_Wells.setdefault(composition, []).extend(wells[well_index:well_index + n_wells])
+                well_index += n_wells
+
+        # Split the wells of each composition evenly between its mastermixes
+        reagent_order = {reagent_id: index for index, reagent_id in enumerate(self.ordered_reagent_ids)}
+        Mastermixes = []
+        for composition in sorted(Composition_Wells, key=lambda composition: [reagent_order[reagent] for reagent in composition]):
+            wells = sorted(Composition_Wells[composition])
+            if not wells:
+                continue
+            n_mastermixes = Solution[Mastermix_Counts[composition].name]
+            mastermix_name = ":".join([reagent.id for reagent in composition])
+            for mastermix_index in range(0, n_mastermixes):
+                mastermix_wells = wells[mastermix_index * len(wells) // n_mastermixes:(mastermix_index + 1) * len(wells) // n_mastermixes]
+                well_mask = 0
+                for well_bit in mastermix_wells:
+                    well_mask |= well_bit
+                Mastermixes.append(Mastermix(mastermix_name, list(composition), well_mask))
+
+        return Mastermixes
+
+
+def _apply_mastermixes(
+    Mastermixes, Well_Locations, Destination_Layouts, Mastermix_Layout, Min_Transfer_Volume, Extra_Reactions
+):
+    # Adds the mastermixes found by either optimizer to the mastermix layout(s), and replaces their reagents in the
+    # destination layouts with the mastermixes
+    # Returns the mastermixes (with well locations and reagent ID labels) and the mastermix layouts
+
+    # Convert the mastermix well bitmasks back to sets of well locations (INDEX_WELL)
+    for mm in Mastermixes:
+        mm.wells = _wells_from_mask(mm.wells, Well_Locations)
 
     # Remove any empty (or component of 1) mastermixes
     ## These are MMs which were generated at some point, but then were split out into other mastermixes and no longer service any wells
 
     for mm in Mastermixes.copy():
-        print(mm.reagents)
-        if sum([_get_vol_per_well(reagent) for reagent in mm.reagents]) < Min_Transfer_Volume:
+        if sum([reagent.volume for reagent in mm.reagents]) < Min_Transfer_Volume:
             raise ValueError(mm.name)
         if len(mm.wells) == 0:
             Mastermixes.remove(mm)
         if len(mm.reagents) == 1:
-            print("rem")
             Mastermixes.remove(mm)
 
     # Set up the mastermix layout with the generated content
@@ -1681,18 +3181,18 @@ No solution could be found with these constraints. Try one of the following opti
         ## If not, additional extra reactions will be added to that mastermix
         extra_reactions = Extra_Reactions
         for reagent in mastermix.reagents:
-            volume = (len(mastermix.wells) + extra_reactions) * (_get_vol_per_well(reagent))
+            volume = (len(mastermix.wells) + extra_reactions) * reagent.volume
             # Make sure that the transfer volume TO the mastermix is above the threshold
             if volume < Min_Transfer_Volume:
                 extra_vol_needed = Min_Transfer_Volume - volume
-                extra_reactions_needed = extra_vol_needed / _get_vol_per_well(reagent)
+                extra_reactions_needed = extra_vol_needed / reagent.volume
                 extra_reactions += extra_reactions_needed
         # Add reagents to the mastermix layout
         for reagent in mastermix.reagents:
             Mastermix_Layouts[Mastermix_Layout_Index].add_content(
                 Well=well,
-                Reagent=reagent.split("_vol_")[0],
-                Volume=(len(mastermix.wells) + extra_reactions) * (_get_vol_per_well(reagent)),
+                Reagent=reagent.name,
+                Volume=(len(mastermix.wells) + extra_reactions) * reagent.volume,
             )
 
     # Modify the destination layout to now take mastermixes as reagents
@@ -1708,17 +3208,16 @@ No solution could be found with these constraints. Try one of the following opti
                     # Get the reagents that the mastermix covers
                     reagents = mastermix.reagents
                     # Calculate the volume of mastermix needed for this well
-                    mastermix_volume = sum([_get_vol_per_well(reagent) for reagent in reagents])
+                    mastermix_volume = sum([reagent.volume for reagent in reagents])
                     # Sanity check
                     if not mastermix_volume == sum(
                         [
                             Destination_Layout.get_volume_of_liquid_in_well(
-                                reagent.split("_vol_")[0], destination_well
+                                reagent.name, destination_well
                             )
                             for reagent in reagents
                         ]
                     ):
-                        # print("destination well content:", [reagent.split("_vol_")[0] for reagent in reagents], Destination_Layout.get_liquids_in_well(destination_well))
                         raise LabwareError(
                             "Mastermix Maker encountered an error with well {} mastermix {}: vol1 = {}, vol2 = {}".format(
                                 destination_well,
@@ -1727,7 +3226,7 @@ No solution could be found with these constraints. Try one of the following opti
                                 sum(
                                     [
                                         Destination_Layout.get_volume_of_liquid_in_well(
-                                            reagent.split("_vol_")[0], destination_well
+                                            reagent.name, destination_well
                                         )
                                         for reagent in reagents
                                     ]
@@ -1737,9 +3236,8 @@ No solution could be found with these constraints. Try one of the following opti
 
                     # Remove the reagents in the mastermix from the destination well
                     for reagent in reagents:
-                        # print("remove from destination {}: {}".format(Dest_Index, reagent))
                         Destination_Layout.clear_liquid_in_well(
-                            destination_well, reagent.split("_vol_")[0]
+                            destination_well, reagent.name
                         )
 
                     # Add mastermix to the destination well
@@ -1747,74 +3245,93 @@ No solution could be found with these constraints. Try one of the following opti
                         Well=destination_well, Reagent=mastermix.name, Volume=mastermix_volume
                     )
 
-    return (Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts)
-
-
-def fmol_calculator(mass_ng, length_bp):
-    return ((mass_ng * 1e-9) / ((length_bp * 617.96) + 36.04)) * 1e15
-
-def serial_dilution_volumes(dilution_factors, total_volume):
-    # Note that total volume is the amount the dilution will be made up to
-    ## The total volume of all dilutions other than the final will be lower than this
-    sample_volumes = []
-    solution_volumes = []
-
-    # This the the dilution factor of the source material for the first serial dilution
-    ## This is always 1, as the initial sample is assumed to be undiluted
-    source_dilution_factor = 1
+    # Mastermix reagents are reported by their reagent ID labels
+    for mastermix in Mastermixes:
+        mastermix.reagents = [reagent.id for reagent in mastermix.reagents]
 
-    for df in dilution_factors:
-        # Get the dilution factor of the current serial dilution being performed
-        destination_dilution_factor = df
+    return (Mastermixes, Mastermix_Layouts)
 
-        # Calculate the volume, in uL, of sample and solution required for each dilution factor
-        sample_volume = total_volume * (source_dilution_factor/destination_dilution_factor)
-        solution_volume = total_volume - sample_volume
 
-        # Store the volumes required for later use
-        sample_volumes.append(sample_volume)
-        solution_volumes.append(solution_volume)
+def _iterate_mastermix_seeds(Problem, Seeds, Processes, Deadline=None):
+    # Yields (seed, mastermixes) for each seed in the order given, where mastermixes is None if the seed has no solution
+    # Stops early if the deadline (from time.monotonic) passes
+    if Processes == 1:
+        for seed in Seeds:
+            if Deadline is not None and time.monotonic() >= Deadline:
+                return
+            try:
+                mastermixes = Problem.attempt(seed)
+            except MastermixError:
+                mastermixes = None
+            yield (seed, mastermixes)
+        return
+
+    workers = Processes or os.cpu_count() or 1
+    seeds = iter(Seeds)
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_set_mastermix_worker_problem, initargs=(Problem,)
+    )
+    finished = False
+    try:
+        # Keep every worker busy, but report the results in seed order so that the same seeds are found as when
+        ## searching one seed at a time
+        pending = [
+            (seed, executor.submit(_attempt_mastermix_seed, seed))
+            for seed in itertools.islice(seeds, workers * 2)
+        ]
+        while pending:
+            seed, future = pending.pop(0)
+            timeout = None if Deadline is None else max(0, Deadline - time.monotonic())
+            try:
+                mastermixes = future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                return
+            next_seed = next(seeds, None)
+            if next_seed is not None:
+                pending.append((next_seed, executor.submit(_attempt_mastermix_seed, next_seed)))
+            yield (seed, mastermixes)
+        finished = True
+    finally:
+        # If the deadline passes (or the caller stops early), seeds that have not started yet are cancelled, and the
+        ## attempts still running are not waited for
+        executor.shutdown(wait=finished, cancel_futures=True)
 
-        # Set the current dilution as the source for the next serial dilution
-        source_dilution_factor = df
 
-    return(sample_volumes, solution_volumes)
+def _count_mastermixes(Mastermixes):
+    # The number of mastermixes which will be made (empty and single reagent mastermixes are removed)
+    return len([mastermix for mastermix in Mastermixes if mastermix.wells and len(mastermix.reagents) > 1])
 
 
-def group_locations_by_content(Layouts):
-    locations = {} # {Reagent: vol, }: [(layout, well)]
+_mastermix_worker_problem = None
 
-    for layout in Layouts:
-        for well in layout.get_occupied_wells():
-            content = {}
-            for liquid in layout.get_liquids_in_well(well):
-                content[liquid] = layout.get_volume_of_liquid_in_well(liquid, well)
 
-            if str(content) in locations:
-                locations[str(content)].append((layout, well))
-            else:
-                locations[str(content)] = [(layout, well)]
+def _set_mastermix_worker_problem(Problem):
+    # Process pool initializer, so that the problem is only sent to each worker once
+    global _mastermix_worker_problem
+    _mastermix_worker_problem = Problem
 
-    return(locations)
 
-## Private ##
-def _get_well_layout_index(well):
-    return int(well.split("_")[0])
-
-
-def _Lrange(L1, L2):  # Between L1 and L2 INCLUSIVE of L1 and L2
-    L1 = ord(L1.upper())
-    L2 = ord(L2.upper())
-    for L in range(L1, L2 + 1):
-        yield (chr(L))
+def _attempt_mastermix_seed(Seed):
+    try:
+        return _mastermix_worker_problem.attempt(Seed)
+    except MastermixError:
+        return None
 
 
-def _Labware_Row_To_Index(row):
-    return ord(row.upper()) - ord("A")
+if hasattr(int, "bit_count"):
+    _count_wells = int.bit_count
+else:  # Python < 3.10
+    def _count_wells(Well_Mask):
+        return bin(Well_Mask).count("1")
 
 
-def _get_vol_per_well(Reagent_ID):
-    return float(Reagent_ID.split("_vol_")[1])
+def _wells_from_mask(Well_Mask, Well_Locations):
+    wells = set()
+    while Well_Mask:
+        well_bit = Well_Mask & -Well_Mask
+        wells.add(Well_Locations[well_bit.bit_length() - 1])
+        Well_Mask ^= well_bit
+    return wells
 
 
 class MastermixError(Exception):
@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 long_description = """
 # BiomationScripter
@@ -41,4 +41,8 @@ setup(
         'BiomationScripter.EchoProto.Templates',
         'BiomationScripter.OTProto.Templates'
     ],
+    extras_require={
+        # Used by mastermixes_by_min_volume(Method="exact")
+        'exact': ['pulp[cbc]'],
+    },
 )
@@ -1,7 +1,10 @@
 import os
+import shutil
 from itertools import product
 from copy import deepcopy
 import tempfile
+import time
+import zipfile
 
 import pytest
 from opentrons import simulate as OT2
@@ -13,6 +16,12 @@ from BiomationScripter import OTProto as otp
 from BiomationScripter.EchoProto.Templates import Loop_Assembly, PCR
 from BiomationScripter.OTProto.Templates import Heat_Shock_Transformation
 
+@pytest.fixture(autouse=True)
+def layout_cache_directory(tmp_path, monkeypatch):
+    # Keep cached labware layouts out of the user's real cache directory
+    monkeypatch.setattr(bms, "_layout_cache_directory", None)
+    monkeypatch.setenv("BMS_LAYOUT_CACHE_DIR", str(tmp_path / "layout cache"))
+
 def test_fmol_calculator():
     mass1 = 120 # ng
     length1 = 1222 # bp
@@ -235,6 +244,253 @@ def test_mastermixes_by_min_volume_error():
             Seed = Seed
         )
 
+def test_mastermixes_by_min_volume_excluded_combinations():
+    Destination_Layout = bms.Labware_Layout("Destination", "greiner655087_96_wellplate_340ul")
+    Destination_Layout.define_format(8, 12)
+
+    Destination_Layout.bulk_add_content("A1:A12", "LB", 80)
+    Destination_Layout.bulk_add_content("A1:A6", "Cells 1", 19)
+    Destination_Layout.bulk_add_content("A7:A12", "Cells 2", 19)
+    Destination_Layout.bulk_add_content("A1:A3, A7:A9", "Water", 1)
+    Destination_Layout.bulk_add_content("A4:A6, A10:A12", "Inducer", 1)
+
+    Mastermix_Layout = bms.Labware_Layout("Mastermix", "3dprinted_24_tuberack_1500ul")
+    Mastermix_Layout.define_format(4, 6)
+    Mastermix_Layout.set_available_wells()
+
+    Excluded_Combinations = [
+        ["LB", "Inducer"],
+        ["LB", "Water"]
+    ]
+
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = bms.mastermixes_by_min_volume(
+        Destination_Layouts = [Destination_Layout],
+        Mastermix_Layout = Mastermix_Layout,
+        Maximum_Mastermix_Volume = 1000,
+        Min_Transfer_Volume = 5,
+        Extra_Reactions = 1,
+        Excluded_Combinations = Excluded_Combinations,
+        Seed = 1
+    )
+
+    # The user's list of excluded combinations is not modified
+    assert Excluded_Combinations == [["LB", "Inducer"], ["LB", "Water"]]
+
+    assert len(Mastermixes) == 4
+    assert Mastermixes[0].reagents == ['Inducer_vol_1.0', 'Cells 1_vol_19.0']
+    assert Mastermixes[0].wells == {'0_A4', '0_A5', '0_A6'}
+    assert Mastermixes[3].reagents == ['Water_vol_1.0', 'Cells 2_vol_19.0']
+    assert Mastermixes[3].wells == {'0_A7', '0_A8', '0_A9'}
+    for mastermix in Mastermixes:
+        assert 'LB_vol_80.0' not in mastermix.reagents
+
+    assert Destination_Layout.get_liquids_in_well("A1") == ["LB", "Water_vol_1.0:Cells 1_vol_19.0"]
+
+def test_mastermixes_by_min_volume_seed_search():
+    def solve(Processes):
+        Destination_Layout = bms.Labware_Layout("Destination", "greiner655087_96_wellplate_340ul")
+        Destination_Layout.define_format(8, 12)
+
+        Destination_Layout.bulk_add_content("A1:A12", "LB", 80)
+        Destination_Layout.bulk_add_content("A1:A6", "Cells 1", 19)
+        Destination_Layout.bulk_add_content("A7:A12", "Cells 2", 19)
+        Destination_Layout.bulk_add_content("A1:A3, A7:A9", "Water", 1)
+        Destination_Layout.bulk_add_content("A4:A6, A10:A12", "Inducer", 1)
+        Destination_Layout.bulk_add_content("A1, A5, A9, A12", "IPTG", 2)
+
+        Mastermix_Layout = bms.Labware_Layout("Mastermix", "3dprinted_24_tuberack_1500ul")
+        Mastermix_Layout.define_format(4, 6)
+        Mastermix_Layout.set_available_wells()
+
+        return bms.mastermixes_by_min_volume(
+            Destination_Layouts = [Destination_Layout],
+            Mastermix_Layout = Mastermix_Layout,
+            Maximum_Mastermix_Volume = 1000,
+            Min_Transfer_Volume = 5,
+            Extra_Reactions = 1,
+            Excluded_Combinations = [["LB", "IPTG"]],
+            Preferential_Reagents = ["Cells 1"],
+            Processes = Processes
+        )
+
+    # The unshuffled attempt fails, so other seeds are searched
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = solve(Processes = 1)
+    assert Seed == 7
+
+    # Searching in parallel finds the same seed and mastermixes
+    Parallel_Mastermixes, Parallel_Seed, Parallel_Destination_Layouts, Parallel_Mastermix_Layouts = solve(Processes = 2)
+    assert Parallel_Seed == 7
+    assert [(mm.reagents, mm.wells) for mm in Parallel_Mastermixes] == [(mm.reagents, mm.wells) for mm in Mastermixes]
+    assert Parallel_Destination_Layouts[0].get_liquids_in_well("A1") == Destination_Layouts[0].get_liquids_in_well("A1")
+
+def test_mastermixes_by_min_volume_exact():
+    def solve(Method, Time_Budget = None):
+        Destination_Layout = bms.Labware_Layout("Destination", "greiner655087_96_wellplate_340ul")
+        Destination_Layout.define_format(8, 12)
+
+        Destination_Layout.bulk_add_content("A1:A4", "LB", 80)
+        Destination_Layout.bulk_add_content("A1:A3", "Cells 2", 19)
+        Destination_Layout.add_content("A4", "Cells 1", 19)
+        Destination_Layout.add_content("A1", "Water", 1)
+        Destination_Layout.bulk_add_content("A2, A4", "Inducer", 1)
+        Destination_Layout.bulk_add_content("A2:A4", "IPTG", 1)
+
+        Mastermix_Layout = bms.Labware_Layout("Mastermix", "3dprinted_24_tuberack_1500ul")
+        Mastermix_Layout.define_format(4, 6)
+        Mastermix_Layout.set_available_wells()
+
+        return bms.mastermixes_by_min_volume(
+            Destination_Layouts = [Destination_Layout],
+            Mastermix_Layout = Mastermix_Layout,
+            Maximum_Mastermix_Volume = 1000,
+            Min_Transfer_Volume = 5,
+            Extra_Reactions = 1,
+            Method = Method,
+            Time_Budget = Time_Budget
+        )
+
+    with pytest.raises(ValueError):
+        solve("random")
+
+    pytest.importorskip("pulp")
+
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = solve("heuristic")
+    assert len(Mastermixes) == 4
+
+    # The exact optimizer finds a solution with fewer mastermixes
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = solve("exact")
+    assert Seed is None
+    assert len(Mastermixes) == 3
+
+    assert Mastermixes[0].reagents == ['IPTG_vol_1.0', 'Inducer_vol_1.0', 'LB_vol_80.0']
+    assert Mastermixes[0].wells == {'0_A2', '0_A4'}
+    assert Mastermixes[1].reagents == ['IPTG_vol_1.0', 'LB_vol_80.0']
+    assert Mastermixes[1].wells == {'0_A3'}
+    assert Mastermixes[2].reagents == ['Water_vol_1.0', 'Cells 2_vol_19.0']
+    assert Mastermixes[2].wells == {'0_A1'}
+
+    assert Mastermix_Layouts[0].get_volume_of_liquid_in_well("IPTG", "A1") == 5.0
+    assert Mastermix_Layouts[0].get_volume_of_liquid_in_well("LB", "A1") == 400.0
+    assert Destination_Layouts[0].get_liquids_in_well("A4") == ["Cells 1", "IPTG_vol_1.0:Inducer_vol_1.0:LB_vol_80.0"]
+    assert Destination_Layouts[0].get_volume_of_liquid_in_well("IPTG_vol_1.0:Inducer_vol_1.0:LB_vol_80.0", "A4") == 82.0
+
+    # If the exact optimizer runs out of time, the heuristic's solution is used
+    Start_Time = time.monotonic()
+    with pytest.warns(UserWarning, match = "heuristic"):
+        Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = solve("exact", Time_Budget = 0)
+    assert time.monotonic() - Start_Time < 5
+    assert len(Mastermixes) == 4
+
+def test_mastermixes_by_min_volume_exact_wide():
+    pytest.importorskip("pulp")
+
+    # Each well has 12 reagents below the minimum transfer volume, so not every subset of reagents can be considered
+    Destination_Layout = bms.Labware_Layout("Destination", "greiner655087_96_wellplate_340ul")
+    Destination_Layout.define_format(8, 12)
+    for reagent_index in range(12):
+        Destination_Layout.bulk_add_content("A1:B12", "Reagent {}".format(reagent_index), 1)
+    Destination_Layout.bulk_add_content("A1:A12", "Water", 50)
+    Destination_Layout.bulk_add_content("B1:B12", "Buffer", 50)
+
+    Mastermix_Layout = bms.Labware_Layout("Mastermix", "3dprinted_24_tuberack_1500ul")
+    Mastermix_Layout.define_format(4, 6)
+    Mastermix_Layout.set_available_wells()
+
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = bms.mastermixes_by_min_volume(
+        Destination_Layouts = [Destination_Layout],
+        Mastermix_Layout = Mastermix_Layout,
+        Maximum_Mastermix_Volume = 1000,
+        Min_Transfer_Volume = 5,
+        Extra_Reactions = 1,
+        Method = "exact"
+    )
+
+    # The reagents which all of the wells have in common are added with one mastermix
+    assert len(Mastermixes) == 1
+    assert sorted(Mastermixes[0].reagents) == sorted("Reagent {}_vol_1.0".format(index) for index in range(12))
+    assert len(Mastermixes[0].wells) == 24
+    assert Destination_Layouts[0].get_liquids_in_well("B1") == ["Buffer", Mastermixes[0].name]
+
+def test_mastermixes_by_min_volume_time_budget():
+    Destination_Layout = bms.Labware_Layout("Destination", "greiner655087_96_wellplate_340ul")
+    Destination_Layout.define_format(8, 12)
+
+    Destination_Layout.bulk_add_content("A1:A12", "LB", 80)
+    Destination_Layout.bulk_add_content("A1:A6", "Cells 1", 19)
+    Destination_Layout.bulk_add_content("A7:A12", "Cells 2", 19)
+    Destination_Layout.bulk_add_content("A1:A3, A7:A9", "Water", 1)
+    Destination_Layout.bulk_add_content("A4:A6, A10:A12", "Inducer", 1)
+    Destination_Layout.bulk_add_content("A1, A5, A9, A12", "IPTG", 2)
+
+    Mastermix_Layout = bms.Labware_Layout("Mastermix", "3dprinted_24_tuberack_1500ul")
+    Mastermix_Layout.define_format(4, 6)
+    Mastermix_Layout.set_available_wells()
+
+    Progress = []
+
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = bms.mastermixes_by_min_volume(
+        Destination_Layouts = [Destination_Layout],
+        Mastermix_Layout = Mastermix_Layout,
+        Maximum_Mastermix_Volume = 1000,
+        Min_Transfer_Volume = 5,
+        Extra_Reactions = 1,
+        Excluded_Combinations = [["LB", "IPTG"]],
+        Preferential_Reagents = ["Cells 1"],
+        Time_Budget = 60,
+        Progress_Callback = lambda **Kwargs: Progress.append(Kwargs)
+    )
+
+    # With a time budget, every seed is tried (unless time runs out) and the best solution is kept
+    assert Seed == 7
+    assert len(Mastermixes) == 4
+    assert len(Progress) == 1001
+    assert Progress[0]["Attempts"] == 1
+    assert Progress[0]["Best_Seed"] is None
+    assert Progress[0]["Best_Mastermix_Count"] is None
+    assert Progress[-1]["Attempts"] == 1001
+    assert Progress[-1]["Best_Seed"] == 7
+    assert Progress[-1]["Best_Mastermix_Count"] == 4
+    assert Progress[-1]["Elapsed_Time"] >= Progress[0]["Elapsed_Time"]
+
+def test_mastermixes_by_min_volume_time_budget_parallel(monkeypatch):
+    # Make each seed after the first take longer than the time budget
+    attempt = bms._Mastermix_Problem.attempt
+    def slow_attempt(self, Seed = None):
+        if Seed:
+            time.sleep(3)
+        return attempt(self, Seed)
+    monkeypatch.setattr(bms._Mastermix_Problem, "attempt", slow_attempt)
+
+    Destination_Layout = bms.Labware_Layout("Destination", "greiner655087_96_wellplate_340ul")
+    Destination_Layout.define_format(8, 12)
+
+    Destination_Layout.bulk_add_content("A1:A4", "LB", 80)
+    Destination_Layout.bulk_add_content("A1:A3", "Cells 2", 19)
+    Destination_Layout.add_content("A4", "Cells 1", 19)
+    Destination_Layout.add_content("A1", "Water", 1)
+    Destination_Layout.bulk_add_content("A2, A4", "Inducer", 1)
+    Destination_Layout.bulk_add_content("A2:A4", "IPTG", 1)
+
+    Mastermix_Layout = bms.Labware_Layout("Mastermix", "3dprinted_24_tuberack_1500ul")
+    Mastermix_Layout.define_format(4, 6)
+    Mastermix_Layout.set_available_wells()
+
+    Start_Time = time.monotonic()
+    Mastermixes, Seed, Destination_Layouts, Mastermix_Layouts = bms.mastermixes_by_min_volume(
+        Destination_Layouts = [Destination_Layout],
+        Mastermix_Layout = Mastermix_Layout,
+        Maximum_Mastermix_Volume = 1000,
+        Min_Transfer_Volume = 5,
+        Extra_Reactions = 1,
+        Processes = 2,
+        Time_Budget = 0.5
+    )
+
+    # The seeds still running when the time budget runs out are not waited for
+    assert time.monotonic() - Start_Time < 2.5
+    assert Seed is None
+    assert len(Mastermixes) == 4
+
 def test_create_labware():
     num_pcr_reactions = 234
 
@@ -285,6 +541,131 @@ def test_import_labware():
 
     dna_stocks_layout.print()
 
+def test_import_labware_defaults(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    metadata = workbook.active
+    metadata.append(["Plate Name", "Test Plate"])
+    metadata.append(["Plate Type", "384 PP"])
+    wells = workbook.create_sheet()
+    wells.append(["Well", "Name", "Volume (uL) - Initial", "Volume (uL) - Current", "Calibration Type"])
+    wells.append(["A1", "Water", 50, 40, "AQ_SP"])
+    wells.append(["A2", "Buffer", 30, None, None])
+    wells.append(["A3", None, 10, 10, None])
+    wells.append(["A4", "DNA", None, None, "CP"])
+    workbook.save(tmp_path / "Test Plate.xlsx")
+
+    layout = bms.Import_Labware_Layout("Test Plate", path=str(tmp_path) + "/")
+    assert layout.name == "Test Plate"
+    assert layout.type == "384 PP"
+    assert {well: [c.get_info() for c in content] for well, content in layout.get_content().items()} == {
+        "A1": [["Water", 40.0, "AQ_SP"]],
+        "A2": [["Buffer", 30.0, "AQ_BP"]],
+        "A4": [["DNA", 0.0, "CP"]],
+    }
+
+def test_import_labware_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(bms, "_layout_cache_directory", None)
+    monkeypatch.setenv("BMS_LAYOUT_CACHE_DIR", str(tmp_path / "cache"))
+    assert bms.get_layout_cache_directory() == str(tmp_path / "cache")
+    assert bms.clear_layout_cache() == 0
+
+    # Count how many times the file is actually read
+    reads = []
+    read_layout_workbook = bms._read_layout_workbook
+    monkeypatch.setattr(bms, "_read_layout_workbook", lambda path: reads.append(path) or read_layout_workbook(path))
+
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Plate Name", "Cached Plate"])
+    workbook.active.append(["Plate Type", "384 PP"])
+    wells = workbook.create_sheet()
+    wells.append(["Well", "Name", "Volume (uL) - Initial", "Volume (uL) - Current", "Calibration Type"])
+    wells.append(["A1", "Water", 50, 40, "AQ_SP"])
+    workbook.save(tmp_path / "Cached Plate.xlsx")
+
+    # The cache is only used when asked for
+    bms.Import_Labware_Layout("Cached Plate", path=str(tmp_path) + "/")
+    assert bms.get_layout_cache_info() == []
+
+    layout = bms.Import_Labware_Layout("Cached Plate", path=str(tmp_path) + "/", Use_Cache=True)
+    cache_info = bms.get_layout_cache_info()
+    assert len(cache_info) == 1
+    assert cache_info[0]["path"] == str(tmp_path / "Cached Plate.xlsx")
+    assert cache_info[0]["n_wells"] == 1
+
+    # Cached layouts are used while the file is unchanged
+    cached = bms.Import_Labware_Layout("Cached Plate", path=str(tmp_path) + "/", Use_Cache=True)
+    assert len(reads) == 2
+    for l in (layout, cached):
+        assert l.name == "Cached Plate"
+        assert l.get_content()["A1"][0].get_info() == ["Water", 40.0, "AQ_SP"]
+
+    # Changing the file means it is read again
+    wells.append(["A2", "Buffer", 20, 20, "AQ_SP"])
+    workbook.save(tmp_path / "Cached Plate.xlsx")
+    changed = bms.Import_Labware_Layout("Cached Plate", path=str(tmp_path) + "/", Use_Cache=True)
+    assert len(reads) == 3
+    assert changed.get_occupied_wells() == ["A1", "A2"]
+    assert bms.get_layout_cache_info()[0]["n_wells"] == 2
+
+    # Cached layouts of files which no longer exist, then the least recently used, are pruned
+    workbook.save(tmp_path / "Other Plate.xlsx")
+    bms.Import_Labware_Layout("Other Plate", path=str(tmp_path) + "/", Use_Cache=True)
+    workbook.save(tmp_path / "Removed Plate.xlsx")
+    bms.Import_Labware_Layout("Removed Plate", path=str(tmp_path) + "/", Use_Cache=True)
+    os.remove(tmp_path / "Removed Plate.xlsx")
+    assert len(bms.get_layout_cache_info()) == 3
+    assert bms.prune_layout_cache() == 1
+    bms.Import_Labware_Layout("Cached Plate", path=str(tmp_path) + "/", Use_Cache=True)
+    assert bms.prune_layout_cache(Max_Entries = 1) == 1
+    assert [info["path"] for info in bms.get_layout_cache_info()] == [str(tmp_path / "Cached Plate.xlsx")]
+
+    assert bms.clear_layout_cache() == 1
+    assert bms.get_layout_cache_info() == []
+
+def test_find_reagents(tmp_path, monkeypatch):
+    monkeypatch.setattr(bms, "_layout_cache_directory", str(tmp_path / "cache"))
+    layout_directory = tmp_path / "layouts"
+    layout_directory.mkdir()
+    for file in ["Example DNA Stocks.xlsx", "Example Plasmid Stocks.xlsx", "Water and Buffer Plate.xlsx"]:
+        shutil.copy(os.path.join("data", file), layout_directory / file)
+    (layout_directory / "notes.txt").write_text("Not a layout file")
+
+    index_file = str(tmp_path / "index.json")
+    with pytest.warns(UserWarning, match = "notes.txt"):
+        results = bms.Find_Reagents(["pOdd1", "Water", "Missing"], [str(layout_directory)], Index_File=index_file, Processes=2)
+    assert results == {
+        "pOdd1": [("Example Plasmid Stocks", ["A1", "A2", "A3"])],
+        "Water": [("Water and Buffer Plate", ["A1"])],
+        "Missing": [],
+    }
+
+    # Only files which have changed are read when a saved index is refreshed
+    index = bms.Reagent_Index.load(index_file)
+    assert len(index.files) == 4
+    reads = []
+    index_layout_file = bms._index_layout_file
+    monkeypatch.setattr(bms, "_index_layout_file", lambda path: reads.append(path) or index_layout_file(path))
+    os.remove(layout_directory / "Example DNA Stocks.xlsx")
+    index.refresh([str(layout_directory)], Processes=1)
+    assert reads == []
+    assert len(index.files) == 3
+    (layout_directory / "notes.txt").write_text("Still not a layout file")
+    with pytest.warns(UserWarning, match = "notes.txt"):
+        index.refresh([str(layout_directory)], Processes=1)
+    assert reads == [os.path.join(str(layout_directory) + "/", "notes.txt")]
+    assert index.find(["pOdd1", "J23100"]) == {"pOdd1": [("Example Plasmid Stocks", ["A1", "A2", "A3"])], "J23100": []}
+
+    with pytest.warns(UserWarning, match = "notes.txt"):
+        results = bms.Reagent_Finder(["Water"], [str(layout_directory)], Processes=1)
+    assert results == {"Water": [("Water and Buffer Plate", ["A1"])]}
+
+    # Errors other than a file not being a layout file are not hidden
+    (layout_directory / "Corrupt Plate.xlsx").write_bytes(b"Not a zip file")
+    with pytest.raises(zipfile.BadZipFile):
+        index.refresh([str(layout_directory)], Processes=1)
+
 def test_labware_content_class():
     name = "Liquid1"
     volume = 10
@@ -299,6 +680,353 @@ def test_labware_content_class():
     content2 = bms.Labware_Content(Name=name, Volume=volume)
     assert content2.get_info() == [name, volume, None]
 
+def test_compact_records_memory():
+    # Memory benchmark: compare the slotted records with equivalent __dict__-based objects
+    import tracemalloc
+
+    class Dict_Labware_Content:
+        def __init__(self, Name, Volume, Liquid_Class=None):
+            self.name = Name
+            self.volume = Volume
+            self.liquid_class = Liquid_Class
+
+    class Dict_Action:
+        def __init__(self, *Values):
+            (self.uid, self.reagent, self.source_plate, self.calibration, self.source_well,
+                self.destination_plate_name, self.destination_plate_type, self.destination_well,
+                self.volume) = Values
+
+    class Dict_DoE_Run_Data:
+        def __init__(self, ID):
+            self.id = ID
+            self.source_materials = {}
+            self.intermediates = {}
+            self.run_data = {}
+
+    def bytes_per_object(create, n=10000):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [create(i) for i in range(n)]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return (after - before) / n
+
+    source_plate = bms.Labware_Layout("Source", "384PP")
+    action_values = ("Reagent", source_plate, "AQ_BP", "A1", "Destination", "96 Well Plate", "B1")
+
+    records = {
+        "Labware_Content": (
+            bytes_per_object(lambda i: bms.Labware_Content("Water", 1.0, "AQ_BP")),
+            bytes_per_object(lambda i: Dict_Labware_Content("Water", 1.0, "AQ_BP")),
+        ),
+        "Action": (
+            bytes_per_object(lambda i: ep.Action(i, *action_values)),
+            bytes_per_object(lambda i: Dict_Action(i, *action_values, None)),
+        ),
+        "DoE_Run_Data": (
+            bytes_per_object(lambda i: bms.DoE_Run_Data(i, [], [])),
+            bytes_per_object(lambda i: Dict_DoE_Run_Data(i)),
+        ),
+    }
+
+    # Ceilings on the bytes per object, with some headroom for differences between Python versions
+    ceilings = {"Labware_Content": 100, "Action": 200, "DoE_Run_Data": 250}
+    for name, (slotted, with_dict) in records.items():
+        assert slotted < with_dict
+        assert slotted < ceilings[name]
+
+    assert not hasattr(bms.Labware_Content("Water", 1.0), "__dict__")
+
+def test_doe_experiment_columns(tmp_path):
+    doe_file = tmp_path / "DoE.csv"
+    doe_file.write_text("Strain,Inducer,Concentration\nS1,IPTG,1\nS2,IPTG,2.5\nS1,Ara,10\n")
+
+    doe = bms.DoE_Experiment("DoE", str(doe_file))
+    assert doe.get_run(2).id == 2
+    assert doe.get_run(3) is None
+    assert doe.get_all_values("Concentration") == ["1", "2.5", "10"]
+    assert doe.get_all_values("Concentration", Typed=True) == [1, 2.5, 10]
+    assert doe.get_run(1).get_factor_value("Concentration", Typed=True) == 2.5
+
+    # Runs are views of the experiment's columns
+    bms.DoE_Create_Source_Material(doe, "Cells", ["Strain"])
+    assert doe.get_all_values("Cells") == ["Strain(S1)", "Strain(S2)", "Strain(S1)"]
+    doe.get_run(0).specify_intermediate("Mix", "Mix 1")
+    assert doe.get_run(0).get_value_by_name("Mix") == "Mix 1"
+    assert doe.get_run(0).intermediates == {"Mix": "Mix 1"}
+    with pytest.raises(KeyError):
+        doe.get_run(1).get_intermediate_value("Mix")
+    with pytest.raises(bms.DoEError):
+        doe.get_all_values("Mix")
+
+    # Changes made through a run's dictionaries are written to the columns
+    doe.get_run(1).run_data["Inducer"] = "Ara"
+    doe.get_run(1).intermediates["Mix"] = "Mix 2"
+    assert doe.get_all_values("Inducer") == ["IPTG", "Ara", "Ara"]
+    assert doe.get_run(1).get_intermediate_value("Mix") == "Mix 2"
+    del doe.get_run(1).intermediates["Mix"]
+    assert "Mix" not in doe.get_run(1).intermediates
+    doe.get_run(1).run_data["Inducer"] = "IPTG"
+
+    # Runs created directly keep their own values
+    run = bms.DoE_Run_Data(0, ["Strain", "Concentration"], ["S1", "2.5"])
+    run.run_data["Strain"] = "S2"
+    run.specify_source_material("Cells", "Strain(S2)")
+    assert run.run_data == {"Strain": "S2", "Concentration": "2.5"}
+    assert run.get_value_by_name("Cells") == "Strain(S2)"
+    assert run.get_factor_value("Concentration", Typed=True) == 2.5
+    with pytest.raises(bms.DoEError):
+        run.get_value_by_name("Mix")
+
+    batch = doe.batch_by_factor_value("Inducer", "IPTG")
+    assert [run.id for run in batch.runs] == [0, 1]
+    assert batch.get_run(2) is None
+
+def test_doe_experiment_loading(tmp_path):
+    import io
+    pd = pytest.importorskip("pandas")
+
+    doe_file = tmp_path / "DoE.csv"
+    doe_file.write_text('Strain,Media,Volume\nS1,"LB, 1% Glucose",10\n\nS2,M9,2.5\n')
+    from_file = bms.DoE_Experiment("DoE", str(doe_file))
+    from_buffer = bms.DoE_Experiment("DoE", io.StringIO(doe_file.read_text()))
+    from_dataframe = bms.DoE_Experiment("DoE", pd.read_csv(str(doe_file)))
+    for doe in (from_file, from_buffer, from_dataframe):
+        assert doe.factors == ["Strain", "Media", "Volume"]
+        assert doe.get_all_values("Media") == ["LB, 1% Glucose", "M9"]
+        assert doe.get_all_values("Volume", Typed=True) == [10, 2.5]
+        assert doe.get_factor_type("Volume") == "numeric"
+        assert doe.get_factor_type("Strain") == "categorical"
+        assert doe.get_all_values("Strain", Typed=True) == ["S1", "S2"]
+
+    # All errors are reported together
+    with pytest.raises(ValueError) as error:
+        bms.DoE_Experiment("DoE", io.StringIO("Strain,Media\nS1,\nS2,M9,10\n,LB\n"))
+    message = str(error.value)
+    assert "3 error(s)" in message
+    assert "run 0 for factor Media" in message
+    assert "Run 1 has 3 values" in message
+    assert "run 2 for factor Strain" in message
+
+def test_doe_group_by(tmp_path):
+    doe_file = tmp_path / "DoE.csv"
+    doe_file.write_text("Strain,Inducer,Volume\nS1,IPTG,1\nS2,IPTG,2\nS1,IPTG,2\nS1,IPTG,1\n")
+    doe = bms.DoE_Experiment("DoE", str(doe_file))
+
+    assert doe.group_by(["Strain", "Inducer"]) == ([("S1", "IPTG"), ("S2", "IPTG")], [0, 1, 0, 0])
+    assert doe.group_by(["Volume"], Typed=True) == ([(1,), (2,)], [0, 1, 1, 0])
+
+    cells = bms.DoE_Create_Source_Material(doe, "Cells", ["Strain", "Inducer"])
+    assert cells == ["Strain(S1)-Inducer(IPTG)", "Strain(S2)-Inducer(IPTG)", "Strain(S1)-Inducer(IPTG)", "Strain(S1)-Inducer(IPTG)"]
+    assert doe.get_material("Strain(S2)-Inducer(IPTG)").factors == {"Strain": "S2", "Inducer": "IPTG"}
+    assert bms.DoE_Create_Source_Material(doe, "Water", None) == ["Water"]
+    assert doe.get_all_values("Water") == ["Water"] * 4
+
+    mixes = bms.DoE_Create_Intermediate(doe, "Mix", ["Cells", "Water"], ["volume", "volume"], ["Volume", 10])
+    assert mixes[:2] == [
+        "Cells[1](Strain(S1)-Inducer(IPTG))-Water(Water)",
+        "Cells[2](Strain(S2)-Inducer(IPTG))-Water(Water)",
+    ]
+    assert len(set(mixes)) == 3
+    assert doe.get_all_values("Mix") == mixes
+    mix = doe.get_intermediate(mixes[1])
+    assert mix.components == {"Cells": ["Strain(S2)-Inducer(IPTG)", "volume", "2"], "Water": ["Water", "volume", 10]}
+
+    # Runs store the combination of values, and the ID is only rendered when it is read
+    assert doe._columns.source_materials["Cells"].get_key(1) == (("Strain", "S2"), ("Inducer", "IPTG"))
+    assert doe._columns.intermediates["Mix"].get_key(1)[0] == ("Cells[2]", "Strain(S2)-Inducer(IPTG)")
+    assert doe.get_run(1).get_value_by_name("Mix") == mixes[1]
+
+def test_doe_name_resolution(tmp_path):
+    doe_file = tmp_path / "DoE.csv"
+    doe_file.write_text("Strain,Volume\nS1,1\nS2,2\n")
+    doe = bms.DoE_Experiment("DoE", str(doe_file))
+    assert doe.get_ambiguous_names() == {}
+    assert doe.get_run(1).get_value_by_name("Volume", Typed=True) == 2
+
+    # Names added later are resolved, and names used more than once are reported
+    bms.DoE_Create_Source_Material(doe, "Cells", ["Strain"])
+    assert doe.get_all_values("Cells") == ["Strain(S1)", "Strain(S2)"]
+    with pytest.warns(UserWarning, match="'Strain' is the name of more than one of: factor, source material"):
+        bms.DoE_Create_Source_Material(doe, "Strain", ["Strain"])
+        assert doe.get_all_values("Strain") == ["S1", "S2"]
+    assert doe.get_ambiguous_names() == {"Strain": ["factor", "source material"]}
+
+    # Where a run has no value for the first use of a name, the next is used
+    doe.get_run(0).specify_intermediate("Mix", "Mix 1")
+    doe.get_run(1).specify_source_material("Mix", "Source Mix")
+    with pytest.warns(UserWarning, match="'Mix' is the name of more than one of: source material, intermediate"):
+        assert doe.get_all_values("Mix") == ["Mix 1", "Source Mix"]
+    with pytest.raises(bms.DoEError):
+        doe.get_run(0).get_value_by_name("Missing")
+
+def test_doe_experiment_batches(tmp_path):
+    doe_file = tmp_path / "DoE.csv"
+    doe_file.write_text(
+        "Strain,Inducer,Concentration\n"
+        + "".join("S{},{},{}\n".format(i % 2, ["IPTG", "Ara"][i % 3 == 0], i % 4) for i in range(10))
+    )
+    doe = bms.DoE_Experiment("DoE", str(doe_file))
+    bms.DoE_Create_Source_Material(doe, "Cells", ["Strain"])
+
+    batch = doe.batch_by_factor_value("Strain", "S1")
+    assert batch.name == "DoE-Batched-Strain-S1"
+    assert [run.id for run in batch.runs] == [1, 3, 5, 7, 9]
+    # Batches are views, so they keep the parent's materials and share its runs
+    assert batch.get_material("Strain(S1)") is doe.get_material("Strain(S1)")
+    assert batch.get_run(3) is doe.get_run(3)
+    assert batch.get_all_values("Cells") == ["Strain(S1)"] * 5
+
+    # Materials added to a batch aren't added to the parent or to other batches
+    other_batch = doe.batch_by_factor_value("Strain", "S0")
+    batch.add_material(bms.DoE_Material("Batch Material", "Cells"))
+    with pytest.raises(KeyError):
+        doe.get_material("Batch Material")
+    with pytest.raises(KeyError):
+        other_batch.get_material("Batch Material")
+
+    batch = doe.batch_by_factor_values({"Strain": "S1", "Concentration": [1, "3"]})
+    assert [run.id for run in batch.runs] == [1, 3, 5, 7, 9]
+    batch = batch.batch_by_factor_values({"Inducer": "Ara"})
+    assert [run.id for run in batch.runs] == [3, 9]
+    with pytest.raises(bms.DoEError):
+        doe.batch_by_factor_values({"Missing": "S1"})
+
+    batch = doe.filter_runs(lambda run: run.get_factor_value("Concentration", Typed=True) > 1)
+    assert [run.id for run in batch.runs] == [2, 3, 6, 7]
+
+    batches = doe.split_into_batches(4)
+    assert [[run.id for run in batch.runs] for batch in batches] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert batches[2].name == "DoE-Batch-3"
+    with pytest.raises(ValueError):
+        doe.split_into_batches(0)
+
+def run_doe_template(Directory, monkeypatch, DoE_Rows, Destination_Content = None):
+    # Runs the DoE template until its layouts are set up; the protocols generated from the layouts aren't tested here
+    from BiomationScripter.OTProto.Templates import Design_Of_Experiments
+
+    class Protocol_From_Layouts:
+        def __init__(self, **kwargs):
+            pass
+
+        def run(self):
+            pass
+
+        def run_as_module(self, Parent):
+            pass
+
+    monkeypatch.setattr(otp.Templates, "Protocol_From_Layouts", Protocol_From_Layouts, raising=False)
+
+    doe_file = Directory / "DoE.csv"
+    doe_file.write_text("Strain,Conc\n" + "".join("{},{}\n".format(*row) for row in DoE_Rows))
+
+    template = Design_Of_Experiments.Template(
+        DoE_File = str(doe_file),
+        Source_Materials = {"Cells": [["Strain"], 1000], "Inducer": [None, 1000], "Water": [None, 1000]},
+        Destination_Content = Destination_Content or {"Sample": [["Cells", 20], ["Mix", 80]], "Blank": [["Water", 100]]},
+        Labware_APIs = {
+            "Destination": "corning_96_wellplate_360ul_flat",
+            "Mix": "nest_96_wellplate_2ml_deep",
+            "Cells": "opentrons_24_tuberack_eppendorf_1.5ml_safelock_snapcap",
+            "Inducer": "opentrons_24_tuberack_eppendorf_1.5ml_safelock_snapcap",
+            "Water": "opentrons_24_tuberack_eppendorf_1.5ml_safelock_snapcap",
+        },
+        Intermediates = {"Mix": [["Inducer", "concentration-1000", "Conc"], ["Water", "volume", "make up to final volume"]]},
+        Protocol = OT2.get_protocol_api("2.11"),
+        Name = "DoE",
+        Metadata = {"protocolName": "DoE", "apiLevel": "2.11"},
+        Custom_Labware_Dir = str(Directory),
+    )
+    template.run()
+    return template
+
+def test_doe_template_destination_plates(tmp_path, monkeypatch):
+    # Each run needs two wells, and 60 inner wells are used per plate, so 30 runs fit on each plate
+    rows = [("S{}".format(i % 2 + 1), [10, 20][i % 3 == 0]) for i in range(70)]
+    template = run_doe_template(tmp_path, monkeypatch, rows)
+
+    assert [layout.name for layout in template.destination_layouts] == [
+        "Destination Labware 1", "Destination Labware 2", "Destination Labware 3"
+    ]
+    assert template.destination_layout is template.destination_layouts[0]
+    assert template.labware_layouts["Destination 2"] is template.destination_layouts[1]
+    assert [len(layout.get_occupied_wells()) for layout in template.destination_layouts] == [60, 60, 20]
+
+    # Every run is in one plate, in order, with its sample then its blank
+    assert sorted(template.run_locations) == list(range(70))
+    for run_id, locations in template.run_locations.items():
+        plate_name = "Destination Labware {}".format(run_id // 30 + 1)
+        assert [name for name, well in locations] == [plate_name, plate_name]
+    inner_wells = template.destination_layouts[0].get_well_range(Use_Outer_Wells=False)
+    assert template.run_locations[0] == [("Destination Labware 1", "B2"), ("Destination Labware 1", "B3")]
+    assert template.run_locations[31] == [("Destination Labware 2", inner_wells[2]), ("Destination Labware 2", inner_wells[3])]
+    assert template.run_locations[69][1] == ("Destination Labware 3", inner_wells[19])
+
+    layout = template.destination_layouts[1]
+    sample_well, blank_well = template.run_locations[31]
+    assert layout.get_liquids_in_well(sample_well[1]) == ["Strain(S2)", "Inducer[10](Inducer)-Water(Water)"]
+    assert layout.get_liquids_in_well(blank_well[1]) == ["Water"]
+
+    # Runs which fit on one plate use a single "Destination" layout
+    template = run_doe_template(tmp_path, monkeypatch, rows[:30])
+    assert len(template.destination_layouts) == 1
+    assert template.labware_layouts["Destination"] is template.destination_layout
+    assert len(template.destination_layout.get_occupied_wells()) == 60
+
+def test_doe_template_destination_tables(tmp_path, monkeypatch):
+    rows = [("S1", 10), ("S1", 20), ("S1", 20), ("S2", 10), ("S2", 20), ("S1", 10), ("S2", 10)]
+    template = run_doe_template(tmp_path, monkeypatch, rows)
+    layout = template.destination_layout
+
+    # The tables match the volumes and dilutions found by checking each well for each liquid
+    liquids = set(liquid for well in layout.get_occupied_wells() for liquid in layout.get_liquids_in_well(well))
+    assert set(template.destination_liquid_volumes) == liquids
+    for liquid in liquids:
+        volumes = []
+        dilutions = set()
+        for well in layout.get_wells_containing_liquid(liquid):
+            volume = layout.get_volume_of_liquid_in_well(liquid, well)
+            final_volume = sum(
+                layout.get_volume_of_liquid_in_well(component, well) for component in layout.get_liquids_in_well(well)
+            )
+            volumes.append(volume)
+            dilutions.add(volume / final_volume)
+        assert template.destination_liquid_volumes[liquid] == pytest.approx(sum(volumes))
+        assert template.destination_liquid_dilutions[liquid] == dilutions
+
+    assert template.destination_liquid_volumes["Water"] == 700
+    assert template.destination_liquid_dilutions["Inducer[20](Inducer)-Water(Water)"] == {0.8}
+
+    # Each slot of an intermediate holds the component volumes calculated for it
+    capacity = otp.get_labware_well_capacity("nest_96_wellplate_2ml_deep", str(tmp_path))
+    mix_as_source = template.labware_layouts["Mix as source"]
+    mix_as_destination = template.labware_layouts["Mix as destination"]
+    for concentration in [10, 20]:
+        mix = "Inducer[{}](Inducer)-Water(Water)".format(concentration)
+        volume_required = template.destination_liquid_volumes[mix] * 1.1
+        volume_per_slot = volume_required / -(-volume_required // capacity)
+        inducer_volume = round((concentration / 0.8) * volume_per_slot / 1000, 1)
+        wells = mix_as_source.get_wells_containing_liquid(mix)
+        assert wells
+        for well in wells:
+            assert mix_as_source.get_volume_of_liquid_in_well(mix, well) == pytest.approx(volume_per_slot)
+            assert mix_as_destination.get_volume_of_liquid_in_well("Inducer", well) == inducer_volume
+            assert mix_as_destination.get_volume_of_liquid_in_well("Water", well) == pytest.approx(volume_per_slot - inducer_volume)
+
+    # A liquid listed more than once in a well is counted once for each time it is listed
+    template = run_doe_template(
+        tmp_path, monkeypatch, rows,
+        Destination_Content = {"Sample": [["Cells", 20], ["Mix", 40], ["Mix", 40]], "Blank": [["Water", 100]]}
+    )
+    layout = template.destination_layout
+    mix = "Inducer[20](Inducer)-Water(Water)"
+    mix_wells = set(layout.get_wells_containing_liquid(mix))
+    assert len(layout.get_wells_containing_liquid(mix)) == 2 * len(mix_wells)
+    assert template.destination_liquid_volumes[mix] == 80 * len(mix_wells)
+    assert template.destination_liquid_dilutions[mix] == {0.4}
+    assert template.destination_liquid_dilutions["Water"] == {1.0}
+
 def test_labware_layout_class():
     source_labware_name = "Source Plate"
     source_labware_type = "Greiner 96-well 2mL Masterblock (780270)"
@@ -401,6 +1129,121 @@ def test_labware_layout_class_content():
         "D9",
     ]
 
+def test_labware_layout_liquid_index():
+    layout = bms.Labware_Layout("Plate", "96 Well Plate")
+    layout.define_format(8, 12)
+
+    layout.add_content("B1", "Water", 10)
+    layout.add_content("A1", "DNA1", 5)
+    layout.add_content("A1", "Water", 10)
+    layout.add_content("C1", "Water", 10)
+    layout.add_content("C1", "Water", 2)
+
+    # Wells are returned in the order they were first filled, once per matching entry
+    assert layout.get_wells_containing_liquid("Water") == ["B1", "A1", "C1", "C1"]
+    assert layout.get_wells_containing_liquid("Missing") == []
+
+    layout.clear_liquid_in_well("C1", "Water")
+    assert layout.get_wells_containing_liquid("Water") == ["B1", "A1"]
+    assert "C1" not in layout.get_occupied_wells()
+
+    layout.clear_content_from_well("B1")
+    layout.add_content("B1", "Water", 10)
+    assert layout.get_wells_containing_liquid("Water") == ["A1", "B1"]
+
+    layout.update_volume_in_well(20, "Water", "A1")
+    assert layout.get_total_volume_of_liquid("Water") == 30
+
+    layout.clear_content()
+    assert layout.get_wells_containing_liquid("Water") == []
+    assert layout.get_wells_containing_liquid("DNA1") == []
+
+def test_labware_layout_well_labels():
+    layout = bms.Labware_Layout("Plate", "96 Well Plate")
+    layout.define_format(8, 12)
+    layout.add_content("A1", "Water", 10)
+    layout.add_content("A2", "Buffer", 10)
+
+    layout.add_well_label("A1", "MM1")
+    layout.add_well_label("A2", "MM2")
+    assert layout.get_well_location_by_label("MM1") == "A1"
+    assert layout.get_well_content_by_label("MM2")[0].name == "Buffer"
+    assert layout.get_well_location_by_label("MM3") is None
+    assert layout.get_well_content_by_label("MM3") is None
+
+    with pytest.raises(bms.LabwareError, match='"MM1" is already used as a label in A1'):
+        layout.add_well_label("A3", "MM1")
+
+    # Re-labelling a well frees its old label
+    layout.add_well_label("A1", "MM3")
+    assert layout.well_labels["A1"] == "MM3"
+    assert layout.get_well_location_by_label("MM1") is None
+    layout.add_well_label("A3", "MM1")
+    assert layout.get_well_location_by_label("MM1") == "A3"
+
+def test_labware_layout_next_empty_well():
+    layout = bms.Labware_Layout("Plate", "24 Tube Rack")
+    layout.define_format(4, 6)
+    layout.set_available_wells(Well_Range="A1:B2", Direction="Vertical", Box=True)
+    assert layout.empty_wells == ["A1", "B1", "A2", "B2"]
+
+    filled = []
+    while layout.get_next_empty_well() is not None:
+        well = layout.get_next_empty_well()
+        layout.add_content(well, "Water", 10)
+        filled.append(well)
+    assert filled == ["A1", "B1", "A2", "B2"]
+    assert layout.empty_wells == []
+
+    # Cleared wells are handed out again in available well order
+    layout.clear_content_from_well("A2")
+    layout.clear_content_from_well("B1")
+    assert layout.get_next_empty_well() == "B1"
+    layout.add_content("B1", "Water", 10)
+    assert layout.get_next_empty_well() == "A2"
+
+    layout.clear_content()
+    assert layout.get_next_empty_well() == "A1"
+    assert layout.empty_wells == ["A1", "B1", "A2", "B2"]
+
+def test_labware_layout_volume_matrix():
+    layout = bms.Labware_Layout("Plate", "96 Well Plate")
+    layout.define_format(8, 12)
+    layout.add_content("A1", "Water", 10)
+    layout.add_content("A1", "DNA1", 2.5)
+
+    matrix = layout.use_volume_matrix()
+    assert matrix.volumes.shape == (8, 12, 2)
+
+    layout.add_content("H12", "Water", 20)
+    layout.add_content("B3", "Buffer", 0)
+    for liquid_number in range(20):
+        layout.add_content("C1", f"Liquid{liquid_number}", 1)
+
+    well_totals = layout.get_well_volume_totals()
+    assert well_totals.shape == (8, 12)
+    assert well_totals[0, 0] == 12.5
+    assert well_totals[7, 11] == 20
+    assert well_totals[2, 0] == 20
+
+    liquid_totals = layout.get_liquid_volume_totals()
+    assert liquid_totals["Water"] == 30
+    assert liquid_totals["DNA1"] == 2.5
+
+    mask = layout.get_liquid_mask("Buffer")
+    assert mask.sum() == 1 and mask[1, 2]
+    assert not layout.get_liquid_mask("Missing").any()
+
+    layout.update_volume_in_well(5, "Water", "A1")
+    layout.clear_liquid_in_well("A1", "DNA1")
+    layout.clear_content_from_well("H12")
+    assert layout.get_liquid_volume_totals()["Water"] == 5
+    assert layout.get_liquid_volume_totals()["DNA1"] == 0
+    assert list(zip(*layout.get_liquid_mask("Water").nonzero())) == [(0, 0)]
+
+    layout.clear_content()
+    assert layout.get_well_volume_totals().sum() == 0
+
 
 # def test_serial_dilution_volumes():
 #     final_volume = 100
@@ -438,6 +1281,163 @@ def test_labware_layout_class_content():
 #     ]
 
 
+def test_well_range_well_tables():
+    assert bms._get_well_table(8, 12) is bms._get_well_table(8, 12)
+    well_table = bms._get_well_table(8, 12)
+    assert well_table.horizontal[:3] == ("A1", "A2", "A3")
+    assert well_table.vertical[:3] == ("A1", "B1", "C1")
+    assert well_table.horizontal_indices["B1"] == 12
+    assert well_table.vertical_indices["A2"] == 8
+    assert sum(well_table.outer_mask) == 36
+
+    assert bms.well_range("A11:B2", [8, 12]) == ["A11", "A12", "B1", "B2"]
+    assert bms.well_range("G12:B1", (8, 12), "Vertical") == []
+    assert bms.well_range("G1:B2", (8, 12), "Vertical") == ["G1", "H1", "A2", "B2"]
+    with pytest.raises(ValueError):
+        bms.well_range("A1:I1", [8, 12])
+
+    assert otp.tip_racks_needed(0) == 0
+    assert otp.tip_racks_needed(96) == 1
+    assert otp.tip_racks_needed(96, "B1") == 2
+    assert otp.tip_racks_needed(95, "B1") == 1
+    assert otp.tip_racks_needed(200, "H12") == 4
+
+def test_well_coordinates():
+    assert bms._parse_well("A1") == (0, 0)
+    assert bms._parse_well("H12") == (7, 11)
+    assert bms._well_name(1, 2) == "B3"
+    with pytest.raises(ValueError):
+        bms._parse_well("12")
+    with pytest.raises(ValueError):
+        bms._parse_well("A")
+
+    assert bms.well_range("B2:C3", Box=True) == ["B2", "B3", "C2", "C3"]
+    assert bms.well_range("B2:C3", Direction="Vertical", Box=True) == ["B2", "C2", "B3", "C3"]
+
+    layout = bms.Labware_Layout("Plate", "Type")
+    layout.define_format(8, 12)
+    assert layout.check_well("H12")
+    assert not layout.check_well("I1")
+    assert not layout.check_well("A13")
+
+    other = bms.Labware_Layout("Plate 2", "Type")
+    other.define_format(8, 12)
+    layout.add_content("A1", "Water", 10)
+    other.add_content("B1", "Water", 10)
+    layout.add_content("A2", "Water", 20)
+    groups = bms.group_locations_by_content([layout, other])
+    assert groups == {
+        "{'Water': 10.0}": [(layout, "A1"), (other, "B1")],
+        "{'Water': 20.0}": [(layout, "A2")],
+    }
+
+def test_well_range_1536_well_plate():
+    assert bms._row_name(25) == "Z"
+    assert bms._row_name(26) == "AA"
+    assert bms._Labware_Row_To_Index("AF") == 31
+
+    full_plate = bms.well_range("A1:AF48", (32, 48))
+    assert len(full_plate) == 1536
+    assert len(set(full_plate)) == 1536
+    assert full_plate[:2] == ["A1", "A2"]
+    assert full_plate[-1] == "AF48"
+    assert full_plate[26 * 48] == "AA1"
+
+    vertical = bms.well_range("A1:AF48", (32, 48), "Vertical")
+    assert vertical[24:28] == ["Y1", "Z1", "AA1", "AB1"]
+    assert vertical[32] == "A2"
+    assert vertical[-1] == "AF48"
+    assert bms.well_range("Z47:AA2", (32, 48), "Horizontal") == ["Z47", "Z48", "AA1", "AA2"]
+
+    assert bms.well_range("Y1:AB2", Box=True) == ["Y1", "Y2", "Z1", "Z2", "AA1", "AA2", "AB1", "AB2"]
+    assert bms.well_range("Y1:AB2", Direction="Vertical", Box=True) == ["Y1", "Z1", "AA1", "AB1", "Y2", "Z2", "AA2", "AB2"]
+    with pytest.raises(ValueError):
+        bms.well_range("A1:AG1", (32, 48))
+
+    layout = bms.Labware_Layout("1536 Plate", "Type")
+    layout.define_format(32, 48)
+    assert layout.check_well("AF48")
+    assert not layout.check_well("AG1")
+    assert not layout.check_well("A49")
+    assert layout.get_well_range() == full_plate
+    inner_wells = layout.get_well_range(Use_Outer_Wells=False)
+    assert len(inner_wells) == 30 * 46
+    assert "AE47" in inner_wells and "AF47" not in inner_wells
+
+    with pytest.raises(bms.LabwareError):
+        layout.define_format(0, 48)
+
+def test_well_range_expressions():
+    assert bms.well_range("A1:A3,C1:C2, E5", (8, 12)) == ["A1", "A2", "A3", "C1", "C2", "E5"]
+    assert bms.well_range("A1:A3,!A2", (8, 12)) == ["A1", "A3"]
+    assert bms.well_range("A11:B2,[C1:D2]", (8, 12)) == ["A11", "A12", "B1", "B2", "C1", "C2", "D1", "D2"]
+    assert bms.well_range("[A1:B2]@V,A1", (8, 12)) == ["A1", "B1", "A2", "B2"]
+    assert bms.well_range("G1:B2@V", (8, 12)) == ["G1", "H1", "A2", "B2"]
+    assert len(bms.well_range("!A1:A12", (8, 12))) == 84
+    with pytest.raises(ValueError):
+        bms.well_range("A1:A3,I1", (8, 12))
+    with pytest.raises(ValueError):
+        bms.well_range("A1:A3@X", (8, 12))
+    with pytest.raises(bms.LabwareError):
+        bms.well_range("A1:A3,B1", Box=True)
+
+    layout = bms.Labware_Layout("Plate", "Type")
+    layout.define_format(8, 12)
+    layout.set_available_wells("A1:A12,!A6", Use_Outer_Wells=False)
+    assert layout.get_available_wells() == []
+    layout.set_available_wells("A1:B12,![A6:B6]")
+    assert "A6" not in layout.get_available_wells()
+    assert len(layout.get_available_wells()) == 22
+
+    layout.add_content("A1:A3,B5", "Water", 10)
+    assert list(layout.get_content()) == ["A1", "A2", "A3", "B5"]
+    layout.bulk_add_content("[B1:B2]@V", ["Buffer 1", "Buffer 2"], 5)
+    assert layout.get_liquids_in_well("B2") == ["Buffer 2"]
+
+def test_labware_layout_bulk_add_content():
+    layout = bms.Labware_Layout("1536 Plate", "Type")
+    layout.define_format(32, 48)
+    layout.set_available_wells()
+    wells = layout.get_well_range()
+    reagents = ["Reagent {}".format(i) for i in range(len(wells))]
+
+    layout.bulk_add_content(wells, reagents, 5)
+    assert list(layout.get_content()) == wells
+    assert layout.get_next_empty_well() is None
+    assert layout.get_liquids_in_well("AF48") == ["Reagent 1535"]
+    assert layout.get_content()["A1"][0].liquid_class == "Unknown"
+
+    layout.bulk_add_content("A1:A2", "Water", [1, 2], "Water Class")
+    assert layout.get_volume_of_liquid_in_well("Water", "A2") == 2
+    assert layout.get_content()["A2"][1].liquid_class == "Water Class"
+
+    # Nothing is added if any well or volume is invalid
+    layout.set_available_wells("A1:A12")
+    with pytest.raises(bms.LabwareError):
+        layout.bulk_add_content(["A1", "B1"], "Buffer", 5)
+    with pytest.raises(bms.NegativeVolumeError):
+        layout.bulk_add_content(["A1", "A2"], "Buffer", [5, -1])
+    with pytest.raises(ValueError):
+        layout.bulk_add_content(["A1", "A2"], ["Buffer"], 5)
+    assert layout.get_wells_containing_liquid("Buffer") == []
+
+    # Items of a list of wells can be well ranges, and liquid classes of None are "Unknown"
+    layout = bms.Labware_Layout("Plate", "Type")
+    layout.define_format(8, 12)
+    layout.add_content(["A1:A3", "B1"], "Water", 10)
+    assert layout.get_occupied_wells() == ["A1", "A2", "A3", "B1"]
+    layout.bulk_add_content(["C1:C2", "D1"], ["Buffer 1", "Buffer 2"], 5, [None, "Buffer Class"])
+    assert layout.get_liquids_in_well("C2") == ["Buffer 1"]
+    assert layout.get_content()["C2"][0].liquid_class == "Unknown"
+    assert layout.get_content()["D1"][0].liquid_class == "Buffer Class"
+
+    # With a volume matrix, wells outside the format are found before anything is added
+    layout.use_volume_matrix()
+    with pytest.raises(bms.LabwareError):
+        layout.bulk_add_content(["E1", "I1"], "Dye", 5)
+    assert layout.get_wells_containing_liquid("Dye") == []
+    assert "E1" not in layout.get_occupied_wells()
+
 def test_assembly_class():
     assembly_name = "GFP Expression Unit"
     backbone = "pOdd1"
@@ -1542,6 +2542,11 @@ class TestOTProto:
             == 4
         )
 
+        assert [
+            well.well_name
+            for well in otp.get_locations(Labware=labware1, Wells="A1:A3,!A2,D6")
+        ] == ["A1", "A3", "D6"]
+
     def test_get_pipette_function(self):
         protocol = OT2.get_protocol_api("2.11")
         protocol.home()